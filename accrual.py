@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+# accrual.py - TROŠAK DRŽANJA ZALIHE KROZ VRIJEME
+#
+# Dnevni trošak finansiranja (kapital vezan u zalihi po nabavnoj cijeni) i
+# skladištenja za svaki SKU kroz narednih N dana, kao matrica (SKU x dan).
+# Kao u pricing_rules.quote, finansira se samo gotovinski jaz: dok zaliha nije
+# starija od roka plaćanja dobavljaču, kapital je dobavljačev i kamate nema.
+# Matrica se računa u blokovima redova da memorija ostane ograničena.
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from elasticity import DEFAULT_ELASTICITY
+from pricing_rules import get_rules
+
+HORIZON_DAYS = 90
+CHUNK_CELLS = 4_000_000  # najviše ćelija (SKU x dan) u jednom bloku
+WAREHOUSE_PREFIX = "qty_"
+
+Accrual = namedtuple("Accrual", "days by_category by_warehouse per_sku")
+
+
+def _daily_rates(products, annual_interest, rules):
+    """Per-unit daily financing and storage cost"""
+    cost = products["cost"].to_numpy(dtype=float)
+    codes = rules.category_codes(products["category"].astype(str))
+    financing = cost * annual_interest / 365
+    storage = cost * rules.monthly_storage[codes] / 30
+    return financing, storage
+
+
+def iter_curves(products, horizon=HORIZON_DAYS, rate=None, annual_interest=None, rules=None,
+                chunk_cells=CHUNK_CELLS, supplier_terms=None):
+    """Yield (rows, financing, storage) daily cost matrices block by block
+
+    Stock sells down at `rate` units/day (per SKU, default 0 = held as is);
+    column t is the cost of day t + 1 of the horizon. Financing starts once
+    the stock is older than `supplier_terms` days (the supplier is paid).
+    """
+    rules = rules or get_rules()
+    annual_interest = rules.annual_interest if annual_interest is None else annual_interest
+    supplier_terms = rules.supplier_terms if supplier_terms is None else supplier_terms
+    financing, storage = _daily_rates(products, annual_interest, rules)
+    quantity = products["quantity"].to_numpy(dtype=float)
+    age = products["days"].to_numpy(dtype=float)
+    rate = np.zeros_like(quantity) if rate is None else np.broadcast_to(np.asarray(rate, dtype=float), quantity.shape)
+
+    elapsed = np.arange(horizon, dtype=float)
+    step = max(chunk_cells // max(horizon, 1), 1)
+    for start in range(0, len(quantity), step):
+        rows = slice(start, start + step)
+        stock = np.maximum(quantity[rows, None] - rate[rows, None] * elapsed, 0.0)
+        paid = age[rows, None] + elapsed >= supplier_terms
+        yield rows, stock * financing[rows, None] * paid, stock * storage[rows, None]
+
+
+def warehouse_columns(products):
+    return [c for c in products.columns if c.startswith(WAREHOUSE_PREFIX)]
+
+
+def accrue(products, horizon=HORIZON_DAYS, rate=None, annual_interest=None, rules=None,
+           chunk_cells=CHUNK_CELLS, supplier_terms=None):
+    """Daily carrying cost curves aggregated by category and warehouse
+
+    by_category / by_warehouse are DataFrames (grupa x dan) of daily cost;
+    warehouse curves split each SKU by its qty_<skladište> share. per_sku
+    holds financing, storage and total over the whole horizon.
+    """
+    categories, cat_codes = np.unique(products["category"].astype(str).to_numpy(), return_inverse=True)
+    warehouses = warehouse_columns(products)
+    quantity = products["quantity"].to_numpy(dtype=float)
+    if warehouses:
+        split = products[warehouses].to_numpy(dtype=float)
+        shares = split / np.where(quantity > 0, quantity, 1.0)[:, None]
+    else:
+        shares = np.zeros((len(products), 0))
+
+    by_category = np.zeros((len(categories), horizon))
+    by_warehouse = np.zeros((len(warehouses), horizon))
+    financing_total = np.zeros(len(products))
+    storage_total = np.zeros(len(products))
+    for rows, financing, storage in iter_curves(products, horizon, rate, annual_interest, rules, chunk_cells,
+                                                supplier_terms):
+        curve = financing + storage
+        # Sabiranje po grupama kao matrično množenje (one-hot / udjeli x krive)
+        onehot = cat_codes[rows, None] == np.arange(len(categories))
+        by_category += onehot.T.astype(float) @ curve
+        by_warehouse += shares[rows].T @ curve
+        financing_total[rows] = financing.sum(axis=1)
+        storage_total[rows] = storage.sum(axis=1)
+
+    days = np.arange(1, horizon + 1)
+    return Accrual(
+        days,
+        pd.DataFrame(by_category, index=pd.Index(categories, name="category"), columns=days),
+        pd.DataFrame(by_warehouse, index=pd.Index([w[len(WAREHOUSE_PREFIX):] for w in warehouses],
+                                                  name="warehouse"), columns=days),
+        pd.DataFrame({
+            "id": products["id"].to_numpy(),
+            "financing": financing_total,
+            "storage": storage_total,
+            "carrying_cost": financing_total + storage_total,
+        }),
+    )
+
+
+def hold_vs_discount(products, discount_price, rate, elasticity=None, horizon=HORIZON_DAYS,
+                     annual_interest=None, rules=None, chunk_cells=CHUNK_CELLS, supplier_terms=None):
+    """Profit over the horizon of holding the current price vs discounting now
+
+    Discounting speeds up sell-through by (discount / price) ** elasticity,
+    which cuts carrying cost but gives up margin on every unit sold.
+    """
+    current = products["price"].to_numpy(dtype=float)
+    cost = products["cost"].to_numpy(dtype=float)
+    quantity = products["quantity"].to_numpy(dtype=float)
+    discount_price = np.asarray(discount_price, dtype=float)
+    rate = np.broadcast_to(np.asarray(rate, dtype=float), quantity.shape)
+    if elasticity is None:
+        e = np.full(len(products), DEFAULT_ELASTICITY)
+    else:
+        e = products["category"].astype(str).map(elasticity).fillna(DEFAULT_ELASTICITY).to_numpy(dtype=float)
+    discount_rate = rate * (discount_price / np.where(current > 0, current, 1.0)) ** e
+
+    result = pd.DataFrame({"id": products["id"].to_numpy(), "price": current, "discount_price": discount_price})
+    for name, price, r in (("hold", current, rate), ("discount", discount_price, discount_rate)):
+        carrying = accrue(products, horizon, r, annual_interest, rules, chunk_cells,
+                          supplier_terms).per_sku["carrying_cost"]
+        sold = np.minimum(r * horizon, quantity)
+        result[f"units_{name}"] = sold
+        result[f"carrying_{name}"] = carrying.to_numpy()
+        result[f"profit_{name}"] = sold * (price - cost) - carrying.to_numpy()
+    result["discount_benefit"] = result["profit_discount"] - result["profit_hold"]
+    return result
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+# analysis_store.py - SAČUVANE ANALIZE KUPACA (SQLite)
+#
+# Jedna analiza po (kupac, period). Uz ulazne parametre čuvaju se i izračunati
+# rezultati, pa lista analiza ne traži ponovni izračun. Kada se promijene
+# globalni parametri (kamata, rok dobavljača), sve analize se preračunaju
+# jednim vektorskim prolazom kroz CUSTOMER_MODEL.
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from profitability import CUSTOMER_MODEL
+
+STORE_PATH = os.environ.get(
+    "ANALYSIS_STORE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "analyses.db")
+)
+
+PARAMS = list(CUSTOMER_MODEL.params)
+OUTPUTS = ["paper_profit", "financing", "commission", "additional_costs", "real_profit", "profit_margin"]
+GLOBAL_PARAMS = ("interest_rate", "supplier_terms")
+SUMMARY_COLUMNS = ["customer", "period", "updated_at", "total_sales", "real_profit", "profit_margin"]
+
+
+def evaluate(params):
+    """Model outputs for one analysis (scalars) or many (arrays)"""
+    values = CUSTOMER_MODEL.evaluate(params)
+    return {name: values[name] for name in OUTPUTS}
+
+
+class AnalysisStore:
+    """Customer analyses keyed by (customer, period)"""
+
+    def __init__(self, path=STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        columns = ", ".join(f"{c} REAL" for c in PARAMS + OUTPUTS)
+        with self._conn:
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS analyses (customer TEXT NOT NULL, period TEXT NOT NULL, "
+                f"updated_at TEXT NOT NULL, {columns}, PRIMARY KEY (customer, period))"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS analyses_updated ON analyses (updated_at)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value REAL)")
+
+    def save(self, customer, period, params):
+        """Insert or replace one analysis; returns its computed outputs"""
+        outputs = evaluate(params)
+        row = [customer, period, datetime.now().isoformat(timespec="seconds")]
+        row += [float(params[c]) for c in PARAMS] + [float(outputs[c]) for c in OUTPUTS]
+        names = ["customer", "period", "updated_at"] + PARAMS + OUTPUTS
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO analyses ({', '.join(names)}) VALUES ({', '.join('?' * len(names))})", row
+            )
+        return outputs
+
+    def load(self, customer, period):
+        """Saved parameters of one analysis (or None)"""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(PARAMS)} FROM analyses WHERE customer = ? AND period = ?", (customer, period)
+            ).fetchone()
+        return dict(zip(PARAMS, row)) if row else None
+
+    def delete(self, customer, period):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM analyses WHERE customer = ? AND period = ?", (customer, period))
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM analyses").fetchone()[0]
+
+    def list(self, search=None, limit=200):
+        """Summary rows (newest first), read straight from the stored results"""
+        sql = f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM analyses"
+        args = []
+        if search:
+            sql += " WHERE customer LIKE ?"
+            args.append(f"%{search}%")
+        sql += " ORDER BY updated_at DESC"
+        if limit:
+            sql += " LIMIT ?"
+            args.append(limit)
+        with self._lock:
+            return pd.read_sql_query(sql, self._conn, params=args)
+
+    def analyses(self):
+        """Every analysis with its parameters and stored results (oldest first)"""
+        columns = ["customer", "period", "updated_at"] + PARAMS + OUTPUTS
+        with self._lock:
+            return pd.read_sql_query(f"SELECT {', '.join(columns)} FROM analyses ORDER BY updated_at", self._conn)
+
+    def recalculate(self, **overrides):
+        """Re-run every stored analysis in one vectorized batch
+
+        `overrides` replace parameters for all analyses (e.g. a new
+        interest_rate or supplier_terms). Returns the number of analyses.
+        """
+        unknown = set(overrides) - set(PARAMS)
+        if unknown:
+            raise ValueError(f"Nepoznati parametri: {', '.join(sorted(unknown))}")
+        with self._lock:
+            frame = pd.read_sql_query(f"SELECT rowid, {', '.join(PARAMS)} FROM analyses", self._conn)
+            if len(frame) == 0:
+                return 0
+            params = {c: frame[c].to_numpy(dtype=float) for c in PARAMS}
+            for name, value in overrides.items():
+                params[name] = np.full(len(frame), float(value))
+            outputs = evaluate(params)
+
+            columns = list(overrides) + OUTPUTS
+            data = np.column_stack([np.broadcast_to(np.asarray(
+                params[c] if c in overrides else outputs[c], dtype=float), len(frame)) for c in columns])
+            rows = [tuple(r) + (rowid,) for r, rowid in zip(data.tolist(), frame["rowid"].tolist())]
+            with self._conn:
+                self._conn.executemany(
+                    f"UPDATE analyses SET {', '.join(f'{c} = ?' for c in columns)} WHERE rowid = ?", rows
+                )
+        return len(frame)
+
+    def sync_globals(self, **current):
+        """Recalculate everything if the global parameters changed since last time
+
+        Returns the number of recalculated analyses (0 if nothing changed).
+        """
+        with self._lock:
+            stored = dict(self._conn.execute("SELECT key, value FROM settings").fetchall())
+        changed = {k: v for k, v in current.items() if stored.get(k) != float(v)}
+        if not changed:
+            return 0
+        # Prvo pokretanje samo zapamti vrijednosti - postojeće analize ostaju kakve jesu
+        count = self.recalculate(**changed) if stored else 0
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
+                                   [(k, float(v)) for k, v in current.items()])
+        return count
+
+    def close(self):
+        self._conn.close()
@@ -5,6 +5,22 @@ import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
 import numpy as np
+import os
+
+import fx
+from analysis_store import AnalysisStore
+from ledger import (AGING_BUCKETS, customer_metrics, customer_parameters, load_ledger, pricing_customer_types,
+                    sales_weighted_dso)
+from precompute import Precomputer
+from pricing_rules import get_rules
+from receivables import ReceivablesBook
+from reports import customer_bundle, customer_results
+from profitability import (CASH_FLOW_MODEL, CASH_FLOW_SCENARIOS, CUSTOMER_COSTS, CUSTOMER_MODEL, MONTHS,
+                           cash_flow_params, customer_params, profit_status)
+from query import EXAMPLE_QUERIES, QueryEngine, pricing_table
+from ranking import leaderboard, score
+from scenarios import Scenario, ScenarioEngine
+from watcher import SourceWatcher
 
 # ---------- KONFIGURACIJA ----------
 st.set_page_config(
@@ -18,49 +34,91 @@ if 'current_page' not in st.session_state:
     st.session_state.current_page = 'dashboard'
 
 # ---------- KONSTANTE ----------
-SUPPLIER_TERMS = 60  # Plaćanje dobavljačima za 60 dana
-ANNUAL_INTEREST = 0.08  # 8% godišnje
-MONTHLY_STORAGE = 0.005  # 0.5% mjesečno
+# Pragovi, multiplikatori i granice cijena dolaze iz pricing_rules.json
+RULES = get_rules()
+SUPPLIER_TERMS = RULES.supplier_terms  # Plaćanje dobavljačima (dani)
+ANNUAL_INTEREST = RULES.annual_interest  # Godišnja kamata
+MONTHLY_STORAGE = RULES.rules_for()["monthly_storage"]  # Mjesečni trošak skladištenja
 COMMISSION_RATE = 0.03  # 3% provizija prodavača
 LOGISTICS_RATE = 0.015  # 1.5% logistika
+MAX_CUSTOMER_AMOUNT = 1_000_000_000.0  # Gornja granica prodaje/troška u analizi kupca (KM)
+
+# Izvori zaliha (CSV/Parquet fajlovi ili folderi, odvojeni sa os.pathsep)
+PRODUCT_SOURCES = [s for s in os.environ.get("PRODUCT_SOURCES", "").split(os.pathsep) if s]
+SOURCE_WATCH_INTERVAL = 2.0  # sekunde između provjera izvora
+
+# Knjiga faktura i uplata za stvarni DSO kupaca (CSV fajlovi)
+LEDGER_INVOICES = os.environ.get("LEDGER_INVOICES")
+LEDGER_PAYMENTS = os.environ.get("LEDGER_PAYMENTS")
+# Knjiga otvorenih potraživanja (receivables.py roll), inače se gradi iz knjige faktura
+RECEIVABLES_BOOK = os.environ.get("RECEIVABLES_BOOK")
+
+# Početne vrijednosti widgeta - za njih (i nedavno korištene) precompute.py računa unaprijed
+DASHBOARD_DEFAULTS = (83, 60, 8.0)  # DSO, rok dobavljača, kamata (%)
+CASH_FLOW_DEFAULTS = {"monthly_sales": 100000, "growth": 10, "dso": 90, "dpo": 60, "dio": 120,
+                      "cogs": 70, "fixed_costs": 20000, "starting_cash": 50000}
+TABLE_PAGE_SIZE = 500  # redova tabele preporuka po stranici
+DETAIL_ROWS = 20  # artikala po statusu u detaljnim preporukama
+SALES_REP_SORTS = {
+    "Prodaja (visoka → niska)": ("Prodaja", True),
+    "Marža (visoka → niska)": ("Marža", True),
+    "DSO (niska → visoka)": ("DSO", False),
+}
+
+# Stranice u top navigaciji (ključ, natpis)
+NAV_PAGES = [
+    ('dashboard', "📊 DASHBOARD"),
+    ('customer_analytics', "👥 ANALIZA KUPCA"),
+    ('price_calculator', "🧮 KALKULATOR"),
+    ('cash_flow', "💰 CASH FLOW"),
+    ('sales_analytics', "📈 PRODAJNA ANALIZA"),
+]
+
+# Oznake statusa u aplikaciji (isti redoslijed kao pricing_rules.STATUSES)
+STATUS_LABELS = ["✅ POVEĆAJ CIJENU", "🟡 ODRŽI CIJENU", "⚠️ SNIŽI CIJENU", "🚨 HITNO PRODAJ"]
 
 # ---------- KLASE ----------
 class Product:
     """Klasa za proizvod"""
-    def __init__(self, name, cost_price, selling_price, days_in_stock, quantity=1, category="General"):
+    def __init__(self, name, cost_price, selling_price, days_in_stock, quantity=1, category="General",
+                 currency=fx.BASE):
         self.name = name
         self.cost_price = cost_price
         self.selling_price = selling_price
         self.days_in_stock = days_in_stock
         self.quantity = quantity
         self.category = category
+        self.currency = currency  # cijene artikla su u ovoj valuti
     
     def calculate_storage_cost(self):
         """Računa trošak skladištenja"""
         months = self.days_in_stock / 30
-        return self.cost_price * MONTHLY_STORAGE * months * self.quantity
+        monthly_rate = RULES.rules_for(self.category)["monthly_storage"]
+        return self.cost_price * monthly_rate * months * self.quantity
+    
+    def status_index(self):
+        """0 = svježe ... 3 = mrtva roba (pragovi iz pravila kategorije)"""
+        return RULES.status_index(self.days_in_stock, self.category)
     
     def get_inventory_status(self):
         """Vraća status zaliha"""
-        if self.days_in_stock > 180:
-            return "🚨 HITNO PRODAJ"
-        elif self.days_in_stock > 90:
-            return "⚠️ SNIŽI CIJENU"
-        elif self.days_in_stock > 30:
-            return "🟡 ODRŽI CIJENU"
-        else:
-            return "✅ POVEĆAJ CIJENU"
+        return STATUS_LABELS[self.status_index()]
     
     def get_recommended_action(self):
         """Vraća preporuku za akciju"""
-        if self.days_in_stock > 180:
-            return f"Prodaj po {self.cost_price * 0.95:.2f} KM (5% gubitak)"
-        elif self.days_in_stock > 90:
-            return f"Popust 10-15% - prodaj po {self.selling_price * 0.85:.2f} KM"
-        elif self.days_in_stock > 30:
-            return f"Drži cijenu {self.selling_price:.2f} KM"
+        status = self.status_index()
+        if status == 3:
+            quote = RULES.quote(self.cost_price, self.days_in_stock, self.category)
+            if not np.isfinite(quote.cap):  # kategorija bez gornje granice za mrtvu robu
+                return f"Prodaj odmah po {quote.price:.2f} {self.currency}"
+            loss = (1 - quote.cap / self.cost_price) * 100 if self.cost_price > 0 else 0.0
+            return f"Prodaj po {quote.cap:.2f} {self.currency}" + (f" ({loss:.0f}% gubitak)" if loss > 0 else "")
+        elif status == 2:
+            return f"Popust 10-15% - prodaj po {self.selling_price * 0.85:.2f} {self.currency}"
+        elif status == 1:
+            return f"Drži cijenu {self.selling_price:.2f} {self.currency}"
         else:
-            return f"Povečaj za 5-10% - na {self.selling_price * 1.08:.2f} KM"
+            return f"Povečaj za 5-10% - na {self.selling_price * 1.08:.2f} {self.currency}"
 
 # ---------- POMOĆNE FUNKCIJE ----------
 def load_sample_products():
@@ -78,57 +136,289 @@ def load_sample_products():
         Product("Kuke sigurnosne", 8.20, 12.30, 15, 300, "Skele"),
     ]
 
-def calculate_dynamic_price(cost, days_old, dso, supplier_terms=60):
+def load_sales_data():
+    """Primjer podataka o prodaji - u praksi bi se ovo učitavalo iz baze"""
+    return {
+        'Prodavači': [
+            {'Ime': 'Marko Marković', 'Prodaja': 580_000, 'Marža': 35.2, 
+             'Broj narudžbi': 42, 'Prosječna narudžba': 13_810, 'DSO': 68,
+             'Regija': 'Sarajevo', 'Kanali': ['Direktno', 'Distributer']},
+            {'Ime': 'Ana Anić', 'Prodaja': 420_000, 'Marža': 38.1,
+             'Broj narudžbi': 65, 'Prosječna narudžba': 6_462, 'DSO': 52,
+             'Regija': 'Mostar', 'Kanali': ['Direktno']},
+            {'Ime': 'Ivan Ivanić', 'Prodaja': 250_000, 'Marža': 28.7,
+             'Broj narudžbi': 31, 'Prosječna narudžba': 8_065, 'DSO': 95,
+             'Regija': 'Banja Luka', 'Kanali': ['Distributer', 'Online']},
+        ],
+        'Regije': [
+            {'Regija': 'Sarajevo', 'Prodaja': 850_000, 'Rast': 22.5,
+             'Prosječna marža': 34.2, 'Broj kupaca': 28, 'Top proizvod': 'Skele'},
+            {'Regija': 'Mostar', 'Prodaja': 620_000, 'Rast': 15.3,
+             'Prosječna marža': 36.1, 'Broj kupaca': 19, 'Top proizvod': 'Oplata'},
+            {'Regija': 'Banja Luka', 'Prodaja': 580_000, 'Rast': 31.2,
+             'Prosječna marža': 32.7, 'Broj kupaca': 22, 'Top proizvod': 'Sigurnost'},
+            {'Regija': 'Tuzla', 'Prodaja': 400_000, 'Rast': 8.7,
+             'Prosječna marža': 29.5, 'Broj kupaca': 18, 'Top proizvod': 'Pribor'},
+        ],
+        'Kanali': [
+            {'Kanal': 'Direktna prodaja', 'Prodaja': 850_000, 'Marža': 34.5,
+             'Trošak prodaje %': 12.3, 'Broj kupaca': 45},
+            {'Kanal': 'Distributeri', 'Prodaja': 600_000, 'Marža': 28.7,
+             'Trošak prodaje %': 8.5, 'Broj kupaca': 32},
+            {'Kanal': 'Iznajmljivanje', 'Prodaja': 300_000, 'Marža': 52.1,
+             'Trošak prodaje %': 15.8, 'Broj kupaca': 28},
+            {'Kanal': 'Online', 'Prodaja': 150_000, 'Marža': 41.3,
+             'Trošak prodaje %': 10.2, 'Broj kupaca': 65},
+        ]
+    }
+
+def products_from_frame(df):
+    """Pretvara tabelu proizvoda u Product objekte (bez kolone valute sve je u KM)"""
+    currencies = fx.normalize(df["currency"]) if "currency" in df else [fx.BASE] * len(df)
+    return [
+        Product(name, float(cost), float(price), int(days), int(quantity), category, currency)
+        for name, cost, price, days, quantity, category, currency in zip(
+            df["name"], df["cost"], df["price"], df["days"], df["quantity"], df["category"], currencies)
+    ]
+
+def products_to_frame(products):
+    """Standardna tabela proizvoda (naziv služi kao id)"""
+    return pd.DataFrame({
+        "id": [p.name for p in products],
+        "name": [p.name for p in products],
+        "category": [p.category for p in products],
+        "cost": [p.cost_price for p in products],
+        "price": [p.selling_price for p in products],
+        "days": [p.days_in_stock for p in products],
+        "quantity": [p.quantity for p in products],
+        "currency": [p.currency for p in products],
+    })
+
+def load_fx_rates():
+    """Današnji kursevi (fx kešira po datumu); bez fajla kurseva samo KM"""
+    try:
+        return fx.rates_on()
+    except (OSError, ValueError):
+        return {fx.BASE: 1.0}
+
+@st.cache_resource
+def get_source_watcher():
+    """Jedan watcher po serveru - dijele ga sve sesije"""
+    if not PRODUCT_SOURCES:
+        return None
+    return SourceWatcher(PRODUCT_SOURCES, interval=SOURCE_WATCH_INTERVAL).start()
+
+@st.cache_data(max_entries=8)
+def _products_for(token, _df):
+    return products_from_frame(_df)
+
+def load_products():
+    """Vraća (token podataka, proizvodi) - iz izvora ako su podešeni"""
+    watcher = get_source_watcher()
+    if watcher is None:
+        return None, load_sample_products()
+    token, df = watcher.snapshot()
+    return token, _products_for(token, df)
+
+@st.cache_resource
+def get_scenario_engine(model):
+    """Šta ako engine sa memoizacijom, dijeli se između sesija"""
+    return ScenarioEngine({"customer": CUSTOMER_MODEL, "cash_flow": CASH_FLOW_MODEL}[model])
+
+@st.cache_data(max_entries=4)
+def _customer_metrics(invoices_path, payments_path, version):
+    invoices, payments = load_ledger(invoices_path, payments_path)
+    return customer_metrics(invoices, payments)
+
+def load_customer_metrics():
+    """DSO i historija plaćanja po kupcu iz knjige (None ako knjiga nije podešena)"""
+    if not (LEDGER_INVOICES and LEDGER_PAYMENTS):
+        return None
+    try:
+        # Keš se obnavlja kada se fajlovi promijene
+        version = tuple(os.stat(p).st_mtime_ns for p in (LEDGER_INVOICES, LEDGER_PAYMENTS))
+        return _customer_metrics(LEDGER_INVOICES, LEDGER_PAYMENTS, version)
+    except (OSError, ValueError) as e:
+        st.warning(f"Knjiga faktura nije učitana: {e}")
+        return None
+
+@st.cache_data(max_entries=8)
+def customer_report_zip(customer_name, period, params, ledger_metrics=None):
+    """Paket izvještaja (Parquet + HTML grafikoni) za jednu analizu kupca"""
+    results, cash_flow = customer_results(pd.DataFrame([{'customer': customer_name, 'period': period, **params}]))
+    return customer_bundle(results.iloc[0], {k: v[0] for k, v in cash_flow.items()}, metrics=ledger_metrics).to_bytes()
+
+@st.cache_data(max_entries=2)
+def _receivables_book(path, invoices_path, payments_path, version):
+    if path:
+        return ReceivablesBook.load(path)
+    invoices, payments = load_ledger(invoices_path, payments_path)
+    return ReceivablesBook.from_ledger(invoices, payments)
+
+def load_receivables_book():
+    """Otvorena potraživanja (None ako nisu podešena)"""
+    paths = [RECEIVABLES_BOOK] if RECEIVABLES_BOOK else [LEDGER_INVOICES, LEDGER_PAYMENTS]
+    if not all(paths):
+        return None
+    try:
+        version = tuple(os.stat(p).st_mtime_ns for p in paths)
+        return _receivables_book(RECEIVABLES_BOOK, LEDGER_INVOICES, LEDGER_PAYMENTS, version)
+    except (OSError, ValueError) as e:
+        st.warning(f"Potraživanja nisu učitana: {e}")
+        return None
+
+@st.cache_resource
+def get_analysis_store():
+    """Sačuvane analize; preračunaju se ako su se kamata ili rok dobavljača promijenili"""
+    store = AnalysisStore()
+    store.sync_globals(interest_rate=ANNUAL_INTEREST, supplier_terms=SUPPLIER_TERMS)
+    return store
+
+@st.fragment(run_every=SOURCE_WATCH_INTERVAL)
+def watch_for_updates(token):
+    """Osvježi stranicu kada watcher učita nove podatke"""
+    watcher = get_source_watcher()
+    if watcher is not None and watcher.token != token:
+        st.rerun()
+
+def age_band_labels(category=None):
+    """Opisi starosnih razreda, npr. ['≤30', '31-90', '91-180', '>180']"""
+    t = RULES.rules_for(category)["thresholds"]
+    return [f"≤{t[0]}", f"{t[0] + 1}-{t[1]}", f"{t[1] + 1}-{t[2]}", f">{t[2]}"]
+
+def calculate_dynamic_price(cost, days_old, dso, supplier_terms=SUPPLIER_TERMS,
+                            annual_interest=ANNUAL_INTEREST, category=None):
     """Računa dinamičku cijenu"""
-    if days_old > 180:
-        base = cost * 0.95
-    elif days_old > 90:
-        base = cost * 1.10
-    elif days_old > 30:
-        base = cost * 1.25
+    return RULES.quote(cost, days_old, category, dso, supplier_terms, annual_interest).price
+
+def _price_inventory(_products, dso, supplier_terms, interest_rate):
+    """Tabela preporuka za cijeli katalog (marže su brojevi - format tek pri prikazu)"""
+    cost = np.array([p.cost_price for p in _products], dtype=float)
+    current = np.array([p.selling_price for p in _products], dtype=float)
+    quantity = np.array([p.quantity for p in _products], dtype=np.int64)
+    days = np.array([p.days_in_stock for p in _products], dtype=np.int32)
+    quote = RULES.price(cost, days, [p.category for p in _products],
+                        dso, supplier_terms, interest_rate)
+    rec_price = quote["price"]
+    current_margin = (current - cost) / cost * 100
+    recommended_margin = (rec_price - cost) / cost * 100
+    
+    return pd.DataFrame({
+        "Proizvod": [p.name for p in _products],
+        "Valuta": pd.Categorical([p.currency for p in _products]),
+        "Nabavna": cost.astype(np.float32),
+        "Trenutna": current.astype(np.float32),
+        "Trenutna marža": current_margin.astype(np.float32),
+        "Preporučeno": rec_price.round(2),  # ide u SQL tabelu i vrijednost - float64
+        "Preporučena marža": recommended_margin.astype(np.float32),
+        "Starost": days,
+        # Tekst preporuke (Preporuka) dodaje show_pricing_table samo za prikazane redove
+        "Status": pd.Categorical.from_codes(quote["status"], STATUS_LABELS),
+        "Količina": quantity.astype(np.int32),
+        "Vrijednost": (quantity * rec_price).round(2)
+    })
+
+def splice_pricing(old, old_ids, df, affected, params):
+    """Pricing table for new data `df`, reusing rows of `old` for unchanged ids
+
+    Only products whose ids are in `affected` (or new) are priced again;
+    rows follow the order of `df`, as if the whole catalogue was priced.
+    """
+    ids = df["id"]
+    old_pos = pd.Index(old_ids).get_indexer(ids)
+    stale = (ids.isin(affected) | (old_pos < 0)).to_numpy()
+    kept = old.iloc[old_pos[~stale]].set_axis(np.flatnonzero(~stale))
+    fresh = _price_inventory(products_from_frame(df[stale]), *params).set_axis(np.flatnonzero(stale))
+    result = pd.concat([kept, fresh]).sort_index().reset_index(drop=True)
+    result["Valuta"] = result["Valuta"].astype("category")
+    result["Status"] = pd.Categorical(result["Status"], STATUS_LABELS)
+    return result
+
+# Format kolona tabele preporuka (podaci ostaju brojevi, pa sortiranje radi ispravno)
+PRICING_COLUMNS = {
+    "Nabavna": st.column_config.NumberColumn(format="%.2f"),
+    "Trenutna": st.column_config.NumberColumn(format="%.2f"),
+    "Trenutna marža": st.column_config.NumberColumn(format="%.1f%%"),
+    "Preporučeno": st.column_config.NumberColumn(format="%.2f"),
+    "Preporučena marža": st.column_config.NumberColumn(format="%.1f%%"),
+}
+
+def price_inventory(token, products, dso, supplier_terms, interest_rate):
+    """Tabela preporuka - iz pozadinskog keša po verziji podataka i parametrima"""
+    return get_precomputer().result("pricing", token, (dso, supplier_terms, interest_rate), products)
+
+def default_seasonal_factor(month):
+    if month in ['Jan', 'Feb', 'Dec']:
+        return 0.7  # Zima
+    if month in ['Jun', 'Jul', 'Avg']:
+        return 1.3  # Ljeto
+    return 1.0  # Proljeće/jesen
+
+def cash_flow_projection(engine, open_collections, monthly_sales, growth_rate, seasonal_factors, dso, dpo, dio,
+                         cogs_percentage, fixed_costs, starting_cash):
+    """Projekcija za 12 mjeseci i tabela šta ako scenarija: (osnova, poređenje)"""
+    params = cash_flow_params(monthly_sales, growth_rate, seasonal_factors, dso, dpo, dio, cogs_percentage,
+                              fixed_costs, starting_cash, ANNUAL_INTEREST, open_collections)
+    base, _ = engine.run(params, [])
+    # Svi scenariji u jednoj seriji; ponovo se računa samo ono što zavisi od promjene
+    outputs = ['min_cash', 'ccc', 'receivables_financing', 'inventory_capital']
+    return base, engine.compare(params, CASH_FLOW_SCENARIOS, outputs)
+
+def sales_rep_table(reps, sort_option):
+    """Prodavači sortirani po izabranoj opciji"""
+    column, descending = SALES_REP_SORTS[sort_option]
+    return pd.DataFrame(sorted(reps, key=lambda x: x[column], reverse=descending))
+
+@st.cache_resource
+def get_precomputer():
+    """Pozadinski worker za teške prikaze - jedan po serveru, dijele ga sve sesije"""
+    pre = Precomputer()
+    d = CASH_FLOW_DEFAULTS
+    pre.register("pricing", _price_inventory, [(DASHBOARD_DEFAULTS[0], DASHBOARD_DEFAULTS[1], DASHBOARD_DEFAULTS[2] / 100)])
+    engine = get_scenario_engine("cash_flow")
+    pre.register("cash_flow", lambda open_collections, *args: cash_flow_projection(engine, open_collections, *args),
+                 [(d["monthly_sales"], d["growth"] / 100, tuple(default_seasonal_factor(m) for m in MONTHS),
+                   d["dso"], d["dpo"], d["dio"], d["cogs"] / 100, d["fixed_costs"], d["starting_cash"])])
+    pre.register("sales_reps", sales_rep_table, [(option,) for option in SALES_REP_SORTS])
+    
+    pre.refresh("cash_flow", None, lambda: None)
+    pre.refresh("sales_reps", None, lambda: load_sales_data()['Prodavači'])
+    watcher = get_source_watcher()
+    if watcher is None:
+        pre.refresh("pricing", None, load_sample_products)
     else:
-        base = cost * 1.50
-    
-    # Finansijska prilagodba
-    cash_gap = max(dso - supplier_terms, 0)
-    financing = base * (ANNUAL_INTEREST / 365) * cash_gap
-    
-    return max(base - financing, cost * 0.90)  # Ne ispod 90% nabavne
+        last = {}
+        def on_reload(changed, affected):
+            token, df = watcher.snapshot()
+            if last:
+                # Keširane cijene stare verzije: ponovo se računaju samo artikli iz promijenjenih fajlova
+                pre.carry_over("pricing", last["token"], token,
+                               lambda old, params: splice_pricing(old, last["ids"], df, affected, params))
+            last.update(token=token, ids=df["id"])
+            pre.refresh("pricing", token, lambda: products_from_frame(df))
+        watcher.add_listener(on_reload)
+        on_reload((), set())
+    return pre
+
+def show_precompute_progress(view, token, params):
+    """Traka napretka dok pozadinski worker još računa ovaj prikaz"""
+    pre = get_precomputer()
+    done, total = pre.progress(view, token)
+    if done < total and not pre.ready(view, token, params):
+        st.progress(done / total, text=f"⏳ Priprema u pozadini ({done}/{total})...")
 
 # ---------- TOP NAVIGACIJA ----------
+def navigate(page):
+    """on_click: promjena stranice se primijeni prije sljedećeg renderovanja, bez st.rerun()"""
+    st.session_state.current_page = page
+
 def show_top_navigation():
     """Prikazuje top navigaciju sa 5 kartica"""
-    col1, col2, col3, col4, col5 = st.columns(5)
-    
-    with col1:
-        if st.button("📊 DASHBOARD", use_container_width=True, 
-                    type="primary" if st.session_state.current_page == 'dashboard' else "secondary"):
-            st.session_state.current_page = 'dashboard'
-            st.rerun()
-    
-    with col2:
-        if st.button("👥 ANALIZA KUPCA", use_container_width=True,
-                    type="primary" if st.session_state.current_page == 'customer_analytics' else "secondary"):
-            st.session_state.current_page = 'customer_analytics'
-            st.rerun()
-    
-    with col3:
-        if st.button("🧮 KALKULATOR", use_container_width=True,
-                    type="primary" if st.session_state.current_page == 'price_calculator' else "secondary"):
-            st.session_state.current_page = 'price_calculator'
-            st.rerun()
-    
-    with col4:
-        if st.button("💰 CASH FLOW", use_container_width=True,
-                    type="primary" if st.session_state.current_page == 'cash_flow' else "secondary"):
-            st.session_state.current_page = 'cash_flow'
-            st.rerun()
-    
-    with col5:
-        if st.button("📈 PRODAJNA ANALIZA", use_container_width=True,
-                    type="primary" if st.session_state.current_page == 'sales_analytics' else "secondary"):
-            st.session_state.current_page = 'sales_analytics'
-            st.rerun()
+    for col, (page, label) in zip(st.columns(len(NAV_PAGES)), NAV_PAGES):
+        with col:
+            st.button(label, use_container_width=True,
+                      type="primary" if st.session_state.current_page == page else "secondary",
+                      on_click=navigate, args=(page,))
     
     st.markdown("---")
 
@@ -141,109 +431,180 @@ def show_dashboard():
     st.title("💰 Dinamičke cijene")
     st.markdown("**Sistem za analizu profitabilnosti i upravljanje gotovinskim tokom**")
     
-    # DSO UNOS - sada na glavnoj strani
+    # Učitaj proizvode
+    token, products = load_products()
+    if token is not None:
+        watch_for_updates(token)
+    
+    # Parametri, tabela i metrike se osvježavaju zasebno (fragment)
+    show_pricing_panel(token, products)
+    
+    # DETALJNA PREPORUKA ZA SVAKI STATUS
+    st.markdown("---")
+    st.subheader("🎯 Detaljne preporuke")
+    
+    t_fresh, t_normal, t_slow = RULES.rules_for()["thresholds"]
+    headers = [
+        (3, f"### 🚨 HITNO PRODAJ (>{t_slow} dana)"),
+        (2, f"### ⚠️ SNIŽI CIJENU ({t_normal + 1}-{t_slow} dana)"),
+        (1, f"### 🟡 ODRŽI CIJENU ({t_fresh + 1}-{t_normal} dana)"),
+        (0, f"### ✅ POVEĆAJ CIJENU (≤{t_fresh} dana)"),
+    ]
+    codes = product_status_codes(products)
+    for col, (status, header) in zip(st.columns(4), headers):
+        with col:
+            st.markdown(header)
+            show_status_details(products, np.flatnonzero(codes == status))
+    
+    # SQL UPITI
+    st.markdown("---")
+    show_query_box(token, products)
+
+def product_status_codes(products):
+    """Status (0 = svježe ... 3 = mrtva roba) za sve proizvode odjednom"""
+    return RULES.status_codes([p.days_in_stock for p in products],
+                              RULES.category_codes([p.category for p in products]))
+
+def show_status_details(products, indices):
+    """Preporuke za prvih DETAIL_ROWS artikala statusa - tekst se pravi samo za njih"""
+    if len(indices) == 0:
+        st.write("✓ Nema artikala u ovoj kategoriji")
+        return
+    for i in indices[:DETAIL_ROWS]:
+        p = products[i]
+        st.write(f"• **{p.name}**: {p.get_recommended_action()}")
+    if len(indices) > DETAIL_ROWS:
+        st.caption(f"... i još {len(indices) - DETAIL_ROWS} artikala")
+
+def show_pricing_table(df, products):
+    """Tabela preporuka po stranicama; tekst preporuke se formatira samo za prikazanu stranicu"""
+    pages = max(1, -(-len(df) // TABLE_PAGE_SIZE))
+    page = 1
+    if pages > 1:
+        page = st.number_input(f"Stranica (od {pages})", 1, pages, 1, key="pricing_page")
+    start = (page - 1) * TABLE_PAGE_SIZE
+    view = df.iloc[start:start + TABLE_PAGE_SIZE].copy()
+    view.insert(view.columns.get_loc("Status") + 1, "Preporuka",
+                [p.get_recommended_action() for p in products[start:start + TABLE_PAGE_SIZE]])
+    st.dataframe(view, use_container_width=True, column_config=PRICING_COLUMNS)
+
+def dashboard_inputs():
+    """Trenutne vrijednosti slidera sa dashboarda (dso, rok dobavljača, kamata)"""
+    return (st.session_state.dashboard_dso, st.session_state.dashboard_terms,
+            st.session_state.dashboard_interest / 100)
+
+@st.fragment
+def show_pricing_panel(token, products):
+    """Parametri, tabela cijena i sumarni pregled - slider pokreće samo ovaj dio"""
+    # DSO UNOS - sada na glavnoj strani (početna vrijednost iz knjige faktura, ako postoji)
+    metrics = load_customer_metrics()
+    ledger_dso = sales_weighted_dso(metrics) if metrics is not None else None
     col1, col2, col3 = st.columns(3)
     with col1:
-        dso = st.slider("Prosječan DSO (dani)", 30, 180, 83, 
-                       help="DSO = Days Sales Outstanding - Prosječan broj dana za naplatu")
+        st.slider("Prosječan DSO (dani)", 30, 180,
+                  DASHBOARD_DEFAULTS[0] if ledger_dso is None else int(np.clip(round(ledger_dso), 30, 180)),
+                  help="DSO = Days Sales Outstanding - Prosječan broj dana za naplatu"
+                       + ("" if ledger_dso is None else " (izračunat iz knjige faktura i uplata)"),
+                  key="dashboard_dso")
     
     with col2:
-        supplier_terms = st.slider("Rok plaćanja dobavljačima", 30, 120, 60)
+        st.slider("Rok plaćanja dobavljačima", 30, 120, DASHBOARD_DEFAULTS[1], key="dashboard_terms")
     
     with col3:
-        interest_rate = st.slider("Kamatna stopa (%)", 1.0, 20.0, 8.0, 0.1) / 100
+        st.slider("Kamatna stopa (%)", 1.0, 20.0, DASHBOARD_DEFAULTS[2], 0.1, key="dashboard_interest")
     
-    # Učitaj proizvode
-    products = load_sample_products()
+    rates = load_fx_rates()
+    currency = st.selectbox("Valuta izvještaja", list(rates), index=list(rates).index(fx.BASE),
+                            help="Cijene u tabeli su u valuti artikla, zbirovi se preračunavaju",
+                            key="report_currency")
     
     # Prikaz proizvoda SA PREPORUKAMA
     st.subheader("📦 Analiza zaliha sa preporukama")
     
-    data = []
-    for p in products:
-        rec_price = calculate_dynamic_price(p.cost_price, p.days_in_stock, dso, supplier_terms)
-        current_margin = ((p.selling_price - p.cost_price) / p.cost_price * 100)
-        recommended_margin = ((rec_price - p.cost_price) / p.cost_price * 100)
-        
-        data.append({
-            "Proizvod": p.name,
-            "Nabavna": p.cost_price,
-            "Trenutna": p.selling_price,
-            "Trenutna marža": f"{current_margin:.1f}%",
-            "Preporučeno": round(rec_price, 2),
-            "Preporučena marža": f"{recommended_margin:.1f}%",
-            "Starost": p.days_in_stock,
-            "Status": p.get_inventory_status(),
-            "Preporuka": p.get_recommended_action(),
-            "Količina": p.quantity,
-            "Vrijednost": round(p.quantity * rec_price, 2)
-        })
+    show_precompute_progress("pricing", token, dashboard_inputs())
+    df = price_inventory(token, products, *dashboard_inputs())
+    show_pricing_table(df, products)
     
-    df = pd.DataFrame(data)
-    st.dataframe(df, use_container_width=True)
-    
-    # Sumarni pregled
+    # Sumarni pregled (iznosi preračunati u valutu izvještaja - jedan faktor po valuti)
     st.subheader("📈 Sumarni pregled")
     col1, col2, col3, col4 = st.columns(4)
+    cost = fx.convert(df["Nabavna"], df["Valuta"], currency, rates)
+    current = fx.convert(df["Trenutna"], df["Valuta"], currency, rates)
+    recommended = fx.convert(df["Preporučeno"], df["Valuta"], currency, rates)
     
     with col1:
-        dead_stock = len([p for p in products if p.days_in_stock > 180])
-        dead_value = sum([p.cost_price * p.quantity for p in products if p.days_in_stock > 180])
-        st.metric("Mrtva roba", dead_stock, f"{dead_value:,.0f} KM")
+        dead = (df["Status"].cat.codes == 3).to_numpy()
+        dead_stock = int(dead.sum())
+        dead_value = float(np.dot(cost[dead], df["Količina"].to_numpy()[dead]))
+        st.metric("Mrtva roba", dead_stock, f"{dead_value:,.0f} {currency}")
     
     with col2:
-        total_value = df["Vrijednost"].sum()
-        st.metric("Ukupna vrijednost", f"{total_value:,.0f} KM")
+        total_value = fx.convert(df["Vrijednost"], df["Valuta"], currency, rates).sum()
+        st.metric("Ukupna vrijednost", f"{total_value:,.0f} {currency}")
     
     with col3:
-        avg_discount = ((df["Trenutna"] - df["Preporučeno"]).mean() / df["Trenutna"].mean() * 100)
+        avg_discount = ((current - recommended).mean() / current.mean() * 100)
         st.metric("Prosječna promjena", f"{avg_discount:+.1f}%")
     
     with col4:
-        avg_margin = ((df["Preporučeno"] - df["Nabavna"]).mean() / df["Nabavna"].mean() * 100)
+        avg_margin = ((recommended - cost).mean() / cost.mean() * 100)
         st.metric("Prosječna marža", f"{avg_margin:.1f}%")
     
-    # DETALJNA PREPORUKA ZA SVAKI STATUS
-    st.markdown("---")
-    st.subheader("🎯 Detaljne preporuke")
-    
-    col1, col2, col3, col4 = st.columns(4)
-    
-    with col1:
-        st.markdown("### 🚨 HITNO PRODAJ (>180 dana)")
-        hitno_prodaj = [p for p in products if p.days_in_stock > 180]
-        if hitno_prodaj:
-            for p in hitno_prodaj:
-                st.write(f"• **{p.name}**: {p.get_recommended_action()}")
-        else:
-            st.write("✓ Nema artikala u ovoj kategoriji")
-    
-    with col2:
-        st.markdown("### ⚠️ SNIŽI CIJENU (91-180 dana)")
-        snizi_cijenu = [p for p in products if 90 < p.days_in_stock <= 180]
-        if snizi_cijenu:
-            for p in snizi_cijenu:
-                st.write(f"• **{p.name}**: {p.get_recommended_action()}")
-        else:
-            st.write("✓ Nema artikala u ovoj kategoriji")
-    
-    with col3:
-        st.markdown("### 🟡 ODRŽI CIJENU (31-90 dana)")
-        odrzi_cijenu = [p for p in products if 30 < p.days_in_stock <= 90]
-        if odrzi_cijenu:
-            for p in odrzi_cijenu:
-                st.write(f"• **{p.name}**: {p.get_recommended_action()}")
-        else:
-            st.write("✓ Nema artikala u ovoj kategoriji")
-    
-    with col4:
-        st.markdown("### ✅ POVEĆAJ CIJENU (<30 dana)")
-        povecaj_cijenu = [p for p in products if p.days_in_stock <= 30]
-        if povecaj_cijenu:
-            for p in povecaj_cijenu:
-                st.write(f"• **{p.name}**: {p.get_recommended_action()}")
-        else:
-            st.write("✓ Nema artikala u ovoj kategoriji")
+    show_leaderboard(df, products, currency, rates)
+
+# Skorovi rang liste (ranking.SCORES) i njihovi natpisi
+RANKING_LABELS = {"urgency": "Hitnost (dani × vrijednost)", "margin": "Marža", "profit": "Dobit"}
+
+@st.fragment
+def show_leaderboard(df, products, currency=fx.BASE, rates=None):
+    """Top K artikala po izabranom skoru, ukupno ili po kategoriji (vrijednost i dobit u `currency`)"""
+    with st.expander("🏆 Rang lista", expanded=False):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            score_name = st.selectbox("Skor", list(RANKING_LABELS), format_func=RANKING_LABELS.get,
+                                      key="ranking_score")
+        with col2:
+            k = st.number_input("Broj artikala", 1, 100, 10, key="ranking_k")
+        with col3:
+            by_category = st.checkbox("Po kategoriji", key="ranking_by_category")
+        
+        cost = df["Nabavna"].to_numpy(dtype=float)
+        profit = (df["Preporučeno"].to_numpy() - cost) * df["Količina"].to_numpy()
+        scores = score(score_name, {
+            "days": df["Starost"], "value": fx.convert(df["Vrijednost"], df["Valuta"], currency, rates),
+            "margin": df["Preporučena marža"], "profit": fx.convert(profit, df["Valuta"], currency, rates),
+        })
+        board = leaderboard(df[["Proizvod", "Status", "Starost", "Valuta", "Preporučeno", "Preporučena marža",
+                                "Vrijednost"]],
+                            scores, k, groups=[p.category for p in products] if by_category else None)
+        st.dataframe(board.rename(columns={"Rank": "#", "Group": "Kategorija", "Score": RANKING_LABELS[score_name]}),
+                     use_container_width=True, hide_index=True,
+                     column_config={**PRICING_COLUMNS, RANKING_LABELS[score_name]: st.column_config.NumberColumn(format="%.2f")})
+
+@st.fragment
+def show_query_box(token, products):
+    """Ad-hoc SQL nad tabelama `products` i `pricing`"""
+    with st.expander("🔎 SQL upit nad zalihama i preporukama", expanded=False):
+        example = st.selectbox("Primjer upita", list(EXAMPLE_QUERIES), key="sql_example")
+        sql = st.text_area("SQL", EXAMPLE_QUERIES[example], height=120, key=f"sql_{example}")
+        st.caption("Tabele: `products` (id, name, category, cost, price, days, quantity, currency) i "
+                   "`pricing` (+ recommended_price, status, margin_pct, total_value, "
+                   "total_profit, aging_bucket, margin_band; iznosi u valuti artikla)")
+        
+        if st.button("▶️ Izvrši upit", key="run_sql"):
+            # Iste cijene kao u tabeli (price_inventory je keširan po parametrima)
+            df = price_inventory(token, products, *dashboard_inputs())
+            products_df = products_to_frame(products)
+            engine = QueryEngine({
+                "products": products_df,
+                "pricing": pricing_table(products_df, df["Preporučeno"], df["Status"]),
+            })
+            try:
+                st.dataframe(engine.query(sql), use_container_width=True)
+            except Exception as e:
+                st.error(f"Greška u upitu: {e}")
+            finally:
+                engine.close()
 
 # ---------- ANALIZA KUPCA MODUL ----------
 def show_customer_analytics():
@@ -254,6 +615,26 @@ def show_customer_analytics():
     st.title("👥 Analiza profitabilnosti po kupcu")
     st.markdown("**Izračun stvarne marže i dobiti uz sve troškove**")
     
+    store = get_analysis_store()
+    show_saved_analyses(store)
+    
+    # Stvarni DSO i historija plaćanja iz knjige faktura (ako je podešena)
+    defaults = {"customer_name": "Gradevinar DOO", "customer_dso": 90, "payment_history": 0.85,
+                "total_sales": 50000.0, "total_cost": 35000.0}
+    metrics = load_customer_metrics()
+    if metrics is not None:
+        ledger_customer = st.selectbox("Kupac iz knjige faktura", [None] + list(metrics.index),
+                                       format_func=lambda c: "— unesi ručno —" if c is None else str(c))
+        if ledger_customer is not None:
+            show_customer_ledger(metrics.loc[ledger_customer])
+            ledger_params = customer_parameters(metrics, ledger_customer)
+            # Podrazumijevane vrijednosti moraju biti u granicama polja forme
+            total_sales = float(np.clip(ledger_params["total_sales"], 0.0, MAX_CUSTOMER_AMOUNT))
+            defaults.update(ledger_params, customer_name=str(ledger_customer),
+                            customer_dso=int(np.clip(ledger_params["customer_dso"], 0, 365)),
+                            total_sales=total_sales,
+                            total_cost=round(total_sales * defaults["total_cost"] / defaults["total_sales"], 2))
+    
     # FORMA ZA UNOS PODATAKA
     with st.form("customer_analysis_form"):
         st.subheader("📋 Osnovni podaci o kupcu")
@@ -261,14 +642,14 @@ def show_customer_analytics():
         col1, col2 = st.columns(2)
         
         with col1:
-            customer_name = st.text_input("Naziv kupca", "Gradevinar DOO")
+            customer_name = st.text_input("Naziv kupca", defaults["customer_name"])
             period = st.selectbox("Period analize", ["Mjesečno", "Kvartalno", "Godišnje"])
-            total_sales = st.number_input("Ukupna prodaja (KM)", 0.0, 10000000.0, 50000.0, 100.0)
-            total_cost = st.number_input("Trošak nabavke (KM)", 0.0, 10000000.0, 35000.0, 100.0)
+            total_sales = st.number_input("Ukupna prodaja (KM)", 0.0, MAX_CUSTOMER_AMOUNT, defaults["total_sales"], 100.0)
+            total_cost = st.number_input("Trošak nabavke (KM)", 0.0, MAX_CUSTOMER_AMOUNT, defaults["total_cost"], 100.0)
         
         with col2:
             supplier_terms = st.number_input("Rok plaćanja dobavljačima (dani)", 0, 365, 60)
-            customer_dso = st.number_input("Prosječno trajanje naplate (dani)", 0, 365, 90)
+            customer_dso = st.number_input("Prosječno trajanje naplate (dani)", 0, 365, defaults["customer_dso"])
             commission_rate = st.number_input("Provizija prodavača (%)", 0.0, 100.0, 3.0, 0.1) / 100
             interest_rate = st.number_input("Kamatna stopa finansiranja (%)", 0.0, 50.0, 8.0, 0.1) / 100
         
@@ -286,51 +667,48 @@ def show_customer_analytics():
         
         with col3:
             other_costs = st.number_input("Ostali troškovi (KM)", 0.0, 100000.0, 150.0, 50.0)
-            payment_history = st.slider("Historija plaćanja (%)", 50, 100, 85) / 100
+            payment_history = st.slider("Historija plaćanja (%)", 0, 100,
+                                        int(round(defaults["payment_history"] * 100))) / 100
         
         submitted = st.form_submit_button("🎯 IZRAČUNAJ STVARNU PROFITABILNOST")
     
     if submitted:
+        params = customer_params(total_sales, total_cost, supplier_terms, customer_dso, commission_rate,
+                                 interest_rate, logistics_cost, storage_cost, admin_cost, risk_cost, other_costs)
+        store.save(customer_name, period, params)
+        st.session_state.customer_analysis = (customer_name, period, params)
+        st.session_state.customer_payment_history = payment_history
+    
+    # Analiza ostaje u session_state, pa šta-ako widgeti ne brišu rezultate
+    if 'customer_analysis' in st.session_state:
+        customer_name, period, params = st.session_state.customer_analysis
+        total_sales = params['total_sales']
+        total_cost = params['total_cost']
+        supplier_terms = int(params['supplier_terms'])
+        customer_dso = int(params['customer_dso'])
+        interest_rate = params['interest_rate']
+        
         # IZRAČUN SVIH TROŠKOVA
         st.markdown("---")
-        st.subheader(f"📊 Analiza za: **{customer_name}**")
-        
-        # 1. Osnovna dobit
-        paper_profit = total_sales - total_cost
+        st.subheader(f"📊 Analiza za: **{customer_name}** ({period})")
         
-        # 2. Trošak finansiranja
-        cash_gap_days = max(customer_dso - supplier_terms, 0)
-        financing_cost = total_sales * (interest_rate / 365) * cash_gap_days
+        # Osnova iz modela profitabilnosti (dijeli se sa šta-ako scenarijima)
+        engine = get_scenario_engine("customer")
+        _, base = engine.baseline(params)
         
-        # 3. Provizija prodavača
-        commission_cost = total_sales * commission_rate
-        
-        # 4. Ukupni dodatni troškovi
+        paper_profit = base['paper_profit']
+        cash_gap_days = base['cash_gap']
+        financing_cost = base['financing']
         additional_costs = {
             'financing': financing_cost,
-            'commission': commission_cost,
-            'logistics': logistics_cost,
-            'storage': storage_cost,
-            'administration': admin_cost,
-            'risk': risk_cost,
-            'other': other_costs
+            'commission': base['commission'],
+            **{name: base[name] for name in CUSTOMER_COSTS},
         }
-        
-        total_additional_costs = sum(additional_costs.values())
-        
-        # 5. Stvarna dobit i marža
-        real_profit = paper_profit - total_additional_costs
-        profit_margin = (real_profit / total_sales) * 100 if total_sales > 0 else 0
+        real_profit = base['real_profit']
+        profit_margin = float(base['profit_margin'])
         
         # 6. Status profitabilnosti
-        if profit_margin > 15:
-            status = "🟢 IZVRSNO"
-        elif profit_margin > 8:
-            status = "🟡 DOBRO"
-        elif profit_margin > 0:
-            status = "🟠 SLABO"
-        else:
-            status = "🔴 GUBITAK"
+        status = profit_status(profit_margin)
         
         # PRIKAZ REZULTATA
         col1, col2, col3, col4 = st.columns(4)
@@ -394,6 +772,14 @@ def show_customer_analytics():
             recommendations.append("• **Razmotri prelazak na predračune ili avanse**")
             recommendations.append("  Smanji potrebu za finansiranjem")
         
+        # Loša historija plaćanja: kupac se cijeni po tipu za problematične kupce
+        customer_type = pricing_customer_types([st.session_state.get('customer_payment_history', 1.0)])[0]
+        if pd.notna(customer_type):
+            type_multiplier, type_margin, type_dso = RULES.customer_adjustment(None, customer_type)
+            recommendations.append(f"• **Cijene po tipu kupca '{customer_type}'**")
+            recommendations.append(f"  ×{type_multiplier:.2f}, min. marža {type_margin * 100:.0f}%, "
+                                   f"+{type_dso:.0f} dana DSO u cijeni")
+        
         if not recommendations:
             recommendations.append("• Ovaj kupac je profitabilan - nastavi ovako!")
             recommendations.append("• Razmotri dodatni popust za veće količine")
@@ -401,63 +787,148 @@ def show_customer_analytics():
         for rec in recommendations:
             st.write(rec)
         
-        # ŠTA AKO ANALIZA
+        # ŠTA AKO ANALIZA (fragment - widgeti ne pokreću ostatak stranice)
         st.markdown("---")
         st.subheader("📈 Šta ako analiza")
-        
-        col1, col2, col3 = st.columns(3)
-        
-        with col1:
-            new_dso = st.number_input("Novi rok naplate (dani)", 30, 180, 75, key="new_dso")
-            if new_dso != customer_dso:
-                new_financing = total_sales * (interest_rate / 365) * max(new_dso - supplier_terms, 0)
-                savings = financing_cost - new_financing
-                st.metric("Ušteda na finansiranju", f"{savings:.0f} KM")
-        
-        with col2:
-            discount = st.slider("Popust za brže plaćanje (%)", 0, 20, 3, key="discount")
-            if discount > 0:
-                faster_payment_dso = customer_dso * 0.7  # 30% brže plaćanje
-                new_financing = total_sales * (1 - discount/100) * (interest_rate / 365) * max(faster_payment_dso - supplier_terms, 0)
-                discount_cost = total_sales * (discount/100)
-                net_effect = (financing_cost - new_financing) - discount_cost
-                st.metric(f"Neto efekat {discount}% popusta", f"{net_effect:.0f} KM")
-        
-        with col3:
-            better_terms = st.checkbox("Bolji uvjeti sa dobavljačem (+15 dana)")
-            if better_terms:
-                new_financing = total_sales * (interest_rate / 365) * max(customer_dso - (supplier_terms + 15), 0)
-                savings = financing_cost - new_financing
-                st.metric("Ušteda sa boljim uvjetima", f"{savings:.0f} KM")
+        show_customer_what_if(engine, params)
         
         # EXPORT
         st.markdown("---")
-        if st.button("📥 Export analize u CSV"):
-            export_df = pd.DataFrame([{
-                'Kupac': customer_name,
-                'Period': period,
-                'Prodaja_KM': total_sales,
-                'Nabavka_KM': total_cost,
-                'Papirna_Dobit_KM': paper_profit,
-                'Stvarna_Dobit_KM': real_profit,
-                'Profit_Margin_%': profit_margin,
-                'Status': status,
-                'DSO_Kupca': customer_dso,
-                'Rok_Dobavljaca': supplier_terms,
-                'Finansiranje_KM': additional_costs['financing'],
-                'Provizija_KM': additional_costs['commission']
-            }])
-            
-            csv = export_df.to_csv(index=False, encoding='utf-8-sig')
-            st.download_button(
-                label="Preuzmi CSV",
-                data=csv,
-                file_name=f"analiza_{customer_name}_{datetime.now().strftime('%Y%m%d')}.csv",
-                mime="text/csv"
-            )
+        export_df = pd.DataFrame([{
+            'Kupac': customer_name,
+            'Period': period,
+            'Prodaja_KM': total_sales,
+            'Nabavka_KM': total_cost,
+            'Papirna_Dobit_KM': paper_profit,
+            'Stvarna_Dobit_KM': real_profit,
+            'Profit_Margin_%': profit_margin,
+            'Status': status,
+            'DSO_Kupca': customer_dso,
+            'Rok_Dobavljaca': supplier_terms,
+            'Finansiranje_KM': additional_costs['financing'],
+            'Provizija_KM': additional_costs['commission']
+        }])
+        
+        csv = export_df.to_csv(index=False, encoding='utf-8-sig')
+        st.download_button(
+            label="📥 Export analize u CSV",
+            data=csv,
+            file_name=f"analiza_{customer_name}_{datetime.now().strftime('%Y%m%d')}.csv",
+            mime="text/csv"
+        )
+        ledger_row = metrics.loc[customer_name] if metrics is not None and customer_name in metrics.index else None
+        st.download_button(
+            label="📦 Paket izvještaja (ZIP)",
+            data=customer_report_zip(customer_name, period, params, ledger_row),
+            file_name=f"izvjestaj_{customer_name}_{period}_{datetime.now().strftime('%Y%m%d')}.zip",
+            mime="application/zip"
+        )
     else:
         st.info("🔽 Popunite formu iznad i kliknite 'IZRAČUNAJ' da biste vidjeli analizu")
 
+@st.fragment
+def show_customer_what_if(engine, params):
+    """Šta ako scenariji nad sačuvanom analizom"""
+    customer_dso = int(params['customer_dso'])
+    supplier_terms = int(params['supplier_terms'])
+    
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        new_dso = st.number_input("Novi rok naplate (dani)", 30, 180, 75, key="new_dso")
+    
+    with col2:
+        discount = st.slider("Popust za brže plaćanje (%)", 0, 20, 3, key="discount")
+    
+    with col3:
+        better_terms = st.checkbox("Bolji uvjeti sa dobavljačem (+15 dana)")
+    
+    # Svi scenariji se računaju zajedno nad istom osnovom: (scenarij, natpis, kolona, predznak)
+    what_if = []
+    if new_dso != customer_dso:
+        what_if.append((Scenario(f"Naplata {new_dso} dana", {'customer_dso': new_dso}),
+                        "Ušteda na finansiranju", 'Δ financing', -1))
+    if discount > 0:
+        # Popust ubrzava plaćanje za 30%
+        what_if.append((Scenario(f"Popust {discount}%", {'early_discount': discount / 100, 'dso_factor': 0.7}),
+                        f"Neto efekat {discount}% popusta", 'Δ real_profit', 1))
+    if better_terms:
+        what_if.append((Scenario("Dobavljač +15 dana", {'supplier_terms': supplier_terms + 15}),
+                        "Ušteda sa boljim uvjetima", 'Δ financing', -1))
+    
+    if what_if:
+        scenarios = [scenario for scenario, *_ in what_if]
+        comparison = engine.compare(params, scenarios, ['financing', 'real_profit', 'profit_margin'])
+        for col, (scenario, label, column, sign) in zip(st.columns(len(what_if)), what_if):
+            with col:
+                st.metric(label, f"{sign * comparison.loc[scenario.name, column]:.0f} KM")
+        st.dataframe(comparison.rename(columns={
+            'financing': 'Finansiranje (KM)', 'real_profit': 'Stvarna dobit (KM)', 'profit_margin': 'Marža (%)',
+            'Δ financing': 'Δ Finansiranje', 'Δ real_profit': 'Δ Dobit', 'Δ profit_margin': 'Δ Marža',
+        }).round(1), use_container_width=True)
+
+def show_customer_ledger(row):
+    """Sažetak kupca iz knjige: DSO, historija plaćanja i starost otvorenih faktura"""
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Stvarni DSO", f"{row['dso']:.0f} dana")
+    col2.metric("Plaćeno na vrijeme", f"{row['payment_history'] * 100:.0f}%")
+    col3.metric("Prosječno kašnjenje", f"{row['avg_days_late']:.0f} dana")
+    col4.metric("Otvoreno", f"{row['open_balance']:,.0f} KM")
+    aging = pd.DataFrame({'Starost (dani)': AGING_BUCKETS,
+                          'Otvoreno (KM)': [row[f"open_{b}"] for b in AGING_BUCKETS]})
+    st.plotly_chart(px.bar(aging, x='Starost (dani)', y='Otvoreno (KM)', title="Starost otvorenih faktura",
+                           height=250), use_container_width=True)
+
+def load_saved_analysis(store, key):
+    """Učitaj izabranu analizu u session_state (on_click, bez st.rerun)"""
+    customer, period = st.session_state[key]
+    params = store.load(customer, period)
+    if params is not None:
+        st.session_state.customer_analysis = (customer, period, params)
+
+def recalculate_saved_analyses(store, interest_rate, supplier_terms):
+    """Preračunaj sve sačuvane analize sa novim globalnim parametrima"""
+    count = store.recalculate(interest_rate=interest_rate, supplier_terms=supplier_terms)
+    if 'customer_analysis' in st.session_state:
+        customer, period, _ = st.session_state.customer_analysis
+        params = store.load(customer, period)
+        if params is not None:
+            st.session_state.customer_analysis = (customer, period, params)
+    st.session_state.recalculated_analyses = count
+
+def show_saved_analyses(store):
+    """Lista sačuvanih analiza sa pretragom i grupnim preračunom"""
+    with st.expander(f"💾 Sačuvane analize ({store.count()})"):
+        search = st.text_input("Traži kupca", key="saved_search")
+        saved = store.list(search or None)
+        if len(saved) == 0:
+            st.caption("Nema sačuvanih analiza")
+            return
+        st.dataframe(saved.rename(columns={
+            'customer': 'Kupac', 'period': 'Period', 'updated_at': 'Ažurirano',
+            'total_sales': 'Prodaja (KM)', 'real_profit': 'Stvarna dobit (KM)', 'profit_margin': 'Marža (%)',
+        }).round(1), use_container_width=True, hide_index=True)
+        
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            st.selectbox("Analiza", list(zip(saved['customer'], saved['period'])),
+                         format_func=lambda key: f"{key[0]} - {key[1]}", key="saved_choice")
+        with col2:
+            st.button("📂 Učitaj", on_click=load_saved_analysis, args=(store, "saved_choice"))
+        
+        st.markdown("**Preračun svih analiza sa novim globalnim parametrima**")
+        col1, col2, col3 = st.columns([2, 2, 1])
+        with col1:
+            interest_rate = st.number_input("Kamatna stopa (%)", 0.0, 50.0, ANNUAL_INTEREST * 100, 0.1,
+                                            key="bulk_interest") / 100
+        with col2:
+            supplier_terms = st.number_input("Rok dobavljača (dani)", 0, 365, SUPPLIER_TERMS, key="bulk_terms")
+        with col3:
+            st.button("🔄 Preračunaj sve", on_click=recalculate_saved_analyses,
+                      args=(store, interest_rate, supplier_terms))
+        if 'recalculated_analyses' in st.session_state:
+            st.success(f"Preračunato {st.session_state.pop('recalculated_analyses')} analiza")
+
 # ---------- KALKULATOR MODUL ----------
 def show_price_calculator():
     """Interaktivni kalkulator za određivanje cijena"""
@@ -467,27 +938,37 @@ def show_price_calculator():
     st.title("🧮 Kalkulator dinamičkih cijena")
     st.markdown("**Izračunaj optimalnu cijenu za bilo koji proizvod**")
     
+    show_calculator_form()
+
+
+@st.fragment
+def show_calculator_form():
+    """Unos i rezultat kalkulatora (rerun samo ovog dijela)"""
+    
     # Dva stupca za unos
     col1, col2 = st.columns(2)
     
     with col1:
         st.subheader("📦 Podaci o proizvodu")
-        cost = st.number_input("Nabavna cijena (KM)", 0.0, 100000.0, 100.0, 1.0)
+        # Pravila ne zavise od valute - cijena se računa u valuti unosa
+        currency = st.selectbox("Valuta", list(load_fx_rates()), key="calculator_currency")
+        cost = st.number_input(f"Nabavna cijena ({currency})", 0.0, 100000.0, 100.0, 1.0)
         days = st.number_input("Dana u lageru", 0, 730, 45, 1)
-        current_price = st.number_input("Trenutna cijena (KM)", 0.0, 100000.0, 150.0, 1.0)
+        current_price = st.number_input(f"Trenutna cijena ({currency})", 0.0, 100000.0, 150.0, 1.0)
         quantity = st.number_input("Količina", 1, 10000, 100, 1)
     
     with col2:
         st.subheader("👥 Podaci o kupcu")
         dso = st.slider("DSO kupca (dani)", 30, 180, 90, 1)
         supplier_terms = st.selectbox("Rok plaćanja dobavljačima", [30, 45, 60, 90], index=2)
-        customer_type = st.selectbox("Tip kupca", ["Novi", "Redovan", "VIP", "Problematiční"])
+        customer_type = st.selectbox("Tip kupca", RULES.customer_types[1:])
         interest_rate = st.slider("Kamatna stopa (%)", 1.0, 20.0, 8.0, 0.1) / 100
     
     # GUMB ZA IZRAČUN
     if st.button("🎯 Izračunaj optimalnu cijenu", type="primary"):
         # Izračun
-        rec_price = calculate_dynamic_price(cost, days, dso, supplier_terms)
+        quote = RULES.quote(cost, days, None, dso, supplier_terms, interest_rate, customer_type)
+        rec_price = quote.price
         
         # Rezultati
         st.markdown("---")
@@ -497,7 +978,7 @@ def show_price_calculator():
         col1, col2, col3, col4 = st.columns(4)
         
         with col1:
-            st.metric("Preporučena cijena", f"{rec_price:.2f} KM")
+            st.metric("Preporučena cijena", f"{rec_price:.2f} {currency}")
         
         with col2:
             if current_price > 0:
@@ -506,7 +987,7 @@ def show_price_calculator():
         
         with col3:
             total_value = rec_price * quantity
-            st.metric("Ukupna vrijednost", f"{total_value:,.0f} KM")
+            st.metric("Ukupna vrijednost", f"{total_value:,.0f} {currency}")
         
         with col4:
             profit_per_unit = rec_price - cost
@@ -518,13 +999,13 @@ def show_price_calculator():
         st.subheader("💡 Preporuka")
         
         if rec_price < current_price:
-            st.warning(f"**Smanji cijenu sa {current_price} na {rec_price} KM**")
+            st.warning(f"**Smanji cijenu sa {current_price} na {rec_price} {currency}**")
             st.write(f"- Potrebno je {discount:.1f}% popusta")
-            st.write(f"- Ukupna ušteda za kupca: {(current_price - rec_price) * quantity:.2f} KM")
+            st.write(f"- Ukupna ušteda za kupca: {(current_price - rec_price) * quantity:.2f} {currency}")
         elif rec_price > current_price:
-            st.success(f"**Povečaj cijenu sa {current_price} na {rec_price} KM**")
-            st.write(f"- Možeš dodati {(rec_price - current_price):.2f} KM po komadu")
-            st.write(f"- Dodatni prihod: {(rec_price - current_price) * quantity:.2f} KM")
+            st.success(f"**Povečaj cijenu sa {current_price} na {rec_price} {currency}**")
+            st.write(f"- Možeš dodati {(rec_price - current_price):.2f} {currency} po komadu")
+            st.write(f"- Dodatni prihod: {(rec_price - current_price) * quantity:.2f} {currency}")
         else:
             st.info("**Drži trenutnu cijenu - optimalna je!**")
         
@@ -532,30 +1013,25 @@ def show_price_calculator():
         st.markdown("---")
         st.subheader("🔍 Detaljan izračun")
         
-        # Break down the calculation
-        if days > 180:
-            base = cost * 0.95
-            multiplier_text = "×0.95 (>180 dana)"
-        elif days > 90:
-            base = cost * 1.10
-            multiplier_text = "×1.10 (91-180 dana)"
-        elif days > 30:
-            base = cost * 1.25
-            multiplier_text = "×1.25 (31-90 dana)"
-        else:
-            base = cost * 1.50
-            multiplier_text = "×1.50 (≤30 dana)"
-        
-        cash_gap = max(dso - supplier_terms, 0)
-        financing = base * (interest_rate / 365) * cash_gap
+        # Break down the calculation (iste komponente kao RULES.quote)
+        customer_multiplier, min_margin, dso_extra = RULES.customer_adjustment(None, customer_type)
+        multiplier_text = (f"×{quote.multiplier:.2f} ({age_band_labels()[quote.status]} dana, "
+                           f"tip kupca '{customer_type}' ×{customer_multiplier:.2f})")
+        cash_gap = max(dso + dso_extra - supplier_terms, 0)
+        limit = quote.price - (quote.base - quote.financing - quote.storage)
         
         calculation_data = {
-            'Komponenta': ['Nabavna cijena', 'Osnovni multiplikator', 'Finansiranje', 'Preporučena cijena'],
-            'Vrijednost (KM)': [cost, base - cost, -financing, rec_price],
+            'Komponenta': ['Nabavna cijena', 'Osnovni multiplikator', 'Finansiranje',
+                           'Skladištenje', 'Granica cijene', 'Preporučena cijena'],
+            f'Vrijednost ({currency})': [cost, quote.base - cost, -quote.financing,
+                                -quote.storage, limit, rec_price],
             'Obrazloženje': [
-                f"{cost} KM",
+                f"{cost} {currency}",
                 multiplier_text,
-                f"{cash_gap} dana × {interest_rate*100:.1f}% godišnje",
+                f"{cash_gap:.0f} dana × {interest_rate*100:.1f}% godišnje"
+                + (f" (uklj. +{dso_extra:.0f} dana za tip kupca)" if dso_extra else ""),
+                f"{days} dana × {MONTHLY_STORAGE*100:.1f}% mjesečno",
+                f"Min {quote.floor:.2f} {currency}" + (f" / max {quote.cap:.2f} {currency}" if np.isfinite(quote.cap) else ""),
                 f"Konačna preporuka"
             ]
         }
@@ -565,23 +1041,29 @@ def show_price_calculator():
     
     # Pomoć
     with st.expander("❓ Kako se računa?", expanded=False):
-        st.markdown("""
+        rules = RULES.rules_for()
+        bands = "\n".join(
+            f"           - {label} dana: ×{m:.2f} ({(m - 1) * 100:+.0f}%)"
+            for label, m in zip(age_band_labels(), rules["multipliers"])
+        )
+        st.markdown(f"""
         **Formula dinamičke cijene:**
         
         1. **Osnovni multiplikator** (po starosti):
-           - ≤30 dana: ×1.50 (50% marža)
-           - 31-90 dana: ×1.25 (25% marža)
-           - 91-180 dana: ×1.10 (10% marža)
-           - >180 dana: ×0.95 (5% gubitak)
+{bands}
         
         2. **Trošak finansiranja**:
            - Razlika = DSO kupca - Rok dobavljača
            - Dnevna kamata = Kamatna stopa / 365 dana
            - Finansiranje = Osnovna cijena × Dnevna kamata × Razlika
         
-        **Konačna cijena = Osnovna - Finansiranje**
+        3. **Trošak skladištenja**: Nabavna × {rules["monthly_storage"]*100:.1f}% × mjeseci u lageru
+        
+        **Konačna cijena = Osnovna - Finansiranje - Skladištenje**
         
-        *Cijena neće biti niža od 90% nabavne.*
+        *Cijena ostaje između donje i gornje granice iz `pricing_rules.json`
+        (npr. najmanje {(rules["floors"][0] - 1) * 100:.0f}% marže za svježu robu,
+        mrtva roba između {rules["floors"][3]:.0%} i {rules["caps"][3]:.0%} nabavne).*
         """)
 
 # ---------- CASH FLOW MODUL ----------
@@ -593,89 +1075,81 @@ def show_cash_flow():
     st.title("💰 Cash Flow Management")
     st.markdown("**Predikcija gotovinskog toka i upravljanje likvidnošću**")
     
+    show_cash_flow_planner()
+
+
+@st.fragment
+def show_cash_flow_planner():
+    """Parametri i projekcija - promjena parametra ne ponavlja ostatak stranice"""
+    
+    d = CASH_FLOW_DEFAULTS
     with st.expander("⚙️ Osnovni parametri", expanded=True):
         col1, col2, col3 = st.columns(3)
         
         with col1:
-            monthly_sales = st.number_input("Mjesečna prodaja (KM)", 0, 10000000, 100000, 1000)
-            growth_rate = st.slider("Očekivani rast prodaje (%)", -20, 100, 10, 1) / 100
+            monthly_sales = st.number_input("Mjesečna prodaja (KM)", 0, 10000000, d["monthly_sales"], 1000)
+            growth_rate = st.slider("Očekivani rast prodaje (%)", -20, 100, d["growth"], 1) / 100
         
         with col2:
-            dso = st.number_input("Prosječni DSO (dani)", 0, 365, 90, 5)
-            dpo = st.number_input("Rok dobavljača (dani)", 0, 365, 60, 5)
-            dio = st.number_input("Obrt zaliha (dani)", 30, 365, 120, 10)
+            dso = st.number_input("Prosječni DSO (dani)", 0, 365, d["dso"], 5)
+            dpo = st.number_input("Rok dobavljača (dani)", 0, 365, d["dpo"], 5)
+            dio = st.number_input("Obrt zaliha (dani)", 30, 365, d["dio"], 10)
         
         with col3:
-            cogs_percentage = st.slider("Trošak robe prodaje (%)", 50, 90, 70, 1) / 100
-            fixed_costs = st.number_input("Fiksni troškovi mjesečno (KM)", 0, 500000, 20000, 1000)
-            starting_cash = st.number_input("Početni gotovina (KM)", 0, 1000000, 50000, 5000)
+            cogs_percentage = st.slider("Trošak robe prodaje (%)", 50, 90, d["cogs"], 1) / 100
+            fixed_costs = st.number_input("Fiksni troškovi mjesečno (KM)", 0, 500000, d["fixed_costs"], 1000)
+            starting_cash = st.number_input("Početni gotovina (KM)", 0, 1000000, d["starting_cash"], 5000)
+    
+    # Otvorena potraživanja: stvarna naplata postojećih faktura, ne samo pretpostavka iz DSO
+    book = load_receivables_book()
+    open_collections = None
+    if book is not None:
+        st.subheader("🧾 Otvorena potraživanja")
+        aging = book.aging()
+        cols = st.columns(len(aging) + 1)
+        cols[0].metric("Ukupno otvoreno", f"{aging.sum():,.0f} KM")
+        for col, (bucket, amount) in zip(cols[1:], aging.items()):
+            col.metric(f"{bucket} dana", f"{amount:,.0f} KM")
+        if st.checkbox("Uključi naplatu otvorenih faktura u projekciju", value=True):
+            metrics = load_customer_metrics()
+            open_collections = book.expected_collections(metrics['dso'] if metrics is not None else None)
     
     # Sezonalni faktori
     st.subheader("📅 Sezonalnost prodaje")
     
     seasonal_factors = {}
-    months = ['Jan', 'Feb', 'Mar', 'Apr', 'Maj', 'Jun', 
-              'Jul', 'Avg', 'Sep', 'Okt', 'Nov', 'Dec']
+    months = MONTHS
     
     col1, col2 = st.columns([3, 1])
     
     with col1:
-        for i, month in enumerate(months):
-            if month in ['Jan', 'Feb', 'Dec']:
-                default_val = 0.7  # Zima
-            elif month in ['Jun', 'Jul', 'Avg']:
-                default_val = 1.3  # Ljeto
-            else:
-                default_val = 1.0  # Proljeće/jesen
-            
+        for month in months:
             seasonal_factors[month] = st.slider(
-                f"{month}", 0.3, 2.0, default_val, 0.1,
+                f"{month}", 0.3, 2.0, default_seasonal_factor(month), 0.1,
                 key=f"seasonal_{month}"
             )
     
     
+    # Otvorena potraživanja su "podaci" prikaza: nova knjiga = novo pozadinsko računanje
+    token = None if open_collections is None else tuple(np.round(open_collections, 2))
+    pre = get_precomputer()
+    pre.refresh("cash_flow", token, lambda: open_collections)
+    args = (monthly_sales, growth_rate, tuple(seasonal_factors[m] for m in months),
+            dso, dpo, dio, cogs_percentage, fixed_costs, starting_cash)
+    
     if st.button("📈 Generiši cash flow projekciju", type="primary"):
-        # Generisanje cash flow projekcije
-        cash_flow_data = []
-        current_cash = starting_cash
-        
-        for i, month in enumerate(months):
-            # Izračun prodaje sa sezonalnošću i rastom
-            month_index = i + 1
-            growth_factor = (1 + growth_rate) ** (month_index / 12)
-            seasonal_factor = seasonal_factors[month]
-            
-            monthly_sales_adj = monthly_sales * growth_factor * seasonal_factor
-            
-            # Priljevi (kada stižu novci)
-            cash_in_month = month_index + int(dso / 30)
-            if cash_in_month <= 12:
-                cash_in = monthly_sales_adj
-            else:
-                cash_in = 0
-            
-            # Odljevi (kada se plaća)
-            cogs = monthly_sales_adj * cogs_percentage
-            cash_out_month = month_index + int(dpo / 30)
-            if cash_out_month <= 12:
-                cash_out = cogs + fixed_costs
-            else:
-                cash_out = fixed_costs  # Plaćaš samo fiksne troškove
-            
-            # Mjesečni cash flow
-            monthly_cash_flow = cash_in - cash_out
-            current_cash += monthly_cash_flow
-            
-            cash_flow_data.append({
-                'Mjesec': month,
-                'Prodaja': round(monthly_sales_adj, 0),
-                'Priljevi': round(cash_in, 0),
-                'Odljevi': round(cash_out, 0),
-                'Neto Cash Flow': round(monthly_cash_flow, 0),
-                'Ukupni Cash': round(current_cash, 0)
-            })
+        # Projekcija za 12 mjeseci iz modela gotovinskog toka (obično već izračunata u pozadini)
+        show_precompute_progress("cash_flow", token, args)
+        base, comparison = pre.result("cash_flow", token, args, open_collections)
         
-        df = pd.DataFrame(cash_flow_data)
+        df = pd.DataFrame({
+            'Mjesec': months,
+            'Prodaja': base['sales'],
+            'Priljevi': base['cash_in'],
+            'Odljevi': base['cash_out'],
+            'Neto Cash Flow': base['net_cash_flow'],
+            'Ukupni Cash': base['cash'],
+        }).round(0)
         
         # Metrike
         st.subheader("📊 Cash Flow Metrike")
@@ -760,28 +1234,70 @@ def show_cash_flow():
         # Šta ako scenariji
         st.subheader("📊 Šta ako analiza")
         
+        dso_row, sales_row, inventory_row = (comparison.loc[s.name] for s in CASH_FLOW_SCENARIOS)
+        
         col1, col2, col3 = st.columns(3)
         
         with col1:
-            if st.button("DSO -15 dana", key="dso_button"):
-                new_dso = max(dso - 15, 30)
-                savings = monthly_sales * (ANNUAL_INTEREST / 365) * 15 * 12
-                st.info(f"**Ušteda na finansiranju:**\n{savings:,.0f} KM godišnje")
+            st.info(f"**{CASH_FLOW_SCENARIOS[0].name} - ušteda na finansiranju:**\n"
+                    f"{-dso_row['Δ receivables_financing']:,.0f} KM godišnje")
         
         with col2:
-            if st.button("+20% prodaja", key="sales_button"):
-                additional_cash_needed = monthly_sales * 0.2 * cogs_percentage * (dio / 30)
-                st.info(f"**Dodatni kapital potreban:**\n{additional_cash_needed:,.0f} KM")
+            st.info(f"**{CASH_FLOW_SCENARIOS[1].name} - dodatni kapital potreban:**\n"
+                    f"{sales_row['Δ inventory_capital']:,.0f} KM")
         
         with col3:
-            if st.button("Inventory -20%", key="inventory_button"):
-                freed_capital = monthly_sales * cogs_percentage * 0.2 * (dio / 30)
-                st.info(f"**Oslobođeni kapital:**\n{freed_capital:,.0f} KM")
+            st.info(f"**{CASH_FLOW_SCENARIOS[2].name} - oslobođeni kapital:**\n"
+                    f"{-inventory_row['Δ inventory_capital']:,.0f} KM")
+        
+        st.dataframe(comparison.rename(columns={
+            'min_cash': 'Najniži cash', 'ccc': 'CCC (dani)',
+            'receivables_financing': 'Finansiranje potraživanja', 'inventory_capital': 'Kapital u zalihama',
+            'Δ min_cash': 'Δ Najniži cash', 'Δ ccc': 'Δ CCC',
+            'Δ receivables_financing': 'Δ Finansiranje', 'Δ inventory_capital': 'Δ Kapital u zalihama',
+        }).style.format('{:,.0f}'), use_container_width=True)
     
     else:
         st.info("🔽 Podesi parametre i klikni 'Generiši cash flow projekciju'")
 
 # ---------- PRODAJNA ANALIZA MODUL ----------
+@st.fragment
+def show_sales_rep_table(reps):
+    """Tabela i grafikoni prodavača - promjena sortiranja ne ponavlja ostale tabove"""
+    
+    # Sortiranje opcije
+    sort_option = st.selectbox(
+        "Sortiraj po:",
+        list(SALES_REP_SORTS),
+        key="sort_sales_reps"
+    )
+    
+    # Prikaz tabela (sortiranja priprema pozadinski worker)
+    rep_df = get_precomputer().result("sales_reps", None, (sort_option,), reps)
+    st.dataframe(rep_df.style.format({
+        'Prodaja': '{:,.0f}',
+        'Marža': '{:.1f}%',
+        'Prosječna narudžba': '{:,.0f}',
+        'DSO': '{:.0f}'
+    }), use_container_width=True)
+    
+    # Grafikoni
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        fig1 = px.bar(rep_df, x='Ime', y='Prodaja',
+                     title="Prodaja po prodavaču",
+                     color='Marža',
+                     color_continuous_scale='viridis')
+        st.plotly_chart(fig1, use_container_width=True)
+    
+    with col2:
+        fig2 = px.scatter(rep_df, x='DSO', y='Marža', size='Prodaja',
+                         hover_name='Ime', title="DSO vs Marža",
+                         labels={'DSO': 'Dana za naplatu', 'Marža': 'Marža (%)'})
+        st.plotly_chart(fig2, use_container_width=True)
+
+
 def show_sales_analytics():
     """Sales Analytics Module"""
     
@@ -790,40 +1306,7 @@ def show_sales_analytics():
     st.title("📈 Prodajna analiza")
     st.markdown("**Analiza po prodavaču, regiji i kanalu**")
     
-    # Sample data - u praksi bi se ovo učitavalo iz baze
-    sales_data = {
-        'Prodavači': [
-            {'Ime': 'Marko Marković', 'Prodaja': 580_000, 'Marža': 35.2, 
-             'Broj narudžbi': 42, 'Prosječna narudžba': 13_810, 'DSO': 68,
-             'Regija': 'Sarajevo', 'Kanali': ['Direktno', 'Distributer']},
-            {'Ime': 'Ana Anić', 'Prodaja': 420_000, 'Marža': 38.1,
-             'Broj narudžbi': 65, 'Prosječna narudžba': 6_462, 'DSO': 52,
-             'Regija': 'Mostar', 'Kanali': ['Direktno']},
-            {'Ime': 'Ivan Ivanić', 'Prodaja': 250_000, 'Marža': 28.7,
-             'Broj narudžbi': 31, 'Prosječna narudžba': 8_065, 'DSO': 95,
-             'Regija': 'Banja Luka', 'Kanali': ['Distributer', 'Online']},
-        ],
-        'Regije': [
-            {'Regija': 'Sarajevo', 'Prodaja': 850_000, 'Rast': 22.5,
-             'Prosječna marža': 34.2, 'Broj kupaca': 28, 'Top proizvod': 'Skele'},
-            {'Regija': 'Mostar', 'Prodaja': 620_000, 'Rast': 15.3,
-             'Prosječna marža': 36.1, 'Broj kupaca': 19, 'Top proizvod': 'Oplata'},
-            {'Regija': 'Banja Luka', 'Prodaja': 580_000, 'Rast': 31.2,
-             'Prosječna marža': 32.7, 'Broj kupaca': 22, 'Top proizvod': 'Sigurnost'},
-            {'Regija': 'Tuzla', 'Prodaja': 400_000, 'Rast': 8.7,
-             'Prosječna marža': 29.5, 'Broj kupaca': 18, 'Top proizvod': 'Pribor'},
-        ],
-        'Kanali': [
-            {'Kanal': 'Direktna prodaja', 'Prodaja': 850_000, 'Marža': 34.5,
-             'Trošak prodaje %': 12.3, 'Broj kupaca': 45},
-            {'Kanal': 'Distributeri', 'Prodaja': 600_000, 'Marža': 28.7,
-             'Trošak prodaje %': 8.5, 'Broj kupaca': 32},
-            {'Kanal': 'Iznajmljivanje', 'Prodaja': 300_000, 'Marža': 52.1,
-             'Trošak prodaje %': 15.8, 'Broj kupaca': 28},
-            {'Kanal': 'Online', 'Prodaja': 150_000, 'Marža': 41.3,
-             'Trošak prodaje %': 10.2, 'Broj kupaca': 65},
-        ]
-    }
+    sales_data = load_sales_data()
     
     # TOP METRIKE
     st.subheader("📊 Ukupni pregled")
@@ -858,45 +1341,7 @@ def show_sales_analytics():
     with tab1:
         st.subheader("Analiza po prodavaču")
         
-        # Sortiranje opcije
-        sort_option = st.selectbox(
-            "Sortiraj po:",
-            ["Prodaja (visoka → niska)", "Marža (visoka → niska)", "DSO (niska → visoka)"],
-            key="sort_sales_reps"
-        )
-        
-        # Sortiranje podataka
-        if sort_option == "Prodaja (visoka → niska)":
-            sorted_reps = sorted(sales_data['Prodavači'], key=lambda x: x['Prodaja'], reverse=True)
-        elif sort_option == "Marža (visoka → niska)":
-            sorted_reps = sorted(sales_data['Prodavači'], key=lambda x: x['Marža'], reverse=True)
-        else:
-            sorted_reps = sorted(sales_data['Prodavači'], key=lambda x: x['DSO'])
-        
-        # Prikaz tabela
-        rep_df = pd.DataFrame(sorted_reps)
-        st.dataframe(rep_df.style.format({
-            'Prodaja': '{:,.0f}',
-            'Marža': '{:.1f}%',
-            'Prosječna narudžba': '{:,.0f}',
-            'DSO': '{:.0f}'
-        }), use_container_width=True)
-        
-        # Grafikoni
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            fig1 = px.bar(rep_df, x='Ime', y='Prodaja',
-                         title="Prodaja po prodavaču",
-                         color='Marža',
-                         color_continuous_scale='viridis')
-            st.plotly_chart(fig1, use_container_width=True)
-        
-        with col2:
-            fig2 = px.scatter(rep_df, x='DSO', y='Marža', size='Prodaja',
-                             hover_name='Ime', title="DSO vs Marža",
-                             labels={'DSO': 'Dana za naplatu', 'Marža': 'Marža (%)'})
-            st.plotly_chart(fig2, use_container_width=True)
+        show_sales_rep_table(sales_data['Prodavači'])
         
         # Preporuke za prodavače
         st.subheader("🎯 Preporuke za prodavače")
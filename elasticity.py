@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+# elasticity.py - OPTIMALNA CIJENA UZ ELASTIČNOST POTRAŽNJE
+#
+# Potražnja po SKU: rate(p) = q0 * (p / p0) ** e, gdje je q0 prosječna dnevna
+# prodaja po cijeni p0 iz historije, a e elastičnost kategorije.
+import numpy as np
+import pandas as pd
+
+from pricing_rules import get_rules
+
+DEFAULT_ELASTICITY = -1.5
+ELASTICITY_BOUNDS = (-6.0, -0.2)  # potražnja uvijek pada s cijenom
+MIN_OBSERVATIONS = 8
+HORIZON_DAYS = 90
+GRID_POINTS = 16
+GOLDEN_ITERATIONS = 30
+CHUNK_SIZE = 250_000
+
+HISTORY_COLUMNS = {"id", "date", "price", "quantity"}
+
+
+def load_sales_history(path):
+    """Load sales history (id, date, price, quantity)"""
+    history = pd.read_csv(path, parse_dates=["date"])
+    missing = HISTORY_COLUMNS - set(history.columns)
+    if missing:
+        raise ValueError(f"Historija prodaje nema kolone: {', '.join(sorted(missing))}")
+    return history
+
+
+SUM_COLUMNS = ["n", "log_p", "log_q", "log_p2", "log_pq", "priced_units", "revenue"]
+STAT_COLUMNS = SUM_COLUMNS + ["first", "last"]
+
+
+def sales_stats(history):
+    """Per-SKU sufficient statistics of the sales history
+
+    Sums (count, log price/quantity moments, units, revenue) and the first
+    and last sale date, indexed by id. Statistics of two histories combine
+    with merge_stats, so a fit can be updated with new sales only.
+    """
+    sales = history[(history["quantity"] > 0) & (history["price"] > 0)]
+    codes, ids = pd.factorize(sales["id"])
+    n = len(ids)
+    price = sales["price"].to_numpy(dtype=float)
+    quantity = sales["quantity"].to_numpy(dtype=float)
+    log_p, log_q = np.log(price), np.log(quantity)
+    stats = pd.DataFrame({
+        "n": np.bincount(codes, minlength=n).astype(float),
+        "log_p": np.bincount(codes, log_p, n),
+        "log_q": np.bincount(codes, log_q, n),
+        "log_p2": np.bincount(codes, log_p * log_p, n),
+        "log_pq": np.bincount(codes, log_p * log_q, n),
+        "priced_units": np.bincount(codes, quantity, n),
+        "revenue": np.bincount(codes, quantity * price, n),
+    }, index=ids)
+    dates = pd.DataFrame({"code": codes, "date": sales["date"].to_numpy()}).groupby("code")["date"]
+    stats["first"] = dates.min().reindex(range(n)).to_numpy()
+    stats["last"] = dates.max().reindex(range(n)).to_numpy()
+    stats.index.name = "id"
+    return stats
+
+
+def merge_stats(old, new):
+    """Statistics of two disjoint sales histories combined"""
+    if len(old) == 0:
+        return new
+    if len(new) == 0:
+        return old
+    merged = old[SUM_COLUMNS].add(new[SUM_COLUMNS], fill_value=0)
+    both = pd.concat([old[["first", "last"]], new[["first", "last"]]]).groupby(level=0)
+    merged["first"] = both["first"].min()
+    merged["last"] = both["last"].max()
+    merged.index.name = "id"
+    return merged
+
+
+def fit_stats(stats, products):
+    """fit_demand from sufficient statistics (see sales_stats)"""
+    category = products.drop_duplicates("id").set_index("id")["category"]
+    stats = stats[(stats["n"] > 0) & stats.index.isin(category.index)]
+
+    days = max((stats["last"].max() - stats["first"].min()).days + 1, 1) if len(stats) else 1
+    cat_codes, categories = pd.factorize(category.reindex(stats.index))
+
+    # Within-SKU regresija log(q) na log(p): oduzmi prosjek po SKU pa sumiraj po kategoriji
+    n = stats["n"].to_numpy(dtype=float)
+    log_p = stats["log_p"].to_numpy(dtype=float)
+    log_q = stats["log_q"].to_numpy(dtype=float)
+    sxy = np.bincount(cat_codes, stats["log_pq"].to_numpy(dtype=float) - log_p * log_q / n, len(categories))
+    sxx = np.bincount(cat_codes, stats["log_p2"].to_numpy(dtype=float) - log_p * log_p / n, len(categories))
+    n_obs = np.bincount(cat_codes, n, len(categories))
+
+    fitted = np.divide(sxy, sxx, out=np.full(len(categories), DEFAULT_ELASTICITY), where=sxx > 1e-9)
+    fitted = np.where(n_obs >= MIN_OBSERVATIONS, fitted, DEFAULT_ELASTICITY)
+    elasticity = pd.Series(np.clip(fitted, *ELASTICITY_BOUNDS), index=categories, name="elasticity")
+
+    units = stats["priced_units"].to_numpy(dtype=float)
+    demand = pd.DataFrame(
+        {"base_rate": units / days,
+         "ref_price": stats["revenue"].to_numpy(dtype=float) / np.maximum(units, 1e-9)},
+        index=stats.index.to_numpy(),
+    )
+    return elasticity, demand
+
+
+def fit_demand(history, products):
+    """Fit per-category elasticities and per-SKU base demand
+
+    Returns (elasticity per category, DataFrame indexed by id with
+    base_rate [kom/dan] and ref_price).
+    """
+    return fit_stats(sales_stats(history), products)
+
+
+def _expected_profit(p, cost, stock, q0, p0, e, gap_rate, storage_rate, salvage):
+    """Expected profit over the horizon for candidate prices p (vectorized)"""
+    rate = q0 * (p / p0) ** e
+    sold = np.minimum(rate * HORIZON_DAYS, stock)
+    left = stock - sold
+    # Zaliha linearno pada do rasprodaje (ili do kraja horizonta)
+    sell_days = np.where(rate > 0, np.minimum(HORIZON_DAYS, stock / np.maximum(rate, 1e-12)), HORIZON_DAYS)
+    stock_days = sell_days * (stock + left) / 2 + (HORIZON_DAYS - sell_days) * left
+    financing = p * gap_rate  # isto kao calculate_financing_cost, po prodatom komadu
+    storage = cost * storage_rate * stock_days
+    return sold * (p - cost - financing) - storage + left * (salvage - cost)
+
+
+def _solve_chunk(lo, hi, args):
+    """Grid bracket + golden-section refinement, fixed iteration count"""
+    steps = np.linspace(0.0, 1.0, GRID_POINTS)[:, None]
+    grid = lo + (hi - lo) * steps
+    values = _expected_profit(grid, *args)
+    best = values.argmax(axis=0)
+    cols = np.arange(lo.size)
+    width = (hi - lo) / (GRID_POINTS - 1)
+    a = np.maximum(grid[best, cols] - width, lo)
+    b = np.minimum(grid[best, cols] + width, hi)
+
+    ratio = (np.sqrt(5) - 1) / 2
+    c = b - ratio * (b - a)
+    d = a + ratio * (b - a)
+    fc = _expected_profit(c, *args)
+    fd = _expected_profit(d, *args)
+    for _ in range(GOLDEN_ITERATIONS):
+        left = fc > fd
+        b = np.where(left, d, b)
+        a = np.where(left, a, c)
+        c_new = b - ratio * (b - a)
+        d_new = a + ratio * (b - a)
+        # Jedna nova evaluacija po iteraciji - druga tačka se prenosi
+        c, d = np.where(left, c_new, d), np.where(left, c, d_new)
+        f_new = _expected_profit(np.where(left, c, d), *args)
+        fc, fd = np.where(left, f_new, fd), np.where(left, fc, f_new)
+    price = (a + b) / 2
+    return price, _expected_profit(price, *args)
+
+
+def optimize_prices(products, history=None, elasticity=None, demand=None, dso=83,
+                    supplier_terms=None, annual_interest=None, rules=None):
+    """Profit-maximizing price per SKU, net of financing and storage cost
+
+    Prices stay within the rule floor/cap for the SKU's current status.
+    """
+    rules = rules or get_rules()
+    supplier_terms = rules.supplier_terms if supplier_terms is None else supplier_terms
+    annual_interest = rules.annual_interest if annual_interest is None else annual_interest
+    if elasticity is None or demand is None:
+        if history is None:
+            raise ValueError("Potrebna je historija prodaje ili gotove elastičnosti")
+        elasticity, demand = fit_demand(history, products)
+
+    cost = products["cost"].to_numpy(dtype=float)
+    current = products["price"].to_numpy(dtype=float)
+    stock = products["quantity"].to_numpy(dtype=float)
+    category = products["category"].astype(str)
+
+    e = category.map(elasticity).fillna(DEFAULT_ELASTICITY).to_numpy(dtype=float)
+    sku_demand = demand.reindex(products["id"])
+    # SKU bez historije: prosječna potražnja kategorije po trenutnoj cijeni
+    category_rate = sku_demand["base_rate"].groupby(category.to_numpy()).transform("mean")
+    q0 = sku_demand["base_rate"].fillna(category_rate).fillna(demand["base_rate"].mean()).fillna(0)
+    q0 = q0.to_numpy(dtype=float)
+    p0 = sku_demand["ref_price"].fillna(pd.Series(current, index=sku_demand.index)).to_numpy(dtype=float)
+    p0 = np.where(p0 > 0, p0, np.maximum(cost, 1e-9))
+
+    codes = rules.category_codes(category)
+    quote = rules.price(cost, products["days"], codes=codes, dso=dso,
+                        supplier_terms=supplier_terms, annual_interest=annual_interest)
+    lo = np.maximum(quote["floor"], 1e-9)
+    hi = np.minimum(np.maximum(current, cost * rules.multipliers[codes, 0]) * 1.5, quote["cap"])
+    hi = np.maximum(hi, lo)
+
+    gap_rate = annual_interest / 365 * max(dso - supplier_terms, 0)
+    storage_rate = rules.monthly_storage[codes] / 30
+    salvage = cost * rules.floors[codes, -1]  # mrtva roba na kraju horizonta ide po donjoj granici
+
+    price = np.empty_like(cost)
+    profit = np.empty_like(cost)
+    for start in range(0, len(cost), CHUNK_SIZE):
+        s = slice(start, start + CHUNK_SIZE)
+        args = (cost[s], stock[s], q0[s], p0[s], e[s], gap_rate, storage_rate[s], salvage[s])
+        price[s], profit[s] = _solve_chunk(lo[s], hi[s], args)
+
+    rate = q0 * (price / p0) ** e
+    return pd.DataFrame({
+        "id": products["id"].to_numpy(),
+        "name": products["name"].to_numpy(),
+        "category": category.to_numpy(),
+        "current_price": current,
+        "rule_price": quote["price"],
+        "optimal_price": price.round(2),
+        "elasticity": e,
+        "daily_rate": rate,
+        "expected_units": np.minimum(rate * HORIZON_DAYS, stock),
+        "expected_profit": profit,
+    })
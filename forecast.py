@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+# forecast.py - PROGNOZA PRODAJE I DANA DO MRTVE ROBE
+#
+# Brzina prodaje po SKU je eksponencijalno ponderisan prosjek dnevne prodaje
+# (EWMA). Stanje se čuva između pokretanja, pa noćno osvježavanje obrađuje
+# samo novu prodaju: stari prosjeci se samo "ohlade" za protekle dane.
+# Uz brzinu stanje čuva i dovoljne statistike za elastičnost (elasticity.
+# sales_stats), pa se i procjena elastičnosti osvježava samo novom prodajom.
+import os
+
+import numpy as np
+import pandas as pd
+
+from elasticity import DEFAULT_ELASTICITY, STAT_COLUMNS, fit_stats, merge_stats, sales_stats
+from pricing_rules import STATUSES, get_rules
+
+HALF_LIFE_DAYS = 30
+SLOW_MOVING = STATUSES.index("SLOW_MOVING")
+DEAD_STOCK = STATUSES.index("DEAD_STOCK")
+
+
+def _decay(days):
+    """EWMA retention after `days` days"""
+    return 0.5 ** (np.asarray(days, dtype=float) / HALF_LIFE_DAYS)
+
+
+def empty_state():
+    state = pd.DataFrame({"rate": pd.Series(dtype=float), "units": pd.Series(dtype=float)})
+    state.index.name = "id"
+    state.attrs["as_of"] = None
+    state.attrs["weight"] = 0.0  # ukupna EWMA težina posmatranih dana (korekcija pristranosti)
+    return state
+
+
+def update_state(state, sales, as_of=None):
+    """Fold new sales (id, date, quantity) into the sell-through state
+
+    Only sales after the state's as_of date are applied, so the same
+    (growing) sales file can be fed every night. Sales with a price also
+    update the elasticity statistics (see fit_state_demand).
+    """
+    sales = sales[[c for c in ("id", "date", "quantity", "price") if c in sales.columns]]
+    previous = state.attrs.get("as_of")
+    if previous is not None:
+        sales = sales[sales["date"] > previous]
+    as_of = pd.Timestamp(as_of) if as_of is not None else (
+        sales["date"].max() if len(sales) else previous)
+    if as_of is None:
+        return state
+
+    # Postojeći prosjeci samo izblijede za dane koji su prošli
+    if previous is not None:
+        elapsed = (as_of - previous).days
+    else:
+        elapsed = (as_of - sales["date"].min()).days + 1 if len(sales) else 0
+    rate = state["rate"] * _decay(elapsed)
+    weight = state.attrs.get("weight", 0.0) * _decay(elapsed) + (1 - _decay(elapsed))
+    units = state["units"].copy()
+
+    if len(sales):
+        alpha = 1 - _decay(1)
+        age = (as_of - sales["date"]).dt.days.to_numpy()
+        weighted = sales["quantity"].to_numpy(dtype=float) * alpha * _decay(age)
+        codes, ids = pd.factorize(sales["id"])
+        new_rate = pd.Series(np.bincount(codes, weighted, len(ids)), index=ids)
+        new_units = pd.Series(np.bincount(codes, sales["quantity"].to_numpy(dtype=float), len(ids)), index=ids)
+        rate = rate.add(new_rate, fill_value=0)
+        units = units.add(new_units, fill_value=0)
+
+    stats = demand_stats(state)
+    if "price" in sales.columns:
+        stats = merge_stats(stats, sales_stats(sales))
+    updated = pd.DataFrame({"rate": rate, "units": units}).join(stats)
+    updated.index.name = "id"
+    updated.attrs["as_of"] = as_of
+    updated.attrs["weight"] = float(weight)
+    return updated
+
+
+def demand_stats(state):
+    """Elasticity statistics kept in the state (empty for older state files)"""
+    if not set(STAT_COLUMNS) <= set(state.columns):
+        return sales_stats(pd.DataFrame(columns=["id", "date", "price", "quantity"]))
+    return state.loc[state["n"] > 0, STAT_COLUMNS]
+
+
+def fit_state_demand(state, products):
+    """Elasticities and base demand from all sales folded into the state"""
+    return fit_stats(demand_stats(state), products)
+
+
+def sell_through_rates(state):
+    """Bias-corrected daily sell-through per SKU"""
+    weight = state.attrs.get("weight", 0.0)
+    return state["rate"] / weight if weight > 0 else state["rate"]
+
+
+def load_state(path):
+    """Load a saved state (or an empty one if it doesn't exist yet)"""
+    if path and os.path.exists(path):
+        return pd.read_pickle(path)
+    return empty_state()
+
+
+def save_state(state, path):
+    state.to_pickle(path)
+
+
+def project(products, state, recommended_price=None, elasticity=None, rules=None):
+    """Days until each SKU crosses the slow-moving / dead-stock thresholds
+
+    Projected at the current price and (if given) at the recommended price,
+    with sell-through scaled by the category price elasticity.
+    """
+    rules = rules or get_rules()
+    cost = products["cost"].to_numpy(dtype=float)
+    current = products["price"].to_numpy(dtype=float)
+    stock = products["quantity"].to_numpy(dtype=float)
+    days = products["days"].to_numpy()
+    category = products["category"].astype(str)
+    codes = rules.category_codes(category)
+    status = rules.status_codes(days, codes)
+
+    rate = sell_through_rates(state).reindex(products["id"]).fillna(0).to_numpy(dtype=float)
+    result = pd.DataFrame({
+        "id": products["id"].to_numpy(),
+        "name": products["name"].to_numpy(),
+        "category": category.to_numpy(),
+        "status": np.array(STATUSES)[status],
+        "days": days,
+        "quantity": stock,
+        "daily_rate": rate,
+    })
+
+    scenarios = {"current": rate}
+    if recommended_price is not None:
+        if elasticity is None:
+            e = np.full(len(products), DEFAULT_ELASTICITY)
+        else:
+            e = category.map(elasticity).fillna(DEFAULT_ELASTICITY).to_numpy(dtype=float)
+        ratio = np.asarray(recommended_price, dtype=float) / np.where(current > 0, current, 1.0)
+        scenarios["recommended"] = rate * ratio ** e
+
+    for name, r in scenarios.items():
+        sell_out = np.where(r > 0, stock / np.where(r > 0, r, 1.0), np.inf)
+        result[f"days_to_sell_out_{name}"] = sell_out
+        for label, index in (("slow", SLOW_MOVING), ("dead", DEAD_STOCK)):
+            # Status `index` počinje dan nakon praga thresholds[index - 1]
+            to_threshold = rules.thresholds[codes, index - 1] + 1 - days
+            crosses = (status < index) & (sell_out > to_threshold)
+            result[f"days_to_{label}_{name}"] = np.where(crosses, to_threshold, np.nan)
+            if label == "dead":
+                left = np.where(crosses, stock - r * to_threshold, 0.0)
+                result[f"units_at_dead_{name}"] = left
+                result[f"value_at_risk_{name}"] = left * cost
+    return result
+
+
+def at_risk(projection, scenario="current", top=None):
+    """SKUs that will become dead stock, ranked by value at risk"""
+    column = f"value_at_risk_{scenario}"
+    risky = projection[projection[column] > 0]
+    ranked = risky.sort_values([column, f"days_to_dead_{scenario}"], ascending=[False, True])
+    return ranked.head(top) if top else ranked
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+# fx.py - VALUTE I KURSEVI
+#
+# Kursevi se čitaju iz lokalnog fajla (fx_rates.csv ili fajl iz FX_RATES):
+# jedan red po (datum, valuta) sa iznosom KM za 1 jedinicu valute. Tabela se
+# učita jednom po procesu, a kursevi za jedan dan (zadnji poznati na taj dan
+# ili prije) se keširaju po datumu. Konverzija cijelog niza je jedan faktor
+# po valuti i jedno množenje - nema poziva po redu.
+import os
+from datetime import date as _date
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+RATES_PATH = os.environ.get(
+    "FX_RATES", os.path.join(os.path.dirname(os.path.abspath(__file__)), "fx_rates.csv")
+)
+
+BASE = "KM"  # konvertibilna marka - valuta pravila i svih starih izvještaja
+ALIASES = {"BAM": BASE, "KM": BASE, "": BASE}
+
+
+class FxError(ValueError):
+    """Unknown currency or no rate for the requested date"""
+
+
+def normalize(currencies):
+    """Upper-case currency codes with aliases resolved (BAM -> KM, blank -> KM)"""
+    if isinstance(currencies, str) or currencies is None:
+        code = (currencies or "").strip().upper()
+        return ALIASES.get(code, code)
+    codes = pd.Series(currencies, dtype=object).fillna("").astype(str).str.strip().str.upper()
+    return codes.replace(ALIASES).to_numpy(dtype=object)
+
+
+def load_rates(path=None):
+    """Rate table (date, currency, rate = KM per unit), sorted by date"""
+    table = pd.read_csv(path or RATES_PATH, parse_dates=["date"])
+    missing = {"date", "currency", "rate"} - set(table.columns)
+    if missing:
+        raise FxError(f"Fajl kurseva nema kolone: {', '.join(sorted(missing))}")
+    table["currency"] = normalize(table["currency"])
+    if (table["rate"] <= 0).any():
+        raise FxError("Kurs mora biti veći od nule")
+    return table.sort_values("date", kind="stable").reset_index(drop=True)
+
+
+@lru_cache(maxsize=None)
+def get_rate_table(path=None):
+    """Rate table, loaded once per process"""
+    return load_rates(path)
+
+
+@lru_cache(maxsize=64)
+def _rates_on(day, path):
+    table = get_rate_table(path)
+    known = table[table["date"] <= pd.Timestamp(day)]
+    rates = dict(zip(known["currency"], known["rate"].astype(float)))  # zadnji kurs pobjeđuje
+    rates[BASE] = 1.0
+    return rates
+
+
+def rates_on(day=None, path=None):
+    """{currency: KM per unit} valid on `day` (default: today), cached per date
+
+    The returned dict is shared between callers and must not be changed.
+    """
+    day = _date.today() if day is None else pd.Timestamp(day).date()
+    return _rates_on(day, path)
+
+
+def known_currencies(path=None):
+    """Currency codes with at least one rate in the rate table (plus KM)"""
+    try:
+        table = get_rate_table(path)
+    except OSError:
+        return {BASE}
+    return set(table["currency"]) | {BASE}
+
+
+def validate(currencies, path=None):
+    """Raise FxError if any code has no rate in the rate table
+
+    Called when products are loaded, so a typo or an unsupported currency
+    fails before the catalogue is priced instead of in the totals.
+    """
+    codes = [currencies] if isinstance(currencies, str) else pd.unique(np.asarray(currencies, dtype=object))
+    unknown = sorted(set(normalize(list(codes))) - known_currencies(path))
+    if unknown:
+        raise FxError(f"Nema kursa za valutu: {', '.join(unknown)} (fajl kurseva: {path or RATES_PATH})")
+    return currencies
+
+
+def rate(currency, to=BASE, rates=None):
+    """Units of `to` for one unit of `currency`"""
+    rates = rates_on() if rates is None else rates
+    try:
+        return rates[normalize(currency)] / rates[normalize(to)]
+    except KeyError as e:
+        raise FxError(f"Nema kursa za valutu {e.args[0]}") from None
+
+
+def convert(amounts, currencies, to=BASE, rates=None):
+    """Convert an array of amounts in `currencies` (one code or one per row) into `to`
+
+    One factor is looked up per distinct currency, then the whole array is
+    multiplied at once. Categorical currencies reuse their codes.
+    """
+    amounts = np.asarray(amounts, dtype=float)
+    if isinstance(currencies, str):
+        return amounts * rate(currencies, to, rates)
+    if isinstance(getattr(currencies, "dtype", None), pd.CategoricalDtype):
+        categorical = pd.Categorical(currencies)
+        codes, labels = categorical.codes, categorical.categories
+    else:
+        codes, labels = pd.factorize(np.asarray(currencies, dtype=object))
+    factors = np.array([rate(c, to, rates) for c in labels], dtype=float)
+    return amounts * factors[codes]
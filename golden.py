@@ -0,0 +1,331 @@
+# -*- coding: utf-8 -*-
+# golden.py - ZLATNI SKUP PODATAKA I DIFERENCIJALNI TEST CIJENA
+#
+# Generiše velik nasumični katalog plus rubne slučajeve (svaki dan oko svakog
+# praga starosti, sitne i ogromne cijene, nepoznate kategorije) i poredi
+# skalarne referentne implementacije (RULES.quote - na kojoj je i
+# calculate_dynamic_price u app.py - i Product.get_price_recommendation) sa
+# brzim putevima. Prijavljuje svaku razliku u cijeni, statusu ili zbiru iznad
+# tolerancije i mjeri oba puta u istom pokretanju, pa svaka optimizacija
+# dolazi sa dokazom da je ista i koliko je brža.
+#
+#   python golden.py                            # ugrađeni brzi putevi
+#   python golden.py --engine mymodule:price    # vlastiti engine
+#   python golden.py --save golden.csv          # sačuvaj katalog i očekivane rezultate
+#   python golden.py --golden golden.csv        # ponovi na sačuvanom skupu
+import argparse
+import importlib
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from main import RULES, products_from_frame, recommendation_messages, recommendations_frame
+from pricing_rules import DEFAULT_CATEGORY, Quote
+
+SEED = 2024
+ROWS = 100_000
+DSOS = (60, 83, 180)  # 60 = jednako rokovima dobavljača (bez finansiranja)
+TOLERANCE = 1e-6  # po vrijednosti, daleko ispod jednog feninga
+AGGREGATE_TOLERANCE = 0.005  # zbirovi i prosjeci
+UNKNOWN_CATEGORY = "Nepoznata"  # nema pravila - mora pasti na podrazumijevana
+EDGE_COSTS = (0.01, 0.1, 1.0, 9.99, 10.5, 1234.56, 1_000_000.0)
+EDGE_DAYS = (0, 1, 365, 1000, 10_000)
+CURRENCIES = ("KM", "EUR", "RSD")  # pravila ne zavise od valute, ali poruke da
+
+QUOTE_FIELDS = ("status", "price", "floor", "cap", "base", "financing", "storage")
+EXPECTED_COLUMNS = ("ID", "Currency", "Status", "Urgency", "Action", "Message", "Recommended_Price",
+                    "Unit_Profit", "Margin_%", "Total_Value", "Total_Profit")
+
+
+# ---------- KATALOG ----------
+def categories():
+    """Every rule category plus one without rules"""
+    return [c for c in RULES.categories if c != DEFAULT_CATEGORY] + ["General", UNKNOWN_CATEGORY]
+
+
+def edge_cases():
+    """Rows at every rule boundary: each day around each threshold, extreme costs"""
+    rows = []
+    for category in categories():
+        thresholds = RULES.rules_for(category)["thresholds"]
+        near = {d for t in thresholds for d in (t - 1, t, t + 1)} | set(EDGE_DAYS)
+        for days in sorted(d for d in near if d >= 0):
+            for cost in EDGE_COSTS:
+                rows.append((category, cost, days))
+        # Svaki dan do iza zadnjeg praga - tu se prelazi donja granica (cost * 1.05)
+        for days in range(thresholds[-1] + 31):
+            rows.append((category, 10.0, days))
+    frame = pd.DataFrame(rows, columns=["category", "cost", "days"])
+    frame["price"] = (frame["cost"] * 1.5).round(2)
+    frame["quantity"] = np.resize([0, 1, 7, 10_000], len(frame))
+    frame["currency"] = np.resize(CURRENCIES, len(frame))
+    return frame
+
+
+def random_catalogue(rows, seed=SEED):
+    """Random products over every age band, cost scale and category"""
+    rng = np.random.default_rng(seed)
+    horizon = 2 * max(RULES.rules_for(c)["thresholds"][-1] for c in categories())
+    cost = np.round(rng.lognormal(3, 1.5, rows), 2).clip(0.01)
+    return pd.DataFrame({
+        "category": rng.choice(categories(), rows),
+        "cost": cost,
+        "days": rng.integers(0, horizon, rows),
+        "price": np.round(cost * rng.uniform(0.8, 2.0, rows), 2),
+        "quantity": rng.integers(0, 500, rows),
+        "currency": rng.choice(CURRENCIES, rows),
+    })
+
+
+def build_catalogue(rows=ROWS, seed=SEED):
+    """Edge cases followed by `rows` random products (standard product table)"""
+    frame = pd.concat([edge_cases(), random_catalogue(rows, seed)], ignore_index=True)
+    frame.insert(0, "id", [f"G{i:07d}" for i in range(len(frame))])
+    frame.insert(1, "name", [f"Artikal {i}" for i in range(len(frame))])
+    return frame[["id", "name", "category", "cost", "price", "days", "quantity", "currency"]]
+
+
+# ---------- REFERENCE I BRZI PUTEVI ----------
+def reference_quotes(catalogue, dso):
+    """RULES.quote per product (scalar reference of calculate_dynamic_price)"""
+    quotes = [RULES.quote(cost, days, category, dso) for cost, days, category in zip(
+        catalogue["cost"].tolist(), catalogue["days"].tolist(), catalogue["category"].tolist())]
+    return pd.DataFrame(quotes, columns=Quote._fields)[list(QUOTE_FIELDS)]
+
+
+def vector_quotes(catalogue, dso):
+    """RULES.price over the whole catalogue"""
+    quote = RULES.price(catalogue["cost"].to_numpy(), catalogue["days"].to_numpy(),
+                        catalogue["category"], dso)
+    return pd.DataFrame({field: quote[field] for field in QUOTE_FIELDS})
+
+
+def reference_recommendations(products, dso):
+    """Product.get_price_recommendation per product"""
+    return pd.DataFrame([p.get_price_recommendation(dso) for p in products])
+
+
+def frame_recommendations(products, dso):
+    """recommendations_frame plus its output messages"""
+    df = recommendations_frame(products, dso)
+    df["Message"] = recommendation_messages(df)
+    return df
+
+
+# Nivo -> (referentna funkcija, ulaz: katalog ili lista Product objekata)
+LEVELS = {
+    "quote": (reference_quotes, "catalogue"),
+    "recommendation": (reference_recommendations, "products"),
+}
+
+# Ugrađeni brzi putevi (ime -> nivo, funkcija)
+ENGINES = {
+    "rules.price": ("quote", vector_quotes),
+    "recommendations_frame": ("recommendation", frame_recommendations),
+}
+
+
+def load_engine(spec):
+    """Engine function from 'module:function'"""
+    module, _, name = spec.partition(":")
+    if not name:
+        raise ValueError(f"Engine '{spec}' mora biti oblika modul:funkcija")
+    return getattr(importlib.import_module(module), name)
+
+
+# ---------- POREĐENJE ----------
+def compare(expected, actual, tolerance=TOLERANCE):
+    """{column: boolean mismatch mask} for the expected columns
+
+    Numbers differ when they are further apart than `tolerance`; a float32
+    column is compared at float32 precision. Everything else (statuses,
+    messages) must match exactly. A missing column is a mismatch everywhere.
+    """
+    if len(actual) != len(expected):
+        raise ValueError(f"Engine je vratio {len(actual)} redova umjesto {len(expected)}")
+    mismatches = {}
+    for column in expected.columns:
+        e = expected[column]
+        if column not in actual:
+            mismatches[column] = np.ones(len(e), dtype=bool)
+            continue
+        a = actual[column]
+        if pd.api.types.is_numeric_dtype(e) and pd.api.types.is_numeric_dtype(a):
+            e_values = e.to_numpy(dtype=a.dtype if a.dtype == np.float32 else float)
+            bad = ~np.isclose(a.to_numpy(dtype=float), e_values.astype(float),
+                              rtol=0, atol=tolerance, equal_nan=True)
+        else:
+            bad = e.astype(str).to_numpy() != a.astype(str).to_numpy()
+        mismatches[column] = bad
+    return mismatches
+
+
+def aggregates(frame):
+    """Status counts and column totals/means used to compare whole runs"""
+    status = "Status" if "Status" in frame else "status"
+    result = {f"count[{k}]": float(v) for k, v in frame[status].astype(str).value_counts().items()}
+    for column in ("Total_Value", "Total_Profit", "price"):
+        if column in frame:
+            result[f"sum[{column}]"] = float(frame[column].astype(float).sum())
+    if "Margin_%" in frame:
+        result["mean[Margin_%]"] = float(frame["Margin_%"].astype(float).mean())
+    return result
+
+
+def compare_aggregates(expected, actual, tolerance=AGGREGATE_TOLERANCE):
+    """[(name, expected, actual)] for aggregates further apart than tolerance"""
+    e, a = aggregates(expected), aggregates(actual)
+    return [(name, e.get(name, 0.0), a.get(name, 0.0)) for name in sorted(set(e) | set(a))
+            if not np.isclose(e.get(name, 0.0), a.get(name, 0.0), rtol=0, atol=tolerance)]
+
+
+def timed(func, *args, repeat=1):
+    """(result, best wall time of `repeat` runs)"""
+    best, result = np.inf, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+# ---------- ZLATNI SKUP ----------
+def expected_path(path):
+    root, _ = os.path.splitext(path)
+    return f"{root}.expected.csv"
+
+
+def save_golden(path, catalogue, expected):
+    """Catalogue (product CSV) and reference recommendations per DSO (<name>.expected.csv)"""
+    catalogue.to_csv(path, index=False, encoding="utf-8")
+    pd.concat([frame.assign(DSO=dso) for dso, frame in expected.items()], ignore_index=True).to_csv(
+        expected_path(path), index=False, encoding="utf-8")
+
+
+def load_golden(path):
+    """(catalogue, {dso: stored reference recommendations} or {} if not saved)"""
+    catalogue = pd.read_csv(path, dtype={"id": str, "name": str, "category": str, "currency": str},
+                            keep_default_na=False)
+    if not os.path.exists(expected_path(path)):
+        return catalogue, {}
+    stored = pd.read_csv(expected_path(path), dtype={"ID": str}, keep_default_na=False)
+    return catalogue, {dso: frame.drop(columns="DSO").reset_index(drop=True)
+                       for dso, frame in stored.groupby("DSO", sort=False)}
+
+
+# ---------- IZVJEŠTAJ ----------
+def _plain(value):
+    if isinstance(value, np.float32):
+        return float(str(value))  # bez šuma float32 -> float64
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def report(name, catalogue, expected, actual, reference_time, engine_time, tolerance, show):
+    """Print one engine's differences and timing; returns True if it matches
+
+    engine_time None: no timing (comparison with stored results).
+    """
+    mismatches = compare(expected, actual, tolerance)
+    aggregate_diffs = compare_aggregates(expected, actual)
+    bad_columns = {c: m for c, m in mismatches.items() if m.any()}
+    verdict = "✅ MATCH" if not bad_columns and not aggregate_diffs else "❌ DIFFERS"
+    timing = ""
+    if engine_time is not None:
+        speedup = reference_time / engine_time if engine_time else np.inf
+        timing = f"reference {reference_time:8.3f}s | engine {engine_time:8.3f}s | {speedup:7.1f}x"
+    print(f"   {verdict:<10} {name:<24} {timing}".rstrip())
+    for column, mask in bad_columns.items():
+        rows = np.flatnonzero(mask)
+        print(f"      {column}: {len(rows)} rows differ")
+        for i in rows[:show]:
+            product = catalogue.iloc[i]
+            got = actual[column].iloc[i] if column in actual else "<missing>"
+            print(f"         {product['id']} ({product['category']}, cost {product['cost']}, "
+                  f"{product['days']} days): expected {_plain(expected[column].iloc[i])!r}, "
+                  f"got {_plain(got)!r}")
+    for aggregate, e, a in aggregate_diffs:
+        print(f"      {aggregate}: expected {e:.4f}, got {a:.4f}")
+    return not bad_columns and not aggregate_diffs
+
+
+def engine_input(source, catalogue):
+    """Fresh input per run, so an engine that changes its input cannot affect the others"""
+    return catalogue.copy() if source == "catalogue" else products_from_frame(catalogue)
+
+
+def run(catalogue, engines, dsos=DSOS, tolerance=TOLERANCE, repeat=3, show=5, stored=None, save=None):
+    """Run every engine against its scalar reference for each DSO; True if all match"""
+    ok = True
+    expected_recommendations = {}
+    for dso in dsos:
+        print(f"\n📊 DSO {dso:g} days ({len(catalogue)} products)")
+        references = {}
+        for level, (func, source) in LEVELS.items():
+            references[level] = timed(func, engine_input(source, catalogue), dso)
+        expected_recommendations[dso] = references["recommendation"][0][list(EXPECTED_COLUMNS)]
+        if stored:
+            if dso in stored:
+                # Referenca sama mora ostati ista kao kada je skup sačuvan
+                ok &= report("stored golden", catalogue, stored[dso],
+                             references["recommendation"][0], None, None, tolerance, show)
+            else:
+                print(f"   ⚠️  no stored results for DSO {dso:g}")
+        for name, (level, func) in engines.items():
+            expected, reference_time = references[level]
+            actual, engine_time = timed(func, engine_input(LEVELS[level][1], catalogue), dso, repeat=repeat)
+            ok &= report(name, catalogue, expected, actual, reference_time, engine_time, tolerance, show)
+    if save:
+        save_golden(save, catalogue, expected_recommendations)
+        print(f"\n💾 Golden dataset saved to: {save} (+ {expected_path(save)})")
+    return ok
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Compare optimized pricing engines with the scalar reference implementations")
+    parser.add_argument("--rows", type=int, default=ROWS,
+                        help="Random products added to the edge cases (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--dso", type=float, nargs="+", default=list(DSOS),
+                        help="DSO values to price at (default: %(default)s)")
+    parser.add_argument("--engine", action="append", default=[], metavar="MODULE:FUNCTION",
+                        help="Extra engine func(data, dso) returning a DataFrame with the "
+                             "reference's columns (repeatable)")
+    parser.add_argument("--level", choices=sorted(LEVELS), default="recommendation",
+                        help="What --engine functions produce: quote = RULES.quote fields from the "
+                             "product table, recommendation = get_price_recommendation columns from "
+                             "a list of Products (default: %(default)s)")
+    parser.add_argument("--only-custom", action="store_true",
+                        help="Skip the built-in engines (%s)" % ", ".join(ENGINES))
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help="Allowed difference per value (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Engine runs per DSO, the fastest is reported (default: %(default)s)")
+    parser.add_argument("--show", type=int, default=5, help="Differing rows shown per column")
+    parser.add_argument("--golden", metavar="CSV", help="Use a saved golden dataset instead of generating one")
+    parser.add_argument("--save", metavar="CSV", help="Save the catalogue and reference results as a golden dataset")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    stored = {}
+    if args.golden:
+        catalogue, stored = load_golden(args.golden)
+        print(f"📦 Golden dataset {args.golden}: {len(catalogue)} products")
+    else:
+        catalogue = build_catalogue(args.rows, args.seed)
+        print(f"📦 Generated {len(catalogue)} products ({len(catalogue) - args.rows} edge cases, seed {args.seed})")
+    engines = {} if args.only_custom else dict(ENGINES)
+    for spec in args.engine:
+        engines[spec] = (args.level, load_engine(spec))
+    ok = run(catalogue, engines, args.dso, args.tolerance, args.repeat, args.show, stored, args.save)
+    print("\n" + ("🎉 All engines match the reference" if ok else "🚨 Differences found"))
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+# ingest.py - UČITAVANJE ZALIHA IZ VIŠE SKLADIŠTA
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import fx
+from snapshot import SNAPSHOT_EXTENSION, open_snapshot
+
+# Standardne kolone tabele proizvoda (isto kao products.csv; valuta je opcionalna - KM)
+COLUMNS = ["id", "name", "category", "cost", "price", "days", "quantity", "currency"]
+
+# Nazivi kolona koje susrećemo u izvozima skladišta
+COLUMN_ALIASES = {
+    "id": ["id", "sku", "sifra", "šifra", "product_id", "artikal_id"],
+    "name": ["name", "naziv", "product", "proizvod"],
+    "category": ["category", "kategorija"],
+    "cost": ["cost", "cost_price", "nabavna", "nabavna_cijena"],
+    "price": ["price", "current_price", "selling_price", "cijena", "prodajna", "trenutna"],
+    "days": ["days", "days_old", "days_in_stock", "starost", "dana"],
+    "quantity": ["quantity", "qty", "kolicina", "količina", "stock"],
+    "currency": ["currency", "valuta", "currency_code"],
+}
+
+SUPPORTED_EXTENSIONS = (".csv", ".parquet", SNAPSHOT_EXTENSION)
+
+
+def expand_sources(sources):
+    """Expand files and directories into (warehouse, path) pairs
+
+    A dict key names the warehouse of all its files. Otherwise a file is
+    named after its stem, prefixed with its directory when the same stem
+    comes from more than one directory (sa/stock.csv, mo/stock.csv ->
+    sa_stock, mo_stock), so different warehouses are never merged.
+    """
+    if isinstance(sources, (str, os.PathLike)):
+        sources = [sources]
+    items = sources.items() if isinstance(sources, dict) else [(None, s) for s in sources]
+
+    expanded = []
+    for warehouse, source in items:
+        source = os.fspath(source)
+        if os.path.isdir(source):
+            paths = [os.path.join(source, entry) for entry in sorted(os.listdir(source))]
+            paths = [p for p in paths if os.path.isfile(p) and p.lower().endswith(SUPPORTED_EXTENSIONS)]
+        else:
+            paths = [source]
+        expanded.extend((warehouse, path) for path in paths)
+
+    def stem(path):
+        return os.path.splitext(os.path.basename(path))[0]
+
+    def folder(path):
+        return os.path.basename(os.path.dirname(os.path.abspath(path)))
+
+    folders = {}
+    for warehouse, path in expanded:
+        if warehouse is None:
+            folders.setdefault(stem(path), set()).add(os.path.dirname(os.path.abspath(path)))
+    return [
+        (warehouse if warehouse is not None
+         else f"{folder(path)}_{stem(path)}" if len(folders[stem(path)]) > 1 else stem(path), path)
+        for warehouse, path in expanded
+    ]
+
+
+def normalize_columns(df, extra_columns=()):
+    """Rename known column aliases to the standard product schema
+
+    Columns in `extra_columns` (e.g. a business-unit column) are kept after
+    the standard ones when the source has them.
+    """
+    lookup = {alias: column for column, aliases in COLUMN_ALIASES.items() for alias in aliases}
+    renamed = {}
+    for col in df.columns:
+        key = str(col).strip().lower()
+        if key in lookup and lookup[key] not in renamed.values():
+            renamed[col] = lookup[key]
+    df = df.rename(columns=renamed)
+
+    if "name" not in df.columns and "id" in df.columns:
+        df["name"] = df["id"].astype(str)
+    if "id" not in df.columns and "name" in df.columns:
+        df["id"] = df["name"]
+    if "category" not in df.columns:
+        df["category"] = "General"
+    if "currency" not in df.columns:
+        df["currency"] = fx.BASE
+
+    missing = [col for col in COLUMNS if col not in df.columns]
+    if missing:
+        raise ValueError(f"Nedostaju kolone: {', '.join(missing)}")
+
+    extra = [col for col in extra_columns if col in df.columns and col not in COLUMNS]
+    df = df[COLUMNS + extra].copy()
+    df["category"] = df["category"].fillna("General").astype(str)
+    df["currency"] = fx.validate(fx.normalize(df["currency"]))
+    for col in ("cost", "price", "days", "quantity"):
+        df[col] = pd.to_numeric(df[col], errors="coerce")
+    return df.dropna(subset=["cost", "price", "days", "quantity"])
+
+
+def read_source(path, extra_columns=()):
+    """Read one warehouse export (CSV, Parquet or snapshot) into the standard schema"""
+    if path.lower().endswith(SNAPSHOT_EXTENSION):
+        return open_snapshot(path).to_frame()
+    if path.lower().endswith(".parquet"):
+        df = pd.read_parquet(path)
+    else:
+        df = pd.read_csv(path)
+    return normalize_columns(df, extra_columns)
+
+
+def merge_warehouses(frames, extra_columns=()):
+    """Merge per-warehouse frames into one product table
+
+    Quantities are summed (and kept per warehouse as qty_<skladište>),
+    cost, price and age are quantity-weighted averages. A SKU keeps the
+    currency (and extra columns) of its first source; prices in other
+    currencies are converted.
+    """
+    frames = {wh: df for wh, df in frames.items() if len(df)}
+    extra = [col for col in extra_columns if col not in COLUMNS and any(col in df for df in frames.values())]
+    if not frames:
+        return pd.DataFrame(columns=COLUMNS + extra)
+
+    stacked = pd.concat(
+        [df.assign(warehouse=wh) for wh, df in frames.items()], ignore_index=True
+    )
+    currency = stacked.groupby("id", sort=False)["currency"].transform("first")
+    mixed = (stacked["currency"] != currency).to_numpy()
+    if mixed.any():
+        # Isti SKU u različitim valutama - preračunaj u valutu prvog izvora (preko KM)
+        for col in ("cost", "price"):
+            stacked.loc[mixed, col] = (fx.convert(stacked.loc[mixed, col], stacked.loc[mixed, "currency"])
+                                       / fx.convert(1.0, currency[mixed]))
+    qty = stacked["quantity"].to_numpy(dtype=float)
+    # Ako je ukupna količina 0, koristi obični prosjek umjesto ponderisanog
+    weight = np.where(qty > 0, qty, 0.0)
+    stacked["_w"] = weight
+    stacked["_n"] = 1.0
+    for col in ("cost", "price", "days"):
+        stacked[f"_w{col}"] = stacked[col] * weight
+        stacked[f"_s{col}"] = stacked[col]
+
+    grouped = stacked.groupby("id", sort=False)
+    sums = grouped[["quantity", "_w", "_n", "_wcost", "_wprice", "_wdays",
+                    "_scost", "_sprice", "_sdays"]].sum()
+    first = grouped[["name", "category", "currency"] + extra].first()
+
+    merged = first.copy()
+    has_weight = sums["_w"] > 0
+    for col in ("cost", "price", "days"):
+        merged[col] = np.where(
+            has_weight,
+            sums[f"_w{col}"] / sums["_w"].where(has_weight, 1.0),
+            sums[f"_s{col}"] / sums["_n"],
+        )
+    merged["days"] = merged["days"].round().astype(int)
+    merged["quantity"] = sums["quantity"].astype(int)
+
+    per_warehouse = stacked.pivot_table(
+        index="id", columns="warehouse", values="quantity", aggfunc="sum", fill_value=0
+    )
+    per_warehouse.columns = [f"qty_{wh}" for wh in per_warehouse.columns]
+    merged = merged.join(per_warehouse.astype(int))
+
+    return merged.reset_index()[COLUMNS + extra + list(per_warehouse.columns)]
+
+
+def load_sources(sources, max_workers=None, extra_columns=()):
+    """Read all warehouse sources concurrently and merge them
+
+    Files are read in a thread pool, so total time is bounded by the
+    slowest source rather than the sum of all of them.
+    """
+    expanded = expand_sources(sources)
+    if not expanded:
+        return pd.DataFrame(columns=COLUMNS + [c for c in extra_columns if c not in COLUMNS])
+
+    workers = max_workers or min(32, len(expanded))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        read = functools.partial(read_source, extra_columns=extra_columns)
+        results = list(pool.map(read, [path for _, path in expanded]))
+
+    frames = {}
+    for (warehouse, _), df in zip(expanded, results):
+        # Isti naziv skladišta iz dva izvora - spoji ih
+        frames[warehouse] = pd.concat([frames[warehouse], df]) if warehouse in frames else df
+    return merge_warehouses(frames, extra_columns)
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+# ledger.py - STVARNI DSO KUPACA IZ KNJIGE FAKTURA I UPLATA
+#
+# Uplate se zatvaraju po FIFO principu (najstarija faktura prva). Fakture i
+# uplate su sortirane po (kupac, datum); kumulativni iznosi svakog kupca se
+# pomaknu za bazu kupca tako da cijela knjiga bude jedan rastući niz, pa jedan
+# searchsorted nađe uplatu koja zatvara svaku fakturu.
+import numpy as np
+import pandas as pd
+
+INVOICE_COLUMNS = {"customer", "date", "amount"}
+PAYMENT_COLUMNS = {"customer", "date", "amount"}
+DEFAULT_TERMS = 60  # rok plaćanja ako faktura nema due_date
+GRACE_DAYS = 5  # kašnjenje koje se još računa kao plaćeno na vrijeme
+AGING_EDGES = [30, 60, 90]
+AGING_BUCKETS = ["0-30", "31-60", "61-90", "90+"]
+# Kupac koji na vrijeme plati manje od ovog udjela faktura cijeni se kao
+# PROBLEM_CUSTOMER_TYPE (tip iz pricing_rules.json: viša marža, +dso_extra)
+PROBLEM_PAYMENT_HISTORY = 0.6
+PROBLEM_CUSTOMER_TYPE = "Problematični"
+
+
+def load_ledger(invoices_path, payments_path):
+    """Load invoices (customer, date, amount[, due_date]) and payments (customer, date, amount)"""
+    invoices = pd.read_csv(invoices_path, parse_dates=["date"])
+    payments = pd.read_csv(payments_path, parse_dates=["date"])
+    for frame, required, label in ((invoices, INVOICE_COLUMNS, "Fakture"), (payments, PAYMENT_COLUMNS, "Uplate")):
+        missing = required - set(frame.columns)
+        if missing:
+            raise ValueError(f"{label} nemaju kolone: {', '.join(sorted(missing))}")
+    if "due_date" in invoices:
+        invoices["due_date"] = pd.to_datetime(invoices["due_date"])
+    return invoices, payments
+
+
+def _days(dates):
+    return pd.to_datetime(dates).to_numpy().astype("datetime64[D]").astype(np.int64)
+
+
+def match_payments(invoices, payments, terms=DEFAULT_TERMS):
+    """FIFO-match payments to invoices
+
+    Returns the invoices (sorted by customer, date) with customer code,
+    paid_day (NaN while open), open_amount and due_day.
+    """
+    customers = pd.Index(pd.unique(pd.concat([invoices["customer"], payments["customer"]], ignore_index=True)))
+    inv_code = customers.get_indexer(invoices["customer"])
+    pay_code = customers.get_indexer(payments["customer"])
+    inv_day, pay_day = _days(invoices["date"]), _days(payments["date"])
+
+    inv_order = np.lexsort((inv_day, inv_code))
+    pay_order = np.lexsort((pay_day, pay_code))
+    inv_code, inv_day = inv_code[inv_order], inv_day[inv_order]
+    pay_code, pay_day = pay_code[pay_order], pay_day[pay_order]
+    # Iznosi u feninzima (int64), pa su kumulativni zbirovi tačni
+    amount = np.round(invoices["amount"].to_numpy(dtype=float)[inv_order] * 100).astype(np.int64)
+    paid = np.round(payments["amount"].to_numpy(dtype=float)[pay_order] * 100).astype(np.int64)
+
+    n = len(customers)
+    inv_total = np.bincount(inv_code, amount, n).astype(np.int64)
+    pay_total = np.bincount(pay_code, paid, n).astype(np.int64)
+    # Baza kupca: zbir svih prethodnih kupaca (+1), pa su ključevi globalno rastući
+    span = np.maximum(inv_total, pay_total) + 1
+    base = np.concatenate(([0], np.cumsum(span)[:-1]))
+
+    def within(code, values):
+        cum = np.cumsum(values)
+        start = np.searchsorted(code, np.arange(n))
+        return cum - np.concatenate(([0], cum))[start][code]
+
+    inv_cum = within(inv_code, amount)
+    pay_key = base[pay_code] + within(pay_code, paid)
+    closing = np.searchsorted(pay_key, base[inv_code] + inv_cum, side="left")
+    closing_ok = closing < len(pay_key)
+    closing_ok[closing_ok] = pay_code[closing[closing_ok]] == inv_code[closing_ok]
+
+    matched = invoices.iloc[inv_order].reset_index(drop=True)
+    matched["customer_code"] = inv_code
+    matched["day"] = inv_day
+    paid_day = np.full(len(inv_day), np.nan)
+    paid_day[closing_ok] = pay_day[closing[closing_ok]]
+    matched["paid_day"] = paid_day
+    # Djelimično plaćena faktura: otvoren je samo dio koji uplate ne pokrivaju
+    matched["open_amount"] = np.clip(inv_cum - pay_total[inv_code], 0, amount) / 100
+    if "due_date" in matched:
+        due = matched["due_date"].fillna(matched["date"] + pd.Timedelta(days=terms))
+        matched["due_day"] = _days(due)
+    else:
+        matched["due_day"] = inv_day + terms
+    matched.attrs["customers"] = customers
+    return matched
+
+
+def customer_metrics(invoices, payments, as_of=None, terms=DEFAULT_TERMS):
+    """Per-customer DSO, payment-history score and aging of open balances
+
+    dso: amount-weighted days from invoice to the payment that closed it
+    (open invoices count with their current age if nothing was paid yet).
+    payment_history: share of due amount paid within due date + GRACE_DAYS.
+    """
+    matched = match_payments(invoices, payments, terms)
+    customers = matched.attrs["customers"]
+    n = len(customers)
+    as_of_day = _days([as_of or pd.Timestamp.today()])[0]
+
+    code = matched["customer_code"].to_numpy()
+    amount = matched["amount"].to_numpy(dtype=float)
+    day = matched["day"].to_numpy()
+    paid_day = matched["paid_day"].to_numpy()
+    due_day = matched["due_day"].to_numpy()
+    open_amount = matched["open_amount"].to_numpy()
+    is_paid = ~np.isnan(paid_day)
+
+    paid_amount = np.bincount(code, np.where(is_paid, amount, 0), n)
+    days_to_pay = np.bincount(code, np.where(is_paid, (paid_day - day) * amount, 0), n)
+    open_age = as_of_day - day
+    open_weighted = np.bincount(code, open_age * open_amount, n)
+    open_total = np.bincount(code, open_amount, n)
+    dso = np.where(paid_amount > 0, days_to_pay / np.where(paid_amount > 0, paid_amount, 1),
+                   open_weighted / np.where(open_total > 0, open_total, 1))
+
+    # Na vrijeme: plaćeno do roka + tolerancija; dospjelo a neplaćeno je kašnjenje
+    settle_day = np.where(is_paid, paid_day, as_of_day)
+    due = is_paid | (due_day + GRACE_DAYS < as_of_day)
+    on_time = due & (settle_day <= due_day + GRACE_DAYS)
+    due_amount = np.bincount(code, np.where(due, amount, 0), n)
+    on_time_amount = np.bincount(code, np.where(on_time, amount, 0), n)
+    history = np.where(due_amount > 0, on_time_amount / np.where(due_amount > 0, due_amount, 1), 1.0)
+    late_days = np.bincount(code, np.where(due, np.maximum(settle_day - due_day, 0) * amount, 0), n)
+
+    metrics = pd.DataFrame({
+        "invoices": np.bincount(code, minlength=n),
+        "sales": np.bincount(code, amount, n),
+        "open_balance": open_total,
+        "dso": dso,
+        "avg_days_late": late_days / np.where(due_amount > 0, due_amount, 1),
+        "payment_history": history,
+    }, index=pd.Index(customers, name="customer"))
+
+    bucket = np.searchsorted(AGING_EDGES, open_age, side="left")
+    aging = np.bincount(code * len(AGING_BUCKETS) + bucket, open_amount,
+                        n * len(AGING_BUCKETS)).reshape(n, len(AGING_BUCKETS))
+    for i, label in enumerate(AGING_BUCKETS):
+        metrics[f"open_{label}"] = aging[:, i]
+    return metrics[metrics["invoices"] > 0]  # uplate bez ijedne fakture se ne prikazuju
+
+
+def pricing_customer_types(payment_history):
+    """Pricing customer type per customer (None = no customer-type adjustment)"""
+    history = np.asarray(payment_history, dtype=float)
+    return np.where(history < PROBLEM_PAYMENT_HISTORY, PROBLEM_CUSTOMER_TYPE, None).astype(object)
+
+
+def customer_parameters(metrics, customer):
+    """Profitability inputs for one customer (customer_dso, payment_history, total_sales, customer_type)"""
+    row = metrics.loc[customer]
+    return {
+        "customer_dso": int(round(row["dso"])),
+        "payment_history": float(row["payment_history"]),
+        "total_sales": round(float(row["sales"]), 2),
+        "customer_type": pricing_customer_types([row["payment_history"]])[0],
+    }
+
+
+def sales_weighted_dso(metrics):
+    """Portfolio DSO (customers weighted by sales)"""
+    sales = metrics["sales"].to_numpy()
+    return float(np.average(metrics["dso"], weights=sales)) if sales.sum() > 0 else None
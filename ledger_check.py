@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+# ledger_check.py - PROVJERE FIFO UPARIVANJA UPLATA I KNJIGE POTRAŽIVANJA
+#
+# Deterministički slučajevi sa poznatim rezultatom (djelimične uplate,
+# preplata, uplate bez fakture, prazne uplate, datumi sa vremenom) plus
+# nasumična knjiga: match_payments (globalni searchsorted nad feninzima) se
+# poredi sa skalarnom FIFO petljom po kupcu, a ReceivablesBook pomjeran dan
+# po dan (advance) sa knjigom izgrađenom ispočetka (from_ledger) za svaki dan.
+# Svaka optimizacija ovih puteva dolazi sa dokazom da je rezultat isti.
+#
+#   python ledger_check.py
+#   python ledger_check.py --customers 200 --days 365 --seed 7
+import argparse
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from ledger import AGING_BUCKETS, DEFAULT_TERMS, _days, customer_metrics, match_payments
+from receivables import ReceivablesBook, _rows_on
+
+SEED = 2024
+CUSTOMERS = 40
+DAYS = 240
+START = pd.Timestamp("2026-01-01")
+TOLERANCE = 0.005  # pola feninga
+
+# Naziv -> (fakture, uplate, očekivano po fakturi u redoslijedu match_payments:
+# (kupac, datum fakture, datum uplate koja je zatvara ili None, otvoreni iznos))
+CASES = {
+    "djelimična uplata": (
+        [("A", "2026-01-01", 100.0), ("A", "2026-01-10", 50.0)],
+        [("A", "2026-02-01", 120.0)],
+        [("A", "2026-01-01", "2026-02-01", 0.0), ("A", "2026-01-10", None, 30.0)],
+    ),
+    "faktura u dvije uplate": (
+        [("A", "2026-01-01", 100.0)],
+        [("A", "2026-01-20", 60.0), ("A", "2026-02-05", 40.0)],
+        [("A", "2026-01-01", "2026-02-05", 0.0)],
+    ),
+    "preplata se prenosi na sljedeću fakturu": (
+        [("A", "2026-01-01", 100.0), ("A", "2026-02-01", 80.0)],
+        [("A", "2026-01-20", 150.0)],
+        [("A", "2026-01-01", "2026-01-20", 0.0), ("A", "2026-02-01", None, 30.0)],
+    ),
+    "uplata prije fakture": (
+        [("A", "2026-01-10", 100.0)],
+        [("A", "2026-01-05", 100.0)],
+        [("A", "2026-01-10", "2026-01-05", 0.0)],
+    ),
+    "kupac bez faktura": (
+        [("A", "2026-01-01", 100.0)],
+        [("B", "2026-01-05", 40.0)],
+        [("A", "2026-01-01", None, 100.0)],
+    ),
+    "bez uplata": (
+        [("A", "2026-01-01", 100.0), ("B", "2026-01-02", 25.5)],
+        [],
+        [("A", "2026-01-01", None, 100.0), ("B", "2026-01-02", None, 25.5)],
+    ),
+    "preplata ne prelazi na drugog kupca": (
+        [("A", "2026-01-01", 100.0), ("A", "2026-01-15", 100.0), ("B", "2026-01-01", 100.0)],
+        [("A", "2026-01-10", 100.0), ("B", "2026-01-10", 250.0)],
+        [("A", "2026-01-01", "2026-01-10", 0.0), ("A", "2026-01-15", None, 100.0),
+         ("B", "2026-01-01", "2026-01-10", 0.0)],
+    ),
+    "datumi sa vremenom": (
+        [("A", "2026-01-01 15:30", 100.0), ("A", "2026-01-02 08:00", 0.01)],
+        [("A", "2026-01-05 09:00", 100.01)],
+        [("A", "2026-01-01 15:30", "2026-01-05", 0.0), ("A", "2026-01-02 08:00", "2026-01-05", 0.0)],
+    ),
+}
+
+
+# ---------- PODACI ----------
+def ledger_frame(rows):
+    """Invoice/payment table from (customer, date, amount) rows"""
+    frame = pd.DataFrame(rows, columns=["customer", "date", "amount"])
+    frame["date"] = pd.to_datetime(frame["date"])
+    frame["amount"] = frame["amount"].astype(float)
+    return frame
+
+
+def random_ledger(customers=CUSTOMERS, days=DAYS, seed=SEED):
+    """Random invoices and payments (partial payments, overpayments, times of day)"""
+    rng = np.random.default_rng(seed)
+    names = np.array([f"K{i:04d}" for i in range(customers)], dtype=object)
+    # Jedan kupac samo plaća, jedan nikad ne plaća
+    invoicing, paying = names[1:], names[:-1]
+    n_invoices = customers * days // 6
+    invoices = pd.DataFrame({
+        "customer": rng.choice(invoicing, n_invoices),
+        "date": START + pd.to_timedelta(rng.integers(0, days, n_invoices), unit="D")
+                + pd.to_timedelta(rng.integers(0, 24 * 60, n_invoices), unit="min"),
+        "amount": np.round(rng.lognormal(5, 1, n_invoices), 2) + 0.01,
+    })
+    n_payments = n_invoices * 3 // 4
+    payments = pd.DataFrame({
+        "customer": rng.choice(paying, n_payments),
+        "date": START + pd.to_timedelta(rng.integers(0, days, n_payments), unit="D")
+                + pd.to_timedelta(rng.integers(0, 24 * 60, n_payments), unit="min"),
+        "amount": np.round(rng.lognormal(5, 1.2, n_payments), 2) + 0.01,
+    })
+    return invoices, payments
+
+
+# ---------- REFERENCA ----------
+def reference_match(invoices, payments, terms=DEFAULT_TERMS):
+    """Scalar FIFO per customer: (paid_day, open_amount) in match_payments' row order"""
+    customers = pd.unique(pd.concat([invoices["customer"], payments["customer"]], ignore_index=True))
+    code = {name: i for i, name in enumerate(customers)}
+    by_customer = {}
+    for customer, day, cents in zip(payments["customer"], _days(payments["date"]),
+                                    np.round(payments["amount"].to_numpy(dtype=float) * 100).astype(np.int64)):
+        by_customer.setdefault(customer, []).append((int(day), int(cents)))
+
+    rows = sorted(zip([code[c] for c in invoices["customer"]], _days(invoices["date"]).tolist(),
+                      range(len(invoices)), invoices["customer"],
+                      np.round(invoices["amount"].to_numpy(dtype=float) * 100).astype(np.int64).tolist()))
+    paid_day, open_amount = [], []
+    pool, left, current = [], 0, None
+    for _, _, _, customer, cents in rows:
+        if customer != current:
+            # Uplate kupca od najstarije; `left` je neiskorišteni dio tekuće uplate
+            pool, left, current = sorted(by_customer.get(customer, []), key=lambda p: p[0]), 0, customer
+            pool.reverse()
+            closing = None
+        need = cents
+        while need > 0:
+            if left == 0:
+                if not pool:
+                    break
+                closing, left = pool.pop()
+            taken = min(need, left)
+            need, left = need - taken, left - taken
+        paid_day.append(np.nan if need > 0 else float(closing))
+        open_amount.append(need / 100)
+    return np.array(paid_day), np.array(open_amount)
+
+
+def rebuilt_book(invoices, payments, as_of):
+    """(aging totals, open amount per customer) of a book built from the full ledger"""
+    book = ReceivablesBook.from_ledger(invoices, payments, as_of=as_of)
+    return book.aging(), book.open_invoices().groupby("customer")["open_amount"].sum()
+
+
+# ---------- PROVJERE ----------
+def check_cases(show):
+    """Hand-written ledgers against their known FIFO result"""
+    ok = True
+    for name, (invoice_rows, payment_rows, expected) in CASES.items():
+        invoices, payments = ledger_frame(invoice_rows), ledger_frame(payment_rows)
+        matched = match_payments(invoices, payments)
+        want = pd.DataFrame(expected, columns=["customer", "date", "paid", "open_amount"])
+        want_paid = _days(want["paid"].fillna(pd.NaT)).astype(float)
+        want_paid[want["paid"].isna().to_numpy()] = np.nan
+        problems = []
+        if list(matched["customer"]) != list(want["customer"]) or \
+                not (_days(matched["date"]) == _days(want["date"])).all():
+            problems.append(f"order {list(zip(matched['customer'], matched['date']))}")
+        else:
+            if not np.array_equal(matched["paid_day"].to_numpy(), want_paid, equal_nan=True):
+                problems.append(f"paid_day {matched['paid_day'].tolist()} != {want_paid.tolist()}")
+            if not np.allclose(matched["open_amount"], want["open_amount"], rtol=0, atol=TOLERANCE):
+                problems.append(f"open_amount {matched['open_amount'].tolist()} != {want['open_amount'].tolist()}")
+            # Scalar referenca mora se slagati i sa ručno zadanim rezultatom
+            ref_paid, ref_open = reference_match(invoices, payments)
+            if not np.array_equal(ref_paid, want_paid, equal_nan=True) or \
+                    not np.allclose(ref_open, want["open_amount"], rtol=0, atol=TOLERANCE):
+                problems.append("scalar reference disagrees with the expected result")
+            # Kupac samo sa uplatama nema red u metrikama; otvoreno = zbir otvorenih faktura
+            metrics = customer_metrics(invoices, payments, as_of=pd.Timestamp("2026-06-30"))
+            if set(metrics.index) != set(want["customer"]):
+                problems.append(f"metrics customers {sorted(metrics.index)}")
+            elif not np.allclose(metrics["open_balance"],
+                                 want.groupby("customer", sort=False)["open_amount"].sum()
+                                 .reindex(metrics.index), rtol=0, atol=TOLERANCE):
+                problems.append("metrics open_balance")
+        ok &= report(name, problems, show)
+    return ok
+
+
+def check_random_match(invoices, payments, show):
+    """match_payments against the scalar FIFO loop on a random ledger"""
+    matched = match_payments(invoices, payments)
+    ref_paid, ref_open = reference_match(invoices, payments)
+    problems = []
+    bad_paid = ~((matched["paid_day"].to_numpy() == ref_paid) |
+                 (np.isnan(matched["paid_day"].to_numpy()) & np.isnan(ref_paid)))
+    bad_open = ~np.isclose(matched["open_amount"].to_numpy(), ref_open, rtol=0, atol=TOLERANCE)
+    for label, mask, got, want in (("paid_day", bad_paid, matched["paid_day"], ref_paid),
+                                   ("open_amount", bad_open, matched["open_amount"], ref_open)):
+        for i in np.flatnonzero(mask)[:show]:
+            problems.append(f"{label} {matched['customer'].iloc[i]} {matched['date'].iloc[i]:%Y-%m-%d}: "
+                            f"expected {want[i]!r}, got {got.iloc[i]!r}")
+        if mask.sum() > show:
+            problems.append(f"{label}: {int(mask.sum())} rows differ")
+    return report(f"match_payments ({len(invoices)} fakt.)", problems, show)
+
+
+def check_roll_forward(invoices, payments, show):
+    """ReceivablesBook.advance day by day against from_ledger for every day
+
+    Halfway through, the book is saved and loaded again (as between two
+    `receivables.py roll` runs).
+    """
+    dates = pd.to_datetime(pd.concat([invoices["date"], payments["date"]])).dt.normalize()
+    first, last = dates.min(), dates.max() + pd.Timedelta(days=max(DEFAULT_TERMS, 100))
+    start = (first + (last - first) / 3).normalize()
+    book = ReceivablesBook.from_ledger(invoices, payments, as_of=start)
+    invoices_on, payments_on = _rows_on(invoices), _rows_on(payments)
+    problems = []
+    days = pd.date_range(start + pd.Timedelta(days=1), last)
+    for day in days:
+        book.advance(day, invoices_on(day), payments_on(day))
+        if day == days[len(days) // 2]:
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, "book.npz")
+                book.save(path)
+                book = ReceivablesBook.load(path)
+        aging, balances = rebuilt_book(invoices, payments, day)
+        got = book.open_invoices().groupby("customer")["open_amount"].sum()
+        bad_aging = ~np.isclose(book.aging().to_numpy(), aging.to_numpy(), rtol=0, atol=TOLERANCE * 10)
+        diff = got.sub(balances, fill_value=0).abs()
+        bad_customers = diff[diff > TOLERANCE]
+        if bad_aging.any():
+            problems.append(f"{day:%Y-%m-%d} aging {dict(zip(AGING_BUCKETS, book.aging().round(2)))} "
+                            f"!= {dict(zip(AGING_BUCKETS, aging.round(2)))}")
+        for customer, amount in bad_customers.head(show).items():
+            problems.append(f"{day:%Y-%m-%d} {customer}: open {got.get(customer, 0):.2f} != "
+                            f"{balances.get(customer, 0):.2f}")
+        if len(problems) >= show:
+            break
+    return report(f"roll_forward ({(last - start).days} dana)", problems[:show], show)
+
+
+def report(name, problems, show):
+    """Print one check's verdict and its first problems; returns True if it passed"""
+    print(f"   {'✅ MATCH' if not problems else '❌ DIFFERS':<10} {name}")
+    for problem in problems[:show]:
+        print(f"      {problem}")
+    return not problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Check FIFO payment matching and the receivables roll-forward against references")
+    parser.add_argument("--customers", type=int, default=CUSTOMERS)
+    parser.add_argument("--days", type=int, default=DAYS, help="Ledger period (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--show", type=int, default=5, help="Problems shown per check")
+    args = parser.parse_args(argv)
+
+    print(f"\n📒 {len(CASES)} hand-written ledgers")
+    ok = check_cases(args.show)
+    invoices, payments = random_ledger(args.customers, args.days, args.seed)
+    print(f"\n🎲 Random ledger: {len(invoices)} invoices, {len(payments)} payments (seed {args.seed})")
+    ok &= check_random_match(invoices, payments, args.show)
+    ok &= check_roll_forward(invoices, payments, args.show)
+    print("\n" + ("🎉 Ledger paths match the references" if ok else "🚨 Differences found"))
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
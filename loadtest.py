@@ -0,0 +1,345 @@
+# -*- coding: utf-8 -*-
+# loadtest.py - TEST OPTEREĆENJA APLIKACIJE (VIŠE ISTOVREMENIH KORISNIKA)
+#
+# Svaki simulirani korisnik je jedna AppTest sesija nad app.py. Korisnici rade
+# u nitima jednog procesa - kao sesije na Streamlit serveru - pa dijele iste
+# keševe (cache_data, cache_resource, precompute). Korak korisnika: pređe na
+# slučajnu stranicu preko top navigacije, promijeni nekoliko widgeta slučajnim
+# dozvoljenim vrijednostima i ponekad klikne glavno dugme stranice.
+#
+# AppTest za vrijeme izvršavanja mijenja globalno stanje Streamlita (Runtime),
+# pa se izvršavanja skripte ne smiju preklapati: korisnici rade istovremeno,
+# ali čekaju red za izvršavanje - kao CPU-vezani skriptovi na jednom serveru
+# pod GIL-om. Zato se mjere dva vremena: render (samo izvršavanje skripte) i
+# latencija (čekanje u redu + render, ono što korisnik osjeti). Na kraju se
+# ispisuju p50/p95/p99 po stranici i akciji, memorija po sesiji (rast RSS-a)
+# i propusnost.
+#
+#   python loadtest.py --users 20 --steps 30 --csv samples.csv
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+
+# Stranica -> natpis dugmeta u top navigaciji (app.NAV_PAGES)
+PAGES = {
+    "dashboard": "📊 DASHBOARD",
+    "customer_analytics": "👥 ANALIZA KUPCA",
+    "price_calculator": "🧮 KALKULATOR",
+    "cash_flow": "💰 CASH FLOW",
+    "sales_analytics": "📈 PRODAJNA ANALIZA",
+}
+# Glavno dugme stranice (početak natpisa)
+SUBMIT = {
+    "dashboard": "▶️ Izvrši upit",
+    "customer_analytics": "🎯 IZRAČUNAJ",
+    "price_calculator": "🎯 Izračunaj",
+    "cash_flow": "📈 Generiši",
+}
+CUSTOMERS = 50  # različitih naziva kupaca koje korisnici upisuju (toliko analiza najviše u bazi)
+PERCENTILES = (50, 95, 99)
+SAMPLE_INTERVAL = 0.2  # sekundi između mjerenja RSS-a
+
+_RUN_LOCK = threading.Lock()  # jedno izvršavanje AppTest-a u isto vrijeme (vidi gore)
+
+
+# ---------- MEMORIJA ----------
+def rss_mb():
+    """Resident memory of this process in MB"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:  # nije Linux: najveći RSS do sada
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+
+class MemorySampler:
+    """Peak RSS, sampled in a background thread"""
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.peak = rss_mb()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, rss_mb())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, rss_mb())
+
+
+# ---------- SIMULIRANI KORISNIK ----------
+def _step_value(low, high, step, rng):
+    """Random multiple of step in [low, high]"""
+    steps = int((high - low) // step) if step else 0
+    return low + step * int(rng.integers(steps + 1)) if steps > 0 else low
+
+
+def vary(at, rng, changes):
+    """Set up to `changes` random widgets of the current page to random valid values
+
+    Returns the labels of the changed widgets. Navigation and action
+    buttons are left to the caller; text inputs only get customer names.
+    Selectboxes with a format_func are skipped: AppTest selects by the
+    shown label, which only works when the label is the value itself.
+    """
+    widgets = [w for kind in ("number_input", "slider", "selectbox", "checkbox") for w in getattr(at, kind)]
+    widgets = [w for w in widgets if not w.proto.disabled and (
+        type(w).__name__ != "Selectbox" or w.value is not None and str(w.format_func(w.value)) == str(w.value))]
+    changed = []
+    for i in rng.permutation(len(widgets))[:changes]:
+        w = widgets[i]
+        kind = type(w).__name__
+        if kind == "NumberInput":
+            value = w.value if w.value is not None else 0
+            low = w.min if w.proto.has_min else value * 0.5
+            high = w.max if w.proto.has_max else value * 1.5 + w.step
+            # Realne vrijednosti su blizu zadane, ne cijeli raspon (npr. prodaja do 10 miliona)
+            low, high = max(low, value * 0.5), min(high, value * 1.5 + w.step)
+            new = _step_value(low, high, w.step, rng)
+            w.set_value(int(new) if isinstance(w.value, int) else round(float(new), 6))
+        elif kind == "Slider":
+            if isinstance(w.value, (tuple, list)):
+                continue
+            new = _step_value(w.min, w.max, w.step, rng)
+            w.set_value(int(new) if isinstance(w.value, int) else round(float(new), 6))
+        elif kind == "Selectbox":
+            w.select_index(int(rng.integers(len(w.options))))
+        else:
+            w.set_value(not w.value)
+        changed.append(w.label)
+    for w in at.text_input:
+        if w.label == "Naziv kupca":
+            w.set_value(f"Kupac {int(rng.integers(CUSTOMERS)) + 1}")
+    return changed
+
+
+def _button(at, prefix):
+    return next((b for b in at.button if str(b.label).startswith(prefix)), None)
+
+
+class Session:
+    """One simulated user: an AppTest session plus its timing samples"""
+
+    def __init__(self, user, seed=0, timeout=120):
+        self.user = user
+        self.rng = np.random.default_rng([seed, user])
+        self.at = None
+        self.page = None
+        self.timeout = timeout
+        self.samples = []
+
+    def _run(self, page, action, step):
+        queued = time.perf_counter()
+        error = None
+        with _RUN_LOCK:
+            started = time.perf_counter()
+            try:
+                self.at.run()
+                if self.at.exception:
+                    error = str(self.at.exception[0].value).splitlines()[0]
+            except Exception as e:  # istek vremena, greška u skripti
+                error = f"{type(e).__name__}: {e}"
+            finished = time.perf_counter()
+        self.samples.append({"user": self.user, "step": step, "page": page, "action": action,
+                             "render": finished - started, "latency": finished - queued, "error": error})
+        return error is None
+
+    def open(self):
+        """First visit (landing page)"""
+        from streamlit.testing.v1 import AppTest
+        self.at = AppTest.from_file(APP, default_timeout=self.timeout)
+        self.page = "dashboard"
+        return self._run(self.page, "open", 0)
+
+    def step(self, step, pages, changes=3, click=0.5):
+        """Go to a random page, change some inputs, maybe press the page's main button"""
+        page = pages[int(self.rng.integers(len(pages)))]
+        if page != self.page:
+            nav = _button(self.at, PAGES[page])
+            if nav is None:
+                return
+            nav.click()
+            self.page = page
+            if not self._run(page, "view", step):
+                return
+        if changes and vary(self.at, self.rng, changes):
+            if not self._run(page, "input", step):
+                return
+        submit = _button(self.at, SUBMIT[page]) if page in SUBMIT else None
+        if submit is not None and self.rng.random() < click:
+            submit.click()
+            self._run(page, "submit", step)
+
+
+def simulate(users, steps, pages, seed=0, think=0.0, changes=3, click=0.5, ramp_up=0.0, duration=None,
+             timeout=120, progress=None):
+    """Run `users` concurrent sessions; returns (samples frame, sessions)
+
+    Users start spread over `ramp_up` seconds and wait about `think`
+    seconds between steps (exponential). `duration` stops every user
+    after that many seconds even if steps remain.
+    """
+    sessions = [Session(user, seed, timeout) for user in range(users)]
+    started = time.monotonic()
+    stop_at = None if duration is None else started + ramp_up + duration
+    done = [0]
+    lock = threading.Lock()
+
+    def user_loop(session):
+        time.sleep(ramp_up * session.user / max(users, 1))
+        session.open()
+        for step in range(1, steps + 1):
+            if stop_at is not None and time.monotonic() >= stop_at:
+                break
+            session.step(step, pages, changes, click)
+            if think:
+                time.sleep(session.rng.exponential(think))
+        with lock:
+            done[0] += 1
+            if progress:
+                progress(done[0], users)
+
+    threads = [threading.Thread(target=user_loop, args=(s,), daemon=True) for s in sessions]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    samples = pd.DataFrame([row for s in sessions for row in s.samples])
+    return samples, sessions
+
+
+# ---------- IZVJEŠTAJ ----------
+def latency_table(samples):
+    """Runs, errors and p50/p95/p99 of render time and latency (ms) per page and action"""
+    if samples.empty:
+        return pd.DataFrame()
+    ms = samples.assign(failed=samples["error"].notna())
+    rows = {key: group for key, group in ms.groupby(["page", "action"], sort=True)}
+    rows[("ALL", "")] = ms
+    table = {}
+    for key, group in rows.items():
+        row = {"runs": len(group), "errors": int(group["failed"].sum())}
+        for column in ("render", "latency"):
+            values = group[column].to_numpy() * 1000
+            for p, value in zip(PERCENTILES, np.percentile(values, PERCENTILES)):
+                row[f"{column}_p{p}"] = value
+        table[key] = row
+    return pd.DataFrame.from_dict(table, orient="index").rename_axis(["page", "action"])
+
+
+def print_report(samples, wall, users, baseline_mb, end_mb, peak_mb):
+    print("\n" + "=" * 90)
+    print(f"⏱️  RENDER TIME AND LATENCY PER PAGE (ms) - {users} concurrent users")
+    print("=" * 90)
+    table = latency_table(samples)
+    print(table.round(1).to_string() if len(table) else "   (no runs)")
+    if len(table):
+        busy = samples["render"].sum() / wall * 100
+        print(f"   render = script run only; latency = waiting for a free runner + render ({busy:.0f}% busy)")
+
+    runs = len(samples)
+    views = int(samples["action"].isin(["open", "view"]).sum()) if runs else 0
+    print(f"\n🚀 Throughput: {runs / wall:.2f} reruns/s, {views / wall:.2f} page views/s "
+          f"({runs} reruns in {wall:.1f}s)")
+    per_session = (end_mb - baseline_mb) / users if users else 0.0
+    print(f"🧠 Memory: {baseline_mb:.0f} MB after warm-up → {end_mb:.0f} MB with {users} sessions "
+          f"(peak {peak_mb:.0f} MB), ≈{per_session:.1f} MB per session")
+    errors = samples[samples["error"].notna()] if runs else samples
+    if len(errors):
+        print(f"\n❌ {len(errors)} failed reruns:")
+        for (page, error), count in errors.groupby(["page", "error"]).size().head(10).items():
+            print(f"   {page}: {error} ({count}×)")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Load test app.py with concurrent simulated sessions (AppTest)")
+    parser.add_argument("--users", type=int, default=10, help="Concurrent sessions (default: %(default)s)")
+    parser.add_argument("--steps", type=int, default=20, help="Steps per user (default: %(default)s)")
+    parser.add_argument("--duration", type=float, metavar="SECONDS", help="Stop every user after this long")
+    parser.add_argument("--pages", nargs="+", choices=list(PAGES), default=list(PAGES),
+                        help="Pages users visit (default: all five)")
+    parser.add_argument("--changes", type=int, default=3, help="Widgets changed per step (default: %(default)s)")
+    parser.add_argument("--click", type=float, default=0.5,
+                        help="Probability of pressing the page's main button per step (default: %(default)s)")
+    parser.add_argument("--think", type=float, default=0.0, metavar="SECONDS",
+                        help="Mean pause between a user's steps (default: none)")
+    parser.add_argument("--ramp-up", type=float, default=0.0, metavar="SECONDS",
+                        help="Spread user start times over this period")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=120, help="Seconds per rerun before it fails")
+    parser.add_argument("--no-warmup", action="store_true",
+                        help="Measure with cold caches (default: one untimed session visits every page first)")
+    parser.add_argument("--store", help="Analysis store for saved customer analyses (default: a temporary file)")
+    parser.add_argument("--csv", metavar="FILE", help="Write every timing sample to this CSV")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    # Analize koje korisnici sačuvaju ne idu u pravu bazu; mora se postaviti prije uvoza app.py
+    tmp = None
+    if args.store is None:
+        tmp = tempfile.TemporaryDirectory(prefix="loadtest-")
+        args.store = os.path.join(tmp.name, "analyses.db")
+    os.environ["ANALYSIS_STORE"] = args.store
+    # Upozorenja Streamlita bez servera (ScriptRunContext, zastarjeli parametri) nisu dio mjerenja;
+    # konfiguracija se učita prije, inače bi njeno učitavanje vratilo nivo logovanja
+    from streamlit import config, logger
+    config.get_config_options()
+    logger.set_log_level("error")
+
+    try:
+        if not args.no_warmup:
+            print("🔥 Warm-up: visiting every page once...")
+            warm = Session(args.users, args.seed, args.timeout)  # izvan raspona korisnika
+            warm.open()
+            for page in PAGES:
+                warm.step(0, [page], changes=0, click=1.0)
+            failed = [s for s in warm.samples if s["error"]]
+            if failed:
+                print(f"⚠️  Warm-up errors: {', '.join(sorted({s['page'] for s in failed}))}")
+            del warm
+        baseline = rss_mb()
+
+        print(f"👥 {args.users} users × {args.steps} steps on {', '.join(args.pages)}")
+        started = time.perf_counter()
+        with MemorySampler() as memory:
+            samples, sessions = simulate(
+                args.users, args.steps, args.pages, args.seed, args.think, args.changes, args.click,
+                args.ramp_up, args.duration, args.timeout,
+                progress=lambda done, total: print(f"\r   ⏳ {done}/{total} users finished", end="",
+                                                   file=sys.stderr, flush=True))
+            print(file=sys.stderr)
+            wall = time.perf_counter() - started
+            end = rss_mb()  # sesije su još žive
+        print_report(samples, wall, args.users, baseline, end, memory.peak)
+        if args.csv:
+            samples.to_csv(args.csv, index=False)
+            print(f"\n💾 {len(samples)} samples saved to {args.csv}")
+        del sessions
+        return 1 if samples.empty or samples["error"].notna().any() else 0
+    finally:
+        if tmp is not None:
+            tmp.cleanup()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
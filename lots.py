@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+# lots.py - STAROST ZALIHE PO LOTOVIMA (FIFO)
+#
+# Svaki prijem robe je jedan lot. Lotovi su u ravnim NumPy nizovima sortiranim
+# po (SKU, datum prijema), pa je svaki SKU jedan neprekinut segment i sve
+# operacije po SKU su segmentne redukcije (cumsum / bincount).
+import numpy as np
+import pandas as pd
+
+from pricing_rules import STATUSES, get_rules
+
+RECEIPT_COLUMNS = {"id", "date", "quantity"}
+
+
+class LotBook:
+    """Open inventory lots in flat arrays sorted by (SKU, receipt date)"""
+
+    def __init__(self, ids, sku, received, quantity, cost):
+        self.ids = np.asarray(ids)
+        self.sku = np.asarray(sku, dtype=np.int64)
+        self.received = np.asarray(received, dtype="datetime64[D]")
+        self.quantity = np.asarray(quantity, dtype=float)
+        self.cost = np.asarray(cost, dtype=float)
+        # Početak segmenta svakog SKU (prazni segmenti imaju start == kraj)
+        self.starts = np.searchsorted(self.sku, np.arange(len(self.ids)))
+
+    @classmethod
+    def from_receipts(cls, receipts):
+        """Build the book from receipts (id, date, quantity[, cost])"""
+        receipts = receipts[receipts["quantity"] > 0]
+        sku, ids = pd.factorize(receipts["id"], sort=True)
+        received = pd.to_datetime(receipts["date"]).to_numpy().astype("datetime64[D]")
+        cost = receipts["cost"] if "cost" in receipts else pd.Series(np.nan, index=receipts.index)
+        # Jedan int64 ključ (SKU, dan) sortira se znatno brže od lexsort
+        day = received.astype(np.int64)
+        span = int(day.max() - day.min()) + 1 if len(day) else 1
+        order = np.argsort(sku * span + (day - (day.min() if len(day) else 0)))
+        return cls(np.asarray(ids), sku[order], received[order],
+                   receipts["quantity"].to_numpy(dtype=float)[order], cost.to_numpy(dtype=float)[order])
+
+    def __len__(self):
+        return len(self.sku)
+
+    def _before(self):
+        """Quantity in earlier lots of the same SKU (exclusive segment cumsum)"""
+        cum = np.cumsum(self.quantity)
+        segment_base = np.concatenate(([0.0], cum))[self.starts][self.sku]
+        return cum - self.quantity - segment_base
+
+    def on_hand(self):
+        """Quantity on hand per SKU"""
+        return np.bincount(self.sku, self.quantity, len(self.ids))
+
+    def consume(self, sales):
+        """Take sold quantities (id, quantity) out of the oldest lots first
+
+        Returns (new book, oversold quantity per SKU). FIFO only depends on the
+        total sold per SKU, so sales can be applied in one pass regardless of
+        their dates.
+        """
+        codes = pd.Index(self.ids).get_indexer(sales["id"])
+        known = codes >= 0
+        sold = np.bincount(codes[known], sales["quantity"].to_numpy(dtype=float)[known], len(self.ids))
+        oversold = np.maximum(sold - self.on_hand(), 0)
+
+        taken = np.clip(sold[self.sku] - self._before(), 0, self.quantity)
+        remaining = self.quantity - taken
+        keep = remaining > 0
+        book = LotBook(self.ids, self.sku[keep], self.received[keep], remaining[keep], self.cost[keep])
+        return book, pd.Series(oversold, index=self.ids, name="oversold")
+
+    def ages(self, as_of=None):
+        """Age of every lot in days"""
+        as_of = np.datetime64(pd.Timestamp(as_of or pd.Timestamp.today()).date(), "D")
+        return np.maximum((as_of - self.received).astype(np.int64), 0)
+
+
+def load_receipts(path):
+    """Load goods receipts (id, date, quantity[, cost])"""
+    receipts = pd.read_csv(path, parse_dates=["date"])
+    missing = RECEIPT_COLUMNS - set(receipts.columns)
+    if missing:
+        raise ValueError(f"Prijemnice nemaju kolone: {', '.join(sorted(missing))}")
+    return receipts
+
+
+def price_lots(book, products, as_of=None, dso=83, supplier_terms=None, annual_interest=None,
+               rules=None):
+    """Price every lot at its own age and roll the result up per SKU
+
+    Lots without a unit cost use the product cost. Lots of SKUs missing from
+    `products` are skipped. Returns one row per product that has open lots.
+    """
+    rules = rules or get_rules()
+    row = pd.Index(products["id"]).get_indexer(book.ids)
+    lot_row = row[book.sku]
+    known = lot_row >= 0
+    lot_row = lot_row[known]
+    sku = book.sku[known]
+    quantity = book.quantity[known]
+    days = book.ages(as_of)[known]
+
+    product_cost = products["cost"].to_numpy(dtype=float)
+    cost = book.cost[known]
+    cost = np.where(np.isnan(cost), product_cost[lot_row], cost)
+    codes = rules.category_codes(products["category"].astype(str))[lot_row]
+    quote = rules.price(cost, days, codes=codes, dso=dso,
+                        supplier_terms=supplier_terms, annual_interest=annual_interest)
+
+    n = len(book.ids)
+    units = np.bincount(sku, quantity, n)
+    present = units > 0
+    per_unit = np.where(units > 0, units, 1.0)
+
+    def total(values):
+        return np.bincount(sku, values * quantity, n)
+
+    # Segmenti su sortirani po datumu prijema, pa je najstariji lot prvi
+    first = np.r_[True, sku[1:] != sku[:-1]] if len(sku) else np.zeros(0, dtype=bool)
+    oldest = np.full(n, -1, dtype=np.int64)
+    oldest[sku[first]] = days[first]
+    by_status = np.bincount(sku * len(STATUSES) + quote["status"], quantity,
+                            n * len(STATUSES)).reshape(n, len(STATUSES))
+
+    rollup = pd.DataFrame({
+        "id": book.ids,
+        "lots": np.bincount(sku, minlength=n),
+        "quantity": units,
+        "avg_days": total(days) / per_unit,
+        "oldest_days": oldest,
+        "cost": total(cost) / per_unit,
+        "price": total(quote["price"]) / per_unit,
+        "financing": total(quote["financing"]),
+        "storage": total(quote["storage"]),
+        "value": total(quote["price"]),
+    })
+    for i, status in enumerate(STATUSES):
+        rollup[f"qty_{status.lower()}"] = by_status[:, i]
+    return rollup[present].reset_index(drop=True)
@@ -1,16 +1,38 @@
 # -*- coding: utf-8 -*-
 #!/usr/bin/env python3
 # main.py - POBOLJŠANI MVP
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
+import argparse
+import heapq
+import importlib
+import multiprocessing
 import sys
 
-print("=" * 70)
-print("💰 DYNAMIC PRICING & INVENTORY MANAGEMENT SYSTEM")
-print("=" * 70)
+from accrual import WAREHOUSE_PREFIX, accrue, hold_vs_discount, warehouse_columns
+from elasticity import HORIZON_DAYS, load_sales_history, optimize_prices
+import fx
+from forecast import at_risk, fit_state_demand, load_state, project, save_state, sell_through_rates, update_state
+from ingest import load_sources, normalize_columns, read_source
+from ledger import customer_metrics, load_ledger, pricing_customer_types
+from lots import LotBook, load_receipts, price_lots
+from pricing_rules import STATUSES, get_rules
+from query import EXAMPLE_QUERIES, QueryEngine, pricing_table
+from ranking import SCORES, leaderboard, score, top_k
+import shard
+from snapshot import is_fresh, open_snapshot, snapshot_path_for
+
+# Shared pricing rules (pricing_rules.json) - same ones the dashboard uses
+RULES = get_rules()
+
+# Action and urgency per status (same order as STATUSES)
+ACTIONS = ("HOLD_PRICE", "HOLD_OR_SMALL_DISCOUNT", "OFFER_DISCOUNT", "SELL_IMMEDIATELY")
+URGENCIES = ("🟢 LOW", "🟡 MEDIUM", "🟠 HIGH", "🔴 CRITICAL")
 
 class Product:
-    def __init__(self, id, name, cost, current_price, days_old, quantity, category="General"):
+    def __init__(self, id, name, cost, current_price, days_old, quantity, category="General", warehouses=None,
+                 currency=fx.BASE):
         self.id = id
         self.name = name
         self.cost = cost
@@ -18,28 +40,22 @@ class Product:
         self.days_old = days_old
         self.quantity = quantity
         self.category = category
+        self.warehouses = warehouses or {}  # quantity per warehouse (merged sources)
+        self.currency = currency  # cost and price currency (pricing rules are currency-neutral)
     
     def get_inventory_status(self):
         """Determine inventory status based on age"""
-        if self.days_old > 180:
-            return "DEAD_STOCK"
-        elif self.days_old > 90:
-            return "SLOW_MOVING"
-        elif self.days_old > 30:
-            return "NORMAL"
-        else:
-            return "FRESH"
-    
-    def calculate_financing_cost(self, dso=83, supplier_terms=60):
+        return RULES.status(self.days_old, self.category)
+    
+    def calculate_financing_cost(self, dso=83, supplier_terms=RULES.supplier_terms):
         """Calculate financing cost based on cash gap"""
         cash_gap = max(dso - supplier_terms, 0)  # Days we need to finance
-        annual_interest = 0.08  # 8%
-        daily_interest = annual_interest / 365
+        daily_interest = RULES.annual_interest / 365
         return self.current_price * daily_interest * cash_gap
     
     def calculate_storage_cost(self):
-        """Calculate storage cost (0.5% monthly)"""
-        monthly_rate = 0.005
+        """Calculate storage cost (monthly rate from the pricing rules)"""
+        monthly_rate = RULES.rules_for(self.category)["monthly_storage"]
         months_stored = self.days_old / 30
         return self.cost * monthly_rate * months_stored
     
@@ -47,48 +63,15 @@ class Product:
         """Get pricing recommendation with all costs included"""
         status = self.get_inventory_status()
         
-        # Base price multipliers by status
-        multipliers = {
-            "FRESH": 1.5,        # 50% margin
-            "NORMAL": 1.3,       # 30% margin
-            "SLOW_MOVING": 1.1,  # 10% margin
-            "DEAD_STOCK": 0.95   # 5% loss - sell quickly!
-        }
-        
-        # Calculate base recommended price
-        base_price = self.cost * multipliers[status]
-        
-        # Adjust for costs
-        financing_cost = self.calculate_financing_cost(dso)
-        storage_cost = self.calculate_storage_cost()
-        
-        # Final recommended price
-        recommended_price = base_price - financing_cost - storage_cost
-        
-        # Make sure we don't go below certain thresholds
-        if status == "DEAD_STOCK":
-            recommended_price = min(recommended_price, self.cost * 0.95)  # Max 5% loss
-        elif recommended_price < self.cost * 1.05:  # At least 5% margin
-            recommended_price = self.cost * 1.05
+        # Base multiplier, financing, storage and the floor/cap all come from the rules
+        quote = RULES.quote(self.cost, self.days_old, self.category, dso)
+        recommended_price = quote.price
         
         # Determine action and message
-        if status == "DEAD_STOCK":
-            action = "SELL_IMMEDIATELY"
-            urgency = "🔴 CRITICAL"
-            message = f"PRODAJ ODMAH! Roba stara {self.days_old} dana"
-        elif status == "SLOW_MOVING":
-            action = "OFFER_DISCOUNT"
-            urgency = "🟠 HIGH"
-            discount_pct = ((self.current_price - recommended_price) / self.current_price * 100)
-            message = f"Ponudi {discount_pct:.0f}% popusta ({recommended_price:.2f} KM)"
-        elif status == "NORMAL":
-            action = "HOLD_OR_SMALL_DISCOUNT"
-            urgency = "🟡 MEDIUM"
-            message = f"Možeš držati cijenu ili ponuditi mali popust"
-        else:  # FRESH
-            action = "HOLD_PRICE"
-            urgency = "🟢 LOW"
-            message = f"Drži cijenu - roba se brzo kreće"
+        code = STATUSES.index(status)
+        action, urgency = ACTIONS[code], URGENCIES[code]
+        message = recommendation_message(code, self.days_old, self.current_price, recommended_price,
+                                         currency=self.currency)
         
         # Calculate profitability metrics
         gross_margin = recommended_price - self.cost
@@ -100,6 +83,7 @@ class Product:
         return {
             "ID": self.id,
             "Product": self.name,
+            "Currency": self.currency,
             "Status": status,
             "Urgency": urgency,
             "Current_Price": self.current_price,
@@ -114,29 +98,134 @@ class Product:
             "Total_Profit": round(total_profit, 2)
         }
 
+def recommendation_message(code, days_old, current_price, recommended_price, discount_pct=None,
+                           currency=fx.BASE):
+    """Message shown next to a recommendation (status code from STATUSES)
+
+    discount_pct: discount already computed from the unrounded price
+    (recommendations_frame keeps only the rounded one).
+    """
+    if code == 3:
+        return f"PRODAJ ODMAH! Roba stara {days_old} dana"
+    if code == 2:
+        if discount_pct is None:
+            discount_pct = (current_price - recommended_price) / current_price * 100
+        return f"Ponudi {discount_pct:.0f}% popusta ({recommended_price:.2f} {currency})"
+    if code == 1:
+        return "Možeš držati cijenu ili ponuditi mali popust"
+    return "Drži cijenu - roba se brzo kreće"
+
+def round_like_python(values, decimals):
+    """np.round, except that near-ties are rounded like round() (the scalar path)"""
+    values = np.asarray(values, dtype=float)
+    scaled = values * 10 ** decimals
+    rounded = np.round(scaled) / 10 ** decimals
+    tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    rounded[tie] = [round(v, decimals) for v in values[tie].tolist()]
+    return rounded
+
+def recommendations_frame(products, dso=83):
+    """Pricing recommendations for all products, built column-wise
+
+    Status/Urgency/Action are categoricals and per-unit figures float32;
+    messages and number formatting are added only for output. Discount_%
+    (only for SLOW_MOVING, not exported) is the message's discount from the
+    unrounded price, already rounded the way the message formats it.
+    """
+    cost = np.array([p.cost for p in products], dtype=float)
+    current = np.array([p.current_price for p in products], dtype=float)
+    days = np.array([p.days_old for p in products], dtype=np.int32)
+    quantity = np.array([p.quantity for p in products], dtype=np.int64)
+    quote = RULES.price(cost, days, [p.category for p in products], dso)
+    status = quote["status"]
+    recommended = quote["price"]
+    unit_profit = recommended - cost
+    total_value = quantity * recommended
+    # np.rint rounds like f"{x:.0f}" (and keeps -0), so messages match the scalar path
+    discount = np.where(status == 2, np.rint((current - recommended) / current * 100), np.nan)
+    
+    return pd.DataFrame({
+        "ID": [p.id for p in products],
+        "Product": [p.name for p in products],
+        "Currency": pd.Categorical([p.currency for p in products]),
+        "Status": pd.Categorical.from_codes(status, STATUSES),
+        "Urgency": pd.Categorical.from_codes(status, URGENCIES),
+        "Current_Price": current.astype(np.float32),
+        # The price is used downstream (SQL, carrying cost, forecast) - keep float64
+        "Recommended_Price": round_like_python(recommended, 2),
+        "Action": pd.Categorical.from_codes(status, ACTIONS),
+        "Days_Old": days,
+        "Quantity": quantity.astype(np.int32),
+        "Unit_Profit": round_like_python(unit_profit, 2).astype(np.float32),
+        "Margin_%": round_like_python(unit_profit / cost * 100, 1).astype(np.float32),
+        "Total_Value": round_like_python(total_value, 2),
+        "Total_Profit": round_like_python(total_value - quantity * cost, 2),
+        "Discount_%": discount.astype(np.float32),
+    })
+
+def recommendation_messages(df):
+    """Message per row of recommendations_frame (formatted only for output)"""
+    return [recommendation_message(code, days, current, recommended, discount, currency)
+            for code, days, current, recommended, discount, currency in zip(
+                df["Status"].cat.codes, df["Days_Old"], df["Current_Price"], df["Recommended_Price"],
+                df["Discount_%"], df["Currency"])]
+
 def load_products_from_csv(filename="products.csv"):
-    """Load products from CSV file"""
+    """Load products from CSV file (or its compiled snapshot, if up to date)"""
     try:
-        df = pd.read_csv(filename)
-        products = []
+        snapshot = snapshot_path_for(filename)
+        if is_fresh(snapshot, filename):
+            return products_from_frame(open_snapshot(snapshot).to_frame())
         
-        for _, row in df.iterrows():
-            product = Product(
-                id=row['id'],
-                name=row['name'],
-                cost=float(row['cost']),
-                current_price=float(row['price']),
-                days_old=int(row['days']),
-                quantity=int(row['quantity'])
-            )
-            products.append(product)
-        
-        return products
+        # Same reader as the snapshot compiler, so the CSV's categories are kept either way
+        return products_from_frame(read_source(filename))
     except Exception as e:
         print(f"⚠️  Error loading CSV: {e}")
         print("Using sample data instead...")
         return get_sample_products()
 
+def products_from_frame(df):
+    """Build Product objects from a standard product table"""
+    warehouse_cols = warehouse_columns(df)
+    names = [c[len(WAREHOUSE_PREFIX):] for c in warehouse_cols]
+    split = df[warehouse_cols].to_numpy().tolist() if warehouse_cols else [None] * len(df)
+    currencies = fx.validate(fx.normalize(df['currency'])) if 'currency' in df else [fx.BASE] * len(df)
+    return [
+        Product(id, name, float(cost), float(price), int(days), int(quantity), category,
+                dict(zip(names, qty)) if qty else None, currency)
+        for id, name, category, cost, price, days, quantity, qty, currency in zip(
+            df['id'], df['name'], df['category'], df['cost'],
+            df['price'], df['days'], df['quantity'], split, currencies)
+    ]
+
+def products_to_frame(products):
+    """Standard product table from Product objects"""
+    df = pd.DataFrame({
+        'id': [p.id for p in products],
+        'name': [p.name for p in products],
+        'category': [p.category for p in products],
+        'cost': [p.cost for p in products],
+        'price': [p.current_price for p in products],
+        'days': [p.days_old for p in products],
+        'quantity': [p.quantity for p in products],
+        'currency': [p.currency for p in products],
+    })
+    warehouses = sorted({wh for p in products for wh in p.warehouses})
+    for wh in warehouses:
+        df[f"{WAREHOUSE_PREFIX}{wh}"] = [p.warehouses.get(wh, 0) for p in products]
+    return df
+
+def load_products_from_sources(sources):
+    """Load and merge products from several warehouse exports"""
+    try:
+        df = load_sources(sources)
+        print(f"🏬 Merged {len(df)} products from {len(sources)} source(s)")
+        return products_from_frame(df)
+    except Exception as e:
+        print(f"⚠️  Error loading sources: {e}")
+        print("Using sample data instead...")
+        return get_sample_products()
+
 def get_sample_products():
     """Get sample products if CSV doesn't exist"""
     return [
@@ -147,70 +236,601 @@ def get_sample_products():
         Product(5, "PVC cijev 50mm", 3.50, 6.00, 250, 150, "Plumbing"),
     ]
 
-def display_analysis(products, dso=83):
-    """Display analysis results"""
-    print(f"\n📊 INVENTORY ANALYSIS (DSO: {dso} days, Supplier terms: 60 days)")
+def display_analysis(products, dso=83, currency=fx.BASE, rates=None):
+    """Display analysis results (per product in its own currency, totals in `currency`)"""
+    print(f"\n📊 INVENTORY ANALYSIS (DSO: {dso} days, Supplier terms: {RULES.supplier_terms} days)")
     print("-" * 100)
     
-    recommendations = []
-    total_profit = 0
-    dead_stock_count = 0
-    
-    for product in products:
-        rec = product.get_price_recommendation(dso)
-        recommendations.append(rec)
-        total_profit += rec["Total_Profit"]
-        
-        if rec["Status"] == "DEAD_STOCK":
-            dead_stock_count += 1
-    
-    # Convert to DataFrame for nice display
-    df = pd.DataFrame(recommendations)
+    df = recommendations_frame(products, dso)
+    total_value, total_profit = reporting_totals(df, currency, rates)
+    dead_stock_count = int((df['Status'] == "DEAD_STOCK").sum())
+    messages = recommendation_messages(df)
     
     # Display in a nice format
     print("\n" + "=" * 100)
     print("🎯 PRICING RECOMMENDATIONS:")
     print("=" * 100)
     
-    for rec in recommendations:
+    for rec, message in zip(df.to_dict("records"), messages):
         print(f"\n{rec['Urgency']} {rec['Product']}")
         print(f"   📅 Status: {rec['Status']} ({rec['Days_Old']} days old)")
-        print(f"   💰 Current: {rec['Current_Price']} KM → Recommended: {rec['Recommended_Price']} KM")
-        print(f"   📈 Profit/unit: {rec['Unit_Profit']} KM ({rec['Margin_%']}%)")
-        print(f"   📦 Quantity: {rec['Quantity']} → Total value: {rec['Total_Value']} KM")
+        unit = rec['Currency']
+        print(f"   💰 Current: {rec['Current_Price']:.2f} {unit} → Recommended: {rec['Recommended_Price']:.2f} {unit}")
+        print(f"   📈 Profit/unit: {rec['Unit_Profit']:.2f} {unit} ({rec['Margin_%']:.1f}%)")
+        print(f"   📦 Quantity: {rec['Quantity']} → Total value: {rec['Total_Value']:.2f} {unit}")
         print(f"   📢 Action: {rec['Action']}")
-        print(f"   💬 {rec['Message']}")
+        print(f"   💬 {message}")
+    
+    print_summary(df['Status'].value_counts(), len(df), total_value, total_profit,
+                  df['Margin_%'].mean(), currency)
     
-    # Summary statistics
+    # Export to CSV
+    output_file = "pricing_recommendations.csv"
+    export_recommendations(df, messages, output_file)
+    print(f"\n💾 Recommendations exported to: {output_file}")
+    
+    return df
+
+def export_recommendations(df, messages, output_file, append=False):
+    """Write recommendations (with their messages) to CSV"""
+    export = df.drop(columns="Discount_%")
+    export.insert(export.columns.get_loc('Action') + 1, 'Message', messages)
+    export.to_csv(output_file, index=False, encoding='utf-8', mode='a' if append else 'w', header=not append)
+
+def reporting_totals(df, currency=fx.BASE, rates=None):
+    """(total value, total profit) of recommendations_frame rows in `currency`"""
+    return (float(fx.convert(df['Total_Value'], df['Currency'], currency, rates).sum()),
+            float(fx.convert(df['Total_Profit'], df['Currency'], currency, rates).sum()))
+
+def print_summary(status_counts, total_products, total_value, total_profit, avg_margin, currency=fx.BASE):
+    """Summary statistics (status counts: Series indexed by status, totals in `currency`)"""
     print("\n" + "=" * 100)
     print("📈 SUMMARY STATISTICS:")
     print("=" * 100)
     
     print(f"\n📊 Inventory Status:")
-    status_counts = df['Status'].value_counts()
+    # Ties keep the STATUSES order, so every run mode prints the same
+    status_counts = status_counts.reindex(STATUSES, fill_value=0)
+    status_counts = status_counts[status_counts > 0].sort_values(ascending=False, kind="stable")
     for status, count in status_counts.items():
         print(f"   {status}: {count} products")
     
     print(f"\n💰 Financial Summary:")
-    print(f"   Total Products: {len(df)}")
-    print(f"   Total Inventory Value: {df['Total_Value'].sum():.2f} KM")
-    print(f"   Total Potential Profit: {total_profit:.2f} KM")
-    print(f"   Average Margin: {df['Margin_%'].mean():.1f}%")
+    print(f"   Total Products: {total_products}")
+    print(f"   Total Inventory Value: {total_value:.2f} {currency}")
+    print(f"   Total Potential Profit: {total_profit:.2f} {currency}")
+    print(f"   Average Margin: {avg_margin:.1f}%")
     
+    dead_stock_count = status_counts.get("DEAD_STOCK", 0)
     if dead_stock_count > 0:
         print(f"\n🚨 URGENT ATTENTION NEEDED:")
         print(f"   {dead_stock_count} products are DEAD STOCK (>180 days)")
         print(f"   These should be sold immediately, even at a loss!")
+
+def ranking_columns(df, currency=fx.BASE, rates=None):
+    """Columns of recommendations_frame that ranking scores are computed from
+
+    Value and profit are converted to `currency`, so mixed-currency rows rank fairly.
+    """
+    return {"days": df['Days_Old'], "value": fx.convert(df['Total_Value'], df['Currency'], currency, rates),
+            "margin": df['Margin_%'], "profit": fx.convert(df['Total_Profit'], df['Currency'], currency, rates)}
+
+def print_insights(urgent, best):
+    """Most urgent dead stock and best performing fresh stock (ranked frames)"""
+    if len(urgent) > 0:
+        print(f"\n🚨 TOP PRIORITY - Sell these immediately:")
+        for name, price, currency, days in zip(urgent['Product'], urgent['Recommended_Price'],
+                                               urgent['Currency'], urgent['Days_Old']):
+            print(f"   • {name}: {price:.2f} {currency} ({days} days old)")
     
-    # Export to CSV
-    output_file = "pricing_recommendations.csv"
-    df.to_csv(output_file, index=False, encoding='utf-8')
+    if len(best) > 0:
+        print(f"\n✅ BEST PERFORMERS - Hold these prices:")
+        for name, margin in zip(best['Product'], best['Margin_%']):
+            print(f"   • {name}: {margin:.1f}% margin")
+
+class StreamingReport:
+    """Running totals and bounded top-N lists over recommendation chunks
+    
+    Memory and console output do not grow with the catalogue: each chunk
+    updates the aggregates and two heaps of at most `top` rows, then is
+    appended to the CSV and dropped. Totals are kept in `currency`, converted
+    with `rates` (fx.rates_on) chunk by chunk.
+    """
+    
+    INSIGHT_COLUMNS = ['Product', 'Recommended_Price', 'Currency', 'Days_Old', 'Margin_%']
+    
+    def __init__(self, top=10, currency=fx.BASE, rates=None):
+        self.top = top
+        self.currency = currency
+        self.rates = fx.rates_on() if rates is None else rates
+        self.status_counts = np.zeros(len(STATUSES), dtype=np.int64)
+        self.products = 0
+        self.total_value = 0.0
+        self.total_profit = 0.0
+        self.margin_sum = 0.0
+        # (score, -position, INSIGHT_COLUMNS) - dead stock by urgency, fresh stock by margin
+        self.urgent = []
+        self.best = []
+    
+    def add(self, df, positions=None):
+        """Fold one chunk of recommendations_frame into the report
+
+        positions: catalogue row of each chunk row (default: chunks arrive
+        in catalogue order); ties in the top-N lists go to the earlier row.
+        """
+        if positions is None:
+            positions = np.arange(self.products, self.products + len(df))
+        codes = df['Status'].cat.codes.to_numpy()
+        self.status_counts += np.bincount(codes, minlength=len(STATUSES))
+        total_value, total_profit = reporting_totals(df, self.currency, self.rates)
+        self.total_value += total_value
+        self.total_profit += total_profit
+        self.margin_sum += float(df['Margin_%'].to_numpy(dtype=float).sum())
+        
+        columns = ranking_columns(df, self.currency, self.rates)
+        for name, status, heap in (("urgency", 3, self.urgent), ("margin", 0, self.best)):
+            scores = score(name, columns)
+            # Only the chunk's own top-N candidates go into the heap
+            rows = top_k(scores, self.top, codes == status)
+            values = df[self.INSIGHT_COLUMNS].iloc[rows].itertuples(index=False, name=None)
+            for i, row in zip(rows.tolist(), values):
+                self._push(heap, (scores[i], -int(positions[i]), row))
+        self.products += len(df)
+    
+    def _push(self, heap, item):
+        if len(heap) < self.top:
+            heapq.heappush(heap, item)
+        elif item > heap[0]:
+            heapq.heapreplace(heap, item)
+    
+    def merge(self, other):
+        """Add another report (e.g. of a different shard) into this one"""
+        if other.currency != self.currency:
+            raise ValueError(f"Izvještaji su u različitim valutama ({self.currency}, {other.currency})")
+        self.status_counts += other.status_counts
+        self.products += other.products
+        self.total_value += other.total_value
+        self.total_profit += other.total_profit
+        self.margin_sum += other.margin_sum
+        for heap, items in ((self.urgent, other.urgent), (self.best, other.best)):
+            for item in items:
+                self._push(heap, item)
+        return self
+    
+    def print_summary(self):
+        print_summary(pd.Series(self.status_counts, index=STATUSES), self.products, self.total_value,
+                      self.total_profit, self.margin_sum / self.products if self.products else 0.0,
+                      self.currency)
+    
+    def print_insights(self):
+        ranked = [pd.DataFrame([row for _, _, row in sorted(heap, reverse=True)], columns=self.INSIGHT_COLUMNS)
+                  for heap in (self.urgent, self.best)]
+        print_insights(*ranked)
+
+def load_catalogue_frame(sources, filename="products.csv", extra_columns=()):
+    """Whole catalogue as a product table (same sources and categories as the normal run)
+
+    `extra_columns` (e.g. a business-unit column for reports) are kept when
+    the sources have them.
+    """
+    if sources:
+        try:
+            df = load_sources(sources, extra_columns=extra_columns)
+            print(f"🏬 Merged {len(df)} products from {len(sources)} source(s)")
+            return df
+        except Exception as e:
+            print(f"⚠️  Error loading sources: {e}")
+            print("Using sample data instead...")
+            return products_to_frame(get_sample_products())
+    try:
+        snapshot = snapshot_path_for(filename)
+        if is_fresh(snapshot, filename):
+            frame = open_snapshot(snapshot).to_frame()
+            if set(extra_columns) <= set(frame.columns):
+                return frame
+        return read_source(filename, extra_columns)
+    except Exception as e:
+        print(f"⚠️  Error loading CSV: {e}")
+        print("Using sample data instead...")
+        return products_to_frame(get_sample_products())
+
+def price_shard(frame, positions, dso, top, currency=fx.BASE, rates=None):
+    """Worker task: price one shard -> (recommendations, partial StreamingReport)
+
+    rates come from the coordinator, so every worker converts with the same rates.
+    """
+    df = recommendations_frame(products_from_frame(frame), dso)
+    report = StreamingReport(top, currency, rates)
+    report.add(df, positions)
+    return df, report
+
+def run_sharded(frame, dso, shards, workers, top=10, listen=None, timeout=shard.TIMEOUT,
+                retries=shard.RETRIES, output_file="pricing_recommendations.csv", currency=fx.BASE, rates=None,
+                authkey=None):
+    """Price the catalogue in SKU-hash shards on worker processes/machines
+    
+    Shard results are put back in catalogue order, so the CSV, summary and
+    top-N lists are the same as a single-node run.
+    """
+    print(f"\n📊 SHARDED INVENTORY ANALYSIS (DSO: {dso} days, {shards} shards, {workers} local workers)")
+    print("-" * 100)
+    if listen:
+        print(f"   📡 Workers can join with: {shard.AUTHKEY_ENV}=<key> python shard.py worker {listen}")
+    
+    rates = fx.rates_on() if rates is None else rates
+    parts = shard.split(frame, shards)
+    tasks = {key: (rows, positions, dso, top, currency, rates) for key, positions, rows in parts}
+    # The task must come from module `main` (not `__main__`) so workers on other machines can find it
+    task = importlib.import_module("main").price_shard
+    results = shard.run_local(
+        task, tasks, workers, timeout=timeout, retries=retries,
+        address=shard._address(listen) if listen else ("127.0.0.1", 0),
+        progress=lambda done, total: print(f"\r   ⏳ {done}/{total} shards", end="", file=sys.stderr, flush=True),
+        authkey=authkey,
+    )
+    print(file=sys.stderr)
+    
+    report = StreamingReport(top, currency, rates)
+    for key, _, _ in parts:
+        report.merge(results[key][1])
+    positions = np.concatenate([positions for _, positions, _ in parts])
+    df = pd.concat([results[key][0] for key, _, _ in parts], ignore_index=True)
+    df = df.iloc[np.argsort(positions, kind="stable")].reset_index(drop=True)
+    
+    report.print_summary()
+    export_recommendations(df, recommendation_messages(df), output_file)
     print(f"\n💾 Recommendations exported to: {output_file}")
     
-    return df
+    print("\n" + "=" * 100)
+    print("💡 BUSINESS INSIGHTS:")
+    print("=" * 100)
+    report.print_insights()
+    return df, report
+
+def run_ranking(products, recommendations_df, score_name, top=10, by_category=False, currency=fx.BASE, rates=None):
+    """Print the top products by a ranking score (overall or per category; scores in `currency`)"""
+    df = recommendations_df
+    scores = score(score_name, ranking_columns(df, currency, rates))
+    columns = ['Product', 'Status', 'Days_Old', 'Currency', 'Recommended_Price', 'Margin_%', 'Total_Value',
+               'Total_Profit']
+    groups = [p.category for p in products] if by_category else None
+    board = leaderboard(df[columns], scores, top, groups=groups)
+    
+    print("\n" + "=" * 100)
+    print(f"🏆 TOP {top} BY {score_name.upper()}" + (" PER CATEGORY" if by_category else "") + ":")
+    print("=" * 100)
+    print(board.to_string(index=False, float_format=lambda v: f"{v:,.2f}"))
+
+def iter_product_chunks(sources, filename="products.csv", chunk_size=100_000):
+    """Yield lists of Products, chunk_size at a time (the CSV is read in chunks too)"""
+    if sources:
+        df = load_sources(sources)  # merging warehouses needs all sources at once
+        print(f"🏬 Merged {len(df)} products from {len(sources)} source(s)")
+        for start in range(0, len(df), chunk_size):
+            yield products_from_frame(df.iloc[start:start + chunk_size])
+        return
+    try:
+        reader = pd.read_csv(filename, chunksize=chunk_size)
+    except OSError as e:
+        print(f"⚠️  Error loading CSV: {e}")
+        print("Using sample data instead...")
+        yield get_sample_products()
+        return
+    with reader:
+        for chunk in reader:
+            # Same schema (and categories) as load_products_from_csv and the snapshot
+            yield products_from_frame(normalize_columns(chunk))
+
+def stream_analysis(chunks, dso=83, top=10, output_file="pricing_recommendations.csv", currency=fx.BASE,
+                    rates=None):
+    """Price chunk by chunk: CSV export plus aggregate-only console report (totals in `currency`)"""
+    print(f"\n📊 STREAMING INVENTORY ANALYSIS (DSO: {dso} days, Supplier terms: {RULES.supplier_terms} days)")
+    print("-" * 100)
+    
+    report = StreamingReport(top, currency, rates)
+    for n, products in enumerate(chunks):
+        df = recommendations_frame(products, dso)
+        export_recommendations(df, recommendation_messages(df), output_file, append=n > 0)
+        report.add(df)
+        print(f"\r   ⏳ {report.products:,} products priced", end="", file=sys.stderr, flush=True)
+    print(file=sys.stderr)
+    
+    report.print_summary()
+    print(f"\n💾 Recommendations exported to: {output_file}")
+    
+    print("\n" + "=" * 100)
+    print("💡 BUSINESS INSIGHTS:")
+    print("=" * 100)
+    report.print_insights()
+    return report
+
+def run_sql_queries(queries, products, recommendations_df):
+    """Run ad-hoc SQL queries over products and pricing results"""
+    products_df = products_to_frame(products)
+    pricing_df = pricing_table(products_df, recommendations_df['Recommended_Price'],
+                               recommendations_df['Status'])
+    engine = QueryEngine({"products": products_df, "pricing": pricing_df})
+    
+    print("\n" + "=" * 100)
+    print(f"🔎 SQL QUERIES ({engine.backend}):")
+    print("=" * 100)
+    
+    for sql in queries:
+        print(f"\n> {sql}")
+        try:
+            print(engine.query(sql).to_string(index=False))
+        except Exception as e:
+            print(f"⚠️  Query failed: {e}")
+    engine.close()
+
+def export_price_matrix(products, dso, output_file):
+    """Price the whole catalogue for every customer type at once"""
+    products_df = products_to_frame(products)
+    customer_types, prices = RULES.price_matrix(
+        products_df['cost'], products_df['days'], products_df['category'], dso=dso)
+    
+    matrix = products_df[['id', 'name', 'category', 'currency', 'cost', 'price']].copy()
+    for j, customer_type in enumerate(customer_types):
+        matrix[customer_type] = prices['price'][:, j].round(2)
+    matrix.to_csv(output_file, index=False, encoding='utf-8')
+    print(f"\n💾 Price matrix ({len(matrix)} products × {len(customer_types)} customer types) "
+          f"exported to: {output_file}")
+
+def run_price_optimization(products, dso, history_file, output_file="optimal_prices.csv", currency=fx.BASE,
+                           rates=None):
+    """Elasticity-aware optimal prices for the whole catalogue (total profit in `currency`)"""
+    try:
+        history = load_sales_history(history_file)
+    except Exception as e:
+        print(f"⚠️  Error loading sales history: {e}")
+        return None
+    
+    products_df = products_to_frame(products)
+    result = optimize_prices(products_df, history=history, dso=dso)
+    result.insert(result.columns.get_loc('category') + 1, 'currency', products_df['currency'].to_numpy())
+    total_profit = fx.convert(result['expected_profit'], result['currency'], currency, rates).sum()
+    
+    print("\n" + "=" * 100)
+    print(f"📐 PRICE OPTIMIZATION ({HORIZON_DAYS}-day horizon, net of financing & storage):")
+    print("=" * 100)
+    for category, e in result.groupby('category')['elasticity'].first().items():
+        print(f"   {category}: elasticity {e:.2f}")
+    print(f"\n   Expected profit at optimal prices: {total_profit:,.2f} {currency}")
+    print(f"   Average change vs rule price: "
+          f"{((result['optimal_price'] / result['rule_price']).mean() - 1) * 100:+.1f}%")
+    
+    result.to_csv(output_file, index=False, encoding='utf-8')
+    print(f"\n💾 Optimal prices exported to: {output_file}")
+    return result
+
+def run_lot_pricing(products, dso, receipts_file, sales_file=None, output_file="lot_pricing.csv", top=10):
+    """Price each receipt lot at its own age and compare with single-age pricing"""
+    try:
+        book = LotBook.from_receipts(load_receipts(receipts_file))
+        if sales_file:
+            book, oversold = book.consume(pd.read_csv(sales_file))
+            if oversold.sum() > 0:
+                print(f"⚠️  {int((oversold > 0).sum())} SKUs sold more than was received")
+    except Exception as e:
+        print(f"⚠️  Error loading lots: {e}")
+        return None
+    
+    products_df = products_to_frame(products)
+    lots_df = price_lots(book, products_df, dso=dso)
+    single = RULES.price(products_df['cost'], products_df['days'], products_df['category'], dso=dso)
+    lots_df['single_age_price'] = pd.Series(single['price'], index=products_df['id']).reindex(lots_df['id']).to_numpy()
+    lots_df['name'] = lots_df['id'].map(products_df.set_index('id')['name'])
+    lots_df['currency'] = lots_df['id'].map(products_df.set_index('id')['currency'])
+    lots_df.round(2).to_csv(output_file, index=False, encoding='utf-8')
+    
+    print("\n" + "=" * 100)
+    print(f"📦 LOT-LEVEL (FIFO) PRICING: {len(book)} open lots across {len(lots_df)} products")
+    print("=" * 100)
+    difference = (lots_df['price'] - lots_df['single_age_price']).abs()
+    mixed = lots_df.assign(difference=difference)[lots_df['lots'] > 1].nlargest(top, 'difference')
+    for _, item in mixed.iterrows():
+        print(f"   • {item['name']}: {item['lots']:.0f} lots, {item['avg_days']:.0f} days avg "
+              f"(oldest {item['oldest_days']:.0f}) → {item['price']:.2f} {item['currency']} per unit "
+              f"vs {item['single_age_price']:.2f} {item['currency']} single-age, "
+              f"{item['qty_dead_stock']:.0f} units dead stock")
+    print(f"\n💾 Lot pricing exported to: {output_file}")
+    return lots_df
+
+def run_ledger_pricing(products, invoices_file, payments_file, output_file="customer_prices.csv"):
+    """Actual DSO per customer from the ledger, and each customer's price list"""
+    try:
+        invoices, payments = load_ledger(invoices_file, payments_file)
+    except Exception as e:
+        print(f"⚠️  Error loading ledger: {e}")
+        return None
+    metrics = customer_metrics(invoices, payments)
+    metrics['customer_type'] = pricing_customer_types(metrics['payment_history'])
+    
+    print("\n" + "=" * 100)
+    print(f"🧾 CUSTOMER DSO FROM LEDGER ({len(invoices)} invoices, {len(payments)} payments):")
+    print("=" * 100)
+    for customer, row in metrics.sort_values('sales', ascending=False).head(20).iterrows():
+        print(f"   {str(customer):25} DSO {row['dso']:5.0f} days | on time {row['payment_history'] * 100:3.0f}% | "
+              f"open {row['open_balance']:10,.2f} KM (90+: {row['open_90+']:,.2f} KM)"
+              + (f" → priced as {row['customer_type']}" if pd.notna(row['customer_type']) else ""))
+    
+    # Prices per customer: same catalogue at each customer's DSO and payment-history
+    # customer type (SKU x customer in one pass)
+    products_df = products_to_frame(products)
+    codes = RULES.category_codes(products_df['category'])
+    prices = RULES.price(products_df['cost'].to_numpy()[:, None], products_df['days'].to_numpy()[:, None],
+                         codes=codes[:, None], dso=np.maximum(metrics['dso'].to_numpy(), 0)[None, :],
+                         customer_codes=np.asarray(RULES.customer_codes(metrics['customer_type']))[None, :])
+    table = products_df[['id', 'name', 'category', 'currency', 'cost', 'price']].copy()
+    for j, customer in enumerate(metrics.index):
+        table[str(customer)] = prices['price'][:, j].round(2)
+    table.to_csv(output_file, index=False, encoding='utf-8')
+    print(f"\n💾 Prices for {len(metrics)} customers exported to: {output_file}")
+    return metrics
+
+def in_reporting_currency(products_df, currency=fx.BASE, rates=None):
+    """(product table with cost and price in `currency`, per-row conversion factor)
+
+    Pricing rules are currency-neutral, so cost-based figures converted this
+    way can be summed across products in different currencies.
+    """
+    factor = fx.convert(np.ones(len(products_df)), products_df['currency'], currency, rates)
+    converted = products_df.assign(cost=products_df['cost'] * factor, price=products_df['price'] * factor,
+                                   currency=currency)
+    return converted, factor
+
+def run_accrual(products, recommendations_df, horizon, state_file=None, output_file="carrying_cost.csv",
+                currency=fx.BASE, rates=None):
+    """Carrying cost of the stock over the horizon, and holding vs discounting now (in `currency`)"""
+    products_df, factor = in_reporting_currency(products_to_frame(products), currency, rates)
+    # Sell-through from the forecast state if there is one, otherwise stock is held throughout
+    state = load_state(state_file)
+    rate = sell_through_rates(state).reindex(products_df['id']).fillna(0).to_numpy() if len(state) else None
+    
+    accrual = accrue(products_df, horizon, rate)
+    curves = pd.concat({'category': accrual.by_category, 'warehouse': accrual.by_warehouse})
+    curves.round(2).to_csv(output_file, encoding='utf-8')
+    
+    print("\n" + "=" * 100)
+    print(f"🏦 CARRYING COST OVER THE NEXT {horizon} DAYS (financing + storage):")
+    print("=" * 100)
+    for label, frame in (("Category", accrual.by_category), ("Warehouse", accrual.by_warehouse)):
+        for group, curve in frame.iterrows():
+            print(f"   {label} {group}: {curve.iloc[0]:.2f} {currency}/day now, {curve.sum():.2f} {currency} total")
+    print(f"   TOTAL: {accrual.per_sku['carrying_cost'].sum():.2f} {currency} "
+          f"(financing {accrual.per_sku['financing'].sum():.2f}, storage {accrual.per_sku['storage'].sum():.2f})")
+    
+    if rate is not None:
+        # Only items whose recommendation is below the current price get discounted
+        discount = np.minimum(recommendations_df['Recommended_Price'].to_numpy() * factor,
+                              products_df['price'].to_numpy())
+        comparison = hold_vs_discount(products_df, discount, rate, horizon=horizon)
+        print(f"\n⚖️  Hold vs discount now: carrying {comparison['carrying_hold'].sum():.2f} {currency} → "
+              f"{comparison['carrying_discount'].sum():.2f} {currency}, "
+              f"net profit change {comparison['discount_benefit'].sum():+.2f} {currency}")
+    print(f"\n💾 Daily accrual curves exported to: {output_file}")
+    return accrual
+
+def run_forecast(products, recommendations_df, history_file, state_file, top=10, currency=fx.BASE, rates=None):
+    """Update sell-through rates and rank SKUs heading for dead stock (values at risk in `currency`)"""
+    try:
+        history = load_sales_history(history_file)
+    except Exception as e:
+        print(f"⚠️  Error loading sales history: {e}")
+        return None
+    
+    # Only sales newer than the saved state are processed, for rates and elasticities alike
+    state = update_state(load_state(state_file), history)
+    save_state(state, state_file)
+    
+    print("\n" + "=" * 100)
+    as_of = state.attrs.get('as_of')
+    if as_of is None:
+        print("🔮 SELL-THROUGH FORECAST: no history")
+        print("=" * 100)
+        return None
+    print(f"🔮 SELL-THROUGH FORECAST (rates as of {as_of:%Y-%m-%d}):")
+    print("=" * 100)
+    
+    frame, factor = in_reporting_currency(products_to_frame(products), currency, rates)
+    elasticity, _ = fit_state_demand(state, frame)
+    projection = project(frame, state, recommended_price=recommendations_df['Recommended_Price'] * factor,
+                         elasticity=elasticity)
+    
+    risky = at_risk(projection, top=top)
+    if len(risky) == 0:
+        print("\n✅ No SKU is projected to become dead stock")
+        return projection
+    
+    print(f"\n⏳ AT RISK - will become DEAD STOCK before selling out:")
+    for _, item in risky.iterrows():
+        rec_days = item['days_to_dead_recommended']
+        rec_text = (f"{item['value_at_risk_recommended']:.2f} {currency} at recommended price"
+                    if not pd.isna(rec_days) else "sells out in time at recommended price")
+        print(f"   • {item['name']}: dead in {item['days_to_dead_current']:.0f} days, "
+              f"{item['units_at_dead_current']:.0f} units left ({item['value_at_risk_current']:.2f} {currency}) "
+              f"→ {rec_text}")
+    return projection
+
+def parse_args(argv=None):
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Dynamic pricing & inventory analysis")
+    parser.add_argument("sources", nargs="*",
+                        help="Warehouse exports (CSV/Parquet files or directories) to merge")
+    parser.add_argument("--price-matrix", metavar="CSV",
+                        help="Write recommended prices for every customer type (one batch) to CSV")
+    parser.add_argument("--optimize", metavar="SALES_HISTORY_CSV",
+                        help="Fit price elasticities from sales history (id, date, price, quantity) "
+                             "and solve the profit-maximizing price per SKU")
+    parser.add_argument("--forecast", metavar="SALES_HISTORY_CSV",
+                        help="Project days to slow-moving/dead stock from sell-through and list at-risk SKUs")
+    parser.add_argument("--forecast-state", default="forecast_state.pkl", metavar="PATH",
+                        help="Sell-through state kept between nightly runs (default: %(default)s)")
+    parser.add_argument("--lots", metavar="RECEIPTS_CSV",
+                        help="Price stock per receipt lot (FIFO) instead of one age per product")
+    parser.add_argument("--lot-sales", metavar="SALES_CSV",
+                        help="Sales (id, quantity) consumed FIFO from the lots before pricing")
+    parser.add_argument("--accrual", type=int, metavar="DAYS",
+                        help="Daily financing + storage accrual over the next DAYS, by category and warehouse")
+    parser.add_argument("--ledger", nargs=2, metavar=("INVOICES_CSV", "PAYMENTS_CSV"),
+                        help="Per-customer DSO and payment history from the ledger, priced per customer")
+    parser.add_argument("--sql", action="append", default=[], metavar="QUERY",
+                        help="SQL over the `products` and `pricing` tables (repeatable), e.g. "
+                             f"\"{EXAMPLE_QUERIES['Proizvodi po marži']}\"")
+    parser.add_argument("--stream", action="store_true",
+                        help="Price in chunks and print only aggregates and top-N lists "
+                             "(constant memory and output for any catalogue size)")
+    parser.add_argument("--chunk-size", type=int, default=100_000, metavar="N",
+                        help="Products per chunk in --stream mode (default: %(default)s)")
+    parser.add_argument("--top", type=int, default=10, metavar="N",
+                        help="Length of the most-urgent / best-performer lists and rankings "
+                             "(default: %(default)s)")
+    parser.add_argument("--rank", choices=sorted(SCORES),
+                        help="Rank products by score: urgency (days old x value at risk), margin or profit")
+    parser.add_argument("--rank-by-category", action="store_true",
+                        help="With --rank: top N per category instead of overall")
+    parser.add_argument("--shards", type=int, metavar="N",
+                        help="Split the catalogue into N SKU-hash shards priced by worker processes")
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count(), metavar="N",
+                        help="Local worker processes for --shards (default: %(default)s)")
+    parser.add_argument("--shard-listen", metavar="HOST:PORT",
+                        help="Serve shards on this address so `python shard.py worker HOST:PORT` "
+                             "on other machines can join (non-loopback addresses require SHARD_AUTHKEY)")
+    parser.add_argument("--shard-timeout", type=float, default=shard.TIMEOUT, metavar="SECONDS",
+                        help="Resend a shard not finished within SECONDS (default: %(default)s)")
+    parser.add_argument("--currency", type=fx.normalize, default=fx.BASE, metavar="CODE",
+                        help="Reporting currency for totals and rankings, e.g. EUR or RSD "
+                             "(products keep their own currency; default: %(default)s)")
+    parser.add_argument("--fx-date", metavar="YYYY-MM-DD",
+                        help="Use the FX rates valid on this date (default: today; rates file: FX_RATES)")
+    parser.add_argument("--shard-retries", type=int, default=shard.RETRIES, metavar="N",
+                        help="Resends per failed shard before giving up (default: %(default)s)")
+    args = parser.parse_args(argv)
+    if args.stream or args.shards:
+        # These analyses need the whole catalogue in memory
+        full = [f"--{name.replace('_', '-')}" for name in
+                ("price_matrix", "optimize", "forecast", "lots", "accrual", "ledger", "sql", "rank")
+                if getattr(args, name)]
+        mode = "--stream" if args.stream else "--shards"
+        if args.stream and args.shards:
+            full.append("--shards")
+        if full:
+            parser.error(f"{mode} cannot be combined with {', '.join(full)}")
+    if args.shards:
+        try:
+            args.shard_authkey = shard.authkey_for(shard._address(args.shard_listen) if args.shard_listen
+                                                   else ("127.0.0.1", 0))
+        except ValueError as e:
+            parser.error(str(e))
+    return args
 
 def main():
     """Main function"""
+    print("=" * 70)
+    print("💰 DYNAMIC PRICING & INVENTORY MANAGEMENT SYSTEM")
+    print("=" * 70)
+    
+    args = parse_args()
     print("\n🔄 Loading products...")
     
     # Ask for DSO input
@@ -220,35 +840,87 @@ def main():
         dso = 83
         print("Using default DSO: 83 days")
     
+    # FX rates are read once per run (and sent to shard workers)
+    try:
+        rates = fx.rates_on(args.fx_date)
+    except (OSError, ValueError) as e:
+        print(f"⚠️  FX rates unavailable ({e}), only {fx.BASE} amounts can be converted")
+        rates = {fx.BASE: 1.0}
+    if args.currency not in rates:
+        print(f"⚠️  No FX rate for {args.currency}, reporting in {fx.BASE}")
+        args.currency = fx.BASE
+    if args.currency != fx.BASE:
+        print(f"💱 Reporting currency: {args.currency} (1 {args.currency} = {rates[args.currency]:g} {fx.BASE})")
+    
+    if args.stream:
+        stream_analysis(iter_product_chunks(args.sources, chunk_size=args.chunk_size), dso, args.top,
+                        currency=args.currency, rates=rates)
+        finish()
+        return
+    
+    if args.shards:
+        run_sharded(load_catalogue_frame(args.sources), dso, args.shards, args.workers, args.top,
+                    args.shard_listen, args.shard_timeout, args.shard_retries, currency=args.currency,
+                    rates=rates, authkey=args.shard_authkey)
+        finish()
+        return
+    
     # Load products
-    products = load_products_from_csv()
+    if args.sources:
+        products = load_products_from_sources(args.sources)
+    else:
+        products = load_products_from_csv()
     
     print(f"📦 Loaded {len(products)} products for analysis")
-    print(f"📊 DSO: {dso} days | Supplier payment terms: 60 days")
-    print(f"💡 Interest rate: 8% annual | Storage cost: 0.5% monthly")
+    print(f"📊 DSO: {dso} days | Supplier payment terms: {RULES.supplier_terms} days")
+    print(f"💡 Interest rate: {RULES.annual_interest:.0%} annual | "
+          f"Storage cost: {RULES.rules_for()['monthly_storage']:.1%} monthly")
     
     # Perform analysis
-    recommendations_df = display_analysis(products, dso)
+    recommendations_df = display_analysis(products, dso, args.currency, rates)
+    
+    if args.sql:
+        run_sql_queries(args.sql, products, recommendations_df)
+    
+    if args.price_matrix:
+        export_price_matrix(products, dso, args.price_matrix)
+    
+    if args.optimize:
+        run_price_optimization(products, dso, args.optimize, currency=args.currency, rates=rates)
+    
+    if args.lots:
+        run_lot_pricing(products, dso, args.lots, args.lot_sales)
+    
+    if args.ledger:
+        run_ledger_pricing(products, *args.ledger)
+    
+    # The forecast updates the sell-through state first, so accrual uses today's rates
+    if args.forecast:
+        run_forecast(products, recommendations_df, args.forecast, args.forecast_state, currency=args.currency,
+                     rates=rates)
+    
+    if args.accrual:
+        run_accrual(products, recommendations_df, args.accrual, args.forecast_state, currency=args.currency,
+                    rates=rates)
+    
+    if args.rank:
+        run_ranking(products, recommendations_df, args.rank, args.top, args.rank_by_category, args.currency, rates)
     
     # Additional insights
     print("\n" + "=" * 100)
     print("💡 BUSINESS INSIGHTS:")
     print("=" * 100)
     
-    # Find most urgent items
-    urgent_items = recommendations_df[recommendations_df['Status'] == 'DEAD_STOCK']
-    if len(urgent_items) > 0:
-        print(f"\n🚨 TOP PRIORITY - Sell these immediately:")
-        for _, item in urgent_items.iterrows():
-            print(f"   • {item['Product']}: {item['Recommended_Price']} KM ({item['Days_Old']} days old)")
-    
-    # Find best performing items
-    fresh_items = recommendations_df[recommendations_df['Status'] == 'FRESH']
-    if len(fresh_items) > 0:
-        print(f"\n✅ BEST PERFORMERS - Hold these prices:")
-        for _, item in fresh_items.head(3).iterrows():
-            print(f"   • {item['Product']}: {item['Margin_%']}% margin")
+    # Most urgent dead stock (days × value) and fresh stock with the highest margin
+    columns = ranking_columns(recommendations_df, args.currency, rates)
+    status = recommendations_df['Status']
+    print_insights(recommendations_df.iloc[top_k(score("urgency", columns), args.top, status == 'DEAD_STOCK')],
+                   recommendations_df.iloc[top_k(score("margin", columns), args.top, status == 'FRESH')])
     
+    finish()
+
+def finish():
+    """Closing notes"""
     print("\n" + "=" * 100)
     print("🎉 ANALYSIS COMPLETE!")
     print("=" * 100)
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+# precompute.py - POZADINSKO RAČUNANJE TEŠKIH PRIKAZA
+#
+# Poslije svakog osvježavanja podataka worker unaprijed izračuna prikaze
+# (cijene cijelog kataloga, projekcije gotovinskog toka...) za podrazumijevane
+# i nedavno korištene parametre. Rezultati su u zajedničkom kešu svih sesija,
+# pa je prvi zahtjev korisnika pogodak; ako je posao još u toku, stranica samo
+# sačeka taj isti posao umjesto da ga ponovi.
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+WORKERS = 2
+CACHE_SIZE = 64  # rezultata ukupno (svi prikazi)
+RECENT_SIZE = 8  # nedavno korištenih skupova parametara po prikazu
+
+_NO_TOKEN = object()
+
+
+class Precomputer:
+    """Background workers that fill a shared cache of view results
+
+    A view is func(data, *params); results are keyed by (view, token, params),
+    where token identifies the data version. Results are shared between
+    sessions and must be treated as read-only.
+    """
+
+    def __init__(self, workers=WORKERS, cache_size=CACHE_SIZE, recent_size=RECENT_SIZE):
+        self.cache_size = cache_size
+        self.recent_size = recent_size
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="precompute")
+        self._lock = threading.Lock()
+        self._views = {}  # prikaz -> (funkcija, podrazumijevani parametri)
+        self._recent = {}  # prikaz -> OrderedDict nedavno korištenih parametara
+        self._tokens = {}  # prikaz -> token zadnjeg osvježavanja
+        self._results = OrderedDict()  # (prikaz, token, parametri) -> rezultat
+        self._pending = {}  # (prikaz, token, parametri) -> Future
+        self._progress = {}  # (prikaz, token) -> [gotovo, ukupno]
+
+    def register(self, view, func, defaults=()):
+        """Add a view and the parameter sets to precompute on every refresh"""
+        with self._lock:
+            self._views[view] = (func, [tuple(p) for p in defaults])
+            self._recent.setdefault(view, OrderedDict())
+
+    def refresh(self, view, token, load):
+        """Precompute defaults and recently used parameters of `view` for new data
+
+        load() returns the view's data and runs in the worker. Does nothing
+        (returns False) if `token` is already the current one.
+        """
+        with self._lock:
+            if self._tokens.get(view, _NO_TOKEN) == token:
+                return False
+            self._tokens[view] = token
+            defaults = self._views[view][1]
+            params = list(dict.fromkeys(defaults + list(self._recent[view])))
+            self._progress[(view, token)] = [0, len(params)]
+        self._executor.submit(self._fan_out, view, token, load, params)
+        return True
+
+    def carry_over(self, view, old_token, token, update):
+        """Derive results for new data from the cached results of `old_token`
+
+        update(old_result, params) returns the result for the new data; used
+        when only part of the data changed. The following refresh() for
+        `token` then finds these results already cached.
+        """
+        with self._lock:
+            old = [(key[2], result) for key, result in self._results.items()
+                   if key[0] == view and key[1] == old_token]
+        for params, result in old:
+            new = update(result, params)
+            with self._lock:
+                self._store((view, token, params), new)
+
+    def _fan_out(self, view, token, load, params):
+        try:
+            data = load()
+        except Exception:
+            # Bez podataka nema ni pozadinskog posla; stranica računa sama i prikaže grešku
+            with self._lock:
+                self._progress.pop((view, token), None)
+            raise
+        for p in params:
+            key = (view, token, p)
+            with self._lock:
+                if key in self._results or key in self._pending:
+                    self._tick(view, token)
+                    continue
+                self._pending[key] = self._executor.submit(self._compute, key, data)
+
+    def _compute(self, key, data):
+        view, token, params = key
+        try:
+            result = self._views[view][0](data, *params)
+            with self._lock:
+                self._store(key, result)
+            return result
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+                self._tick(view, token)
+
+    def _tick(self, view, token):
+        progress = self._progress.get((view, token))
+        if progress is not None:
+            progress[0] += 1
+
+    def _store(self, key, result):
+        self._results[key] = result
+        self._results.move_to_end(key)
+        while len(self._results) > self.cache_size:
+            self._results.popitem(last=False)
+
+    def _remember(self, view, params):
+        recent = self._recent[view]
+        recent[params] = None
+        recent.move_to_end(params)
+        while len(recent) > self.recent_size:
+            recent.popitem(last=False)
+
+    def result(self, view, token, params, data):
+        """Cached result, the running background job's result, or computed now"""
+        params = tuple(params)
+        key = (view, token, params)
+        with self._lock:
+            self._remember(view, params)
+            if key in self._results:
+                self._results.move_to_end(key)
+                return self._results[key]
+            future = self._pending.get(key)
+        if future is not None:
+            try:
+                return future.result()
+            except Exception:
+                pass  # ponovi ispod, da se greška pojavi u sesiji korisnika
+        result = self._views[view][0](data, *params)
+        with self._lock:
+            self._store(key, result)
+        return result
+
+    def ready(self, view, token, params):
+        """True if the result is already cached"""
+        with self._lock:
+            return (view, token, tuple(params)) in self._results
+
+    def progress(self, view, token):
+        """(done, total) background jobs of the last refresh for this data"""
+        with self._lock:
+            done, total = self._progress.get((view, token), (0, 0))
+        return done, total
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
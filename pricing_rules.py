@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+# pricing_rules.py - JEDINSTVENA PRAVILA ZA DINAMIČKE CIJENE
+#
+# Pragovi starosti, multiplikatori, donje i gornje granice cijene se čitaju iz
+# pricing_rules.json (ili fajla iz PRICING_RULES) i kompajliraju jednom u
+# NumPy tabele indeksirane kodom kategorije.
+import json
+import os
+from collections import namedtuple
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+RULES_PATH = os.environ.get(
+    "PRICING_RULES", os.path.join(os.path.dirname(os.path.abspath(__file__)), "pricing_rules.json")
+)
+
+STATUSES = ("FRESH", "NORMAL", "SLOW_MOVING", "DEAD_STOCK")
+DEFAULT_CATEGORY = "*"
+DEFAULT_CUSTOMER = "*"  # bez prilagodbe za tip kupca
+
+Quote = namedtuple("Quote", "status multiplier base financing storage price floor cap")
+
+
+class RulesError(ValueError):
+    """Invalid pricing rule configuration"""
+
+
+def _band_rules(config, name):
+    """Validate one rule set and return it as plain lists"""
+    thresholds = [int(t) for t in config["thresholds"]]
+    if len(thresholds) != len(STATUSES) - 1 or thresholds != sorted(thresholds):
+        raise RulesError(f"'{name}': potrebna su {len(STATUSES) - 1} rastuća praga starosti")
+    bands = {}
+    for key in ("multipliers", "floors", "caps"):
+        values = config[key]
+        if len(values) != len(STATUSES):
+            raise RulesError(f"'{name}': '{key}' mora imati {len(STATUSES)} vrijednosti")
+        bands[key] = [np.inf if v is None else float(v) for v in values]
+    if any(f > c for f, c in zip(bands["floors"], bands["caps"])):
+        raise RulesError(f"'{name}': donja granica je iznad gornje")
+    return {"thresholds": thresholds, "monthly_storage": float(config["monthly_storage"]), **bands}
+
+
+class PricingRules:
+    """Pricing rules compiled into per-category lookup arrays"""
+
+    def __init__(self, config):
+        self.config = config
+        self.annual_interest = float(config.get("annual_interest", 0.08))
+        self.supplier_terms = int(config.get("supplier_terms", 60))
+
+        default = config["default"]
+        rules = {DEFAULT_CATEGORY: _band_rules(default, DEFAULT_CATEGORY)}
+        for category, overrides in config.get("categories", {}).items():
+            rules[category] = _band_rules({**default, **overrides}, category)
+        # Kategorije koje imaju samo prilagodbe po tipu kupca dobijaju osnovna pravila
+        for override in config.get("overrides", []):
+            if override.get("category") not in (None, DEFAULT_CATEGORY):
+                rules.setdefault(override["category"], rules[DEFAULT_CATEGORY])
+
+        # Kod 0 je uvijek podrazumijevano pravilo
+        self.categories = list(rules)
+        self._index = pd.Index(self.categories)
+        self._rules = rules
+        self.thresholds = np.array([r["thresholds"] for r in rules.values()], dtype=np.int64)
+        self.multipliers = np.array([r["multipliers"] for r in rules.values()])
+        self.floors = np.array([r["floors"] for r in rules.values()])
+        self.caps = np.array([r["caps"] for r in rules.values()])
+        self.monthly_storage = np.array([r["monthly_storage"] for r in rules.values()])
+
+        # Pragovi svih kategorija u jednom sortiranom nizu: kategorija c
+        # zauzima opseg [c * span, (c + 1) * span), pa jedan searchsorted
+        # radi za sve kategorije odjednom
+        self._span = int(self.thresholds.max()) + 2
+        offsets = np.arange(len(self.categories), dtype=np.int64)[:, None] * self._span
+        self._flat_thresholds = (self.thresholds + offsets).ravel()
+
+        self._compile_customer_types(config)
+
+    def _compile_customer_types(self, config):
+        """Dense (kategorija x tip kupca) tabele prilagodbi"""
+        types = config.get("customer_types", {})
+        self.customer_types = [DEFAULT_CUSTOMER] + list(types)
+        self._customer_index = pd.Index(self.customer_types)
+        shape = (len(self.categories), len(self.customer_types))
+        self.customer_multipliers = np.ones(shape)
+        self.customer_min_margin = np.full(shape, -np.inf)
+        self.customer_dso_extra = np.zeros(len(self.customer_types))
+
+        def apply(rows, cols, settings):
+            if "multiplier" in settings:
+                self.customer_multipliers[rows, cols] = float(settings["multiplier"])
+            if settings.get("min_margin") is not None:
+                self.customer_min_margin[rows, cols] = float(settings["min_margin"])
+
+        for j, (name, settings) in enumerate(types.items(), start=1):
+            apply(slice(None), j, settings)
+            self.customer_dso_extra[j] = float(settings.get("dso_extra", 0))
+
+        for override in config.get("overrides", []):
+            category = override.get("category", DEFAULT_CATEGORY)
+            customer = override.get("customer_type", DEFAULT_CUSTOMER)
+            if customer != DEFAULT_CUSTOMER and customer not in types:
+                raise RulesError(f"Nepoznat tip kupca u prilagodbi: '{customer}'")
+            rows = slice(None) if category == DEFAULT_CATEGORY else self.categories.index(category)
+            cols = slice(1, None) if customer == DEFAULT_CUSTOMER else self.customer_types.index(customer)
+            apply(rows, cols, override)
+
+    # ---------- SKALARNO (referentna implementacija) ----------
+    def rules_for(self, category=None):
+        """Rule set for one category (falls back to the default rules)"""
+        return self._rules.get(category, self._rules[DEFAULT_CATEGORY])
+
+    def status_index(self, days, category=None):
+        """Status index for one product: 0=FRESH ... 3=DEAD_STOCK"""
+        for i, threshold in enumerate(self.rules_for(category)["thresholds"]):
+            if days <= threshold:
+                return i
+        return len(STATUSES) - 1
+
+    def status(self, days, category=None):
+        return STATUSES[self.status_index(days, category)]
+
+    def customer_adjustment(self, category=None, customer_type=None):
+        """(multiplier, min_margin, dso_extra) for one category/customer type"""
+        i = self.categories.index(category) if category in self._rules else 0
+        j = self.customer_types.index(customer_type) if customer_type in self.customer_types else 0
+        return (float(self.customer_multipliers[i, j]), float(self.customer_min_margin[i, j]),
+                float(self.customer_dso_extra[j]))
+
+    def quote(self, cost, days, category=None, dso=83, supplier_terms=None, annual_interest=None,
+              customer_type=None):
+        """Price one product with plain Python arithmetic"""
+        rules = self.rules_for(category)
+        supplier_terms = self.supplier_terms if supplier_terms is None else supplier_terms
+        annual_interest = self.annual_interest if annual_interest is None else annual_interest
+        customer_multiplier, min_margin, dso_extra = self.customer_adjustment(category, customer_type)
+
+        status = self.status_index(days, category)
+        multiplier = rules["multipliers"][status] * customer_multiplier
+        base = cost * multiplier
+        cash_gap = max(dso + dso_extra - supplier_terms, 0)
+        financing = base * (annual_interest / 365) * cash_gap
+        storage = cost * rules["monthly_storage"] * (days / 30)
+        floor_multiplier = rules["floors"][status]
+        if floor_multiplier >= 1:  # minimalna marža kupca ne diže pod za mrtvu robu
+            floor_multiplier = max(floor_multiplier, 1 + min_margin)
+        floor = cost * floor_multiplier
+        cap = cost * rules["caps"][status] if rules["caps"][status] != np.inf else np.inf
+        price = min(max(base - financing - storage, floor), cap)
+        return Quote(status, multiplier, base, financing, storage, price, floor, cap)
+
+    # ---------- VEKTORSKI ----------
+    def category_codes(self, categories):
+        """Map category names to rule codes (unknown -> default rules)"""
+        if categories is None:
+            return 0
+        codes = self._index.get_indexer(pd.Index(np.asarray(categories, dtype=object)))
+        return np.where(codes < 0, 0, codes)
+
+    def customer_codes(self, customer_types):
+        """Map customer type names to codes (unknown -> no adjustment)"""
+        if customer_types is None:
+            return 0
+        codes = self._customer_index.get_indexer(pd.Index(np.asarray(customer_types, dtype=object)))
+        return np.where(codes < 0, 0, codes)
+
+    def status_codes(self, days, codes=0):
+        """Vectorized status index via one searchsorted over all categories"""
+        # Pragovi su cijeli dani: 180.5 > 180 kao u status_index, pa se zaokružuje naviše
+        days = np.clip(np.ceil(np.asarray(days, dtype=float)), 0, self._span - 1).astype(np.int64)
+        codes = np.asarray(codes, dtype=np.int64)
+        keys = days + codes * self._span
+        n_thresholds = self.thresholds.shape[1]
+        return np.searchsorted(self._flat_thresholds, keys, side="left") - codes * n_thresholds
+
+    def price(self, cost, days, categories=None, dso=83, supplier_terms=None, annual_interest=None,
+              codes=None, customer_types=None, customer_codes=None):
+        """Price whole arrays of products at once
+
+        dso / supplier_terms / annual_interest / customer types may be
+        scalars or arrays that broadcast against cost (e.g. one DSO per
+        customer, or a (SKU x tip kupca) grid - see price_matrix).
+        Returns a dict of arrays with the same fields as Quote.
+        """
+        supplier_terms = self.supplier_terms if supplier_terms is None else supplier_terms
+        annual_interest = self.annual_interest if annual_interest is None else annual_interest
+        if codes is None:
+            codes = self.category_codes(categories)
+        if customer_codes is None:
+            customer_codes = self.customer_codes(customer_types)
+        cost, days, codes, customer_codes = np.broadcast_arrays(
+            np.asarray(cost, dtype=float), np.asarray(days), codes, customer_codes)
+
+        status = self.status_codes(days, codes)
+        multiplier = self.multipliers[codes, status] * self.customer_multipliers[codes, customer_codes]
+        base = cost * multiplier
+        dso = np.asarray(dso) + self.customer_dso_extra[customer_codes]
+        cash_gap = np.maximum(dso - np.asarray(supplier_terms), 0)
+        financing = base * (np.asarray(annual_interest) / 365) * cash_gap
+        storage = cost * self.monthly_storage[codes] * (days / 30)
+        floor_multiplier = self.floors[codes, status]
+        floor_multiplier = np.where(
+            floor_multiplier >= 1,
+            np.maximum(floor_multiplier, 1 + self.customer_min_margin[codes, customer_codes]),
+            floor_multiplier,
+        )
+        floor = cost * floor_multiplier
+        cap_multiplier = self.caps[codes, status]
+        with np.errstate(invalid="ignore"):  # 0 * inf kad nema gornje granice
+            cap = np.where(np.isinf(cap_multiplier), np.inf, cost * cap_multiplier)
+        price = np.minimum(np.maximum(base - financing - storage, floor), cap)
+        return {
+            "status": status, "multiplier": multiplier, "base": base, "financing": financing,
+            "storage": storage, "price": price, "floor": floor, "cap": cap,
+        }
+
+
+    def price_matrix(self, cost, days, categories=None, customer_types=None, **kwargs):
+        """Catalogue x customer type price grid in one batch
+
+        Returns (customer type names, dict of 2-D arrays shaped (SKU, tip)).
+        """
+        names = list(customer_types) if customer_types is not None else self.customer_types[1:]
+        codes = self.category_codes(categories)
+        result = self.price(
+            np.asarray(cost, dtype=float)[:, None], np.asarray(days)[:, None],
+            codes=np.asarray(codes)[:, None] if np.ndim(codes) else codes,
+            customer_codes=np.asarray(self.customer_codes(names))[None, :], **kwargs,
+        )
+        return names, result
+
+
+def load_rules(path=None):
+    """Load and compile a rule file"""
+    with open(path or RULES_PATH, encoding="utf-8") as f:
+        return PricingRules(json.load(f))
+
+
+@lru_cache(maxsize=None)
+def get_rules(path=None):
+    """Compiled rules, loaded once per process"""
+    return load_rules(path)
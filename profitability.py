@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+# profitability.py - MODELI PROFITABILNOSTI KUPCA I GOTOVINSKOG TOKA
+#
+# Formule iz modula "Analiza kupca" i "Cash Flow" kao modeli za scenarios.py.
+# Sve funkcije rade i sa skalarima i sa nizovima (jedan red po scenariju).
+import numpy as np
+
+from scenarios import Model, Node, Scenario
+
+MONTHS = ['Jan', 'Feb', 'Mar', 'Apr', 'Maj', 'Jun',
+          'Jul', 'Avg', 'Sep', 'Okt', 'Nov', 'Dec']
+MONTH_INDEX = np.arange(1, 13)
+
+CUSTOMER_COSTS = ("logistics", "storage", "administration", "risk", "other")
+
+CUSTOMER_MODEL = Model([
+    ("paper_profit", Node(("total_sales", "total_cost"), lambda s, c: s - c)),
+    # Popust za brže plaćanje: kupac plaća ranije (dso_factor), ali na manji iznos
+    ("effective_dso", Node(("customer_dso", "dso_factor"), lambda d, f: d * f)),
+    ("cash_gap", Node(("effective_dso", "supplier_terms"), lambda d, t: np.maximum(d - t, 0))),
+    ("financing", Node(("total_sales", "early_discount", "interest_rate", "cash_gap"),
+                       lambda s, disc, i, gap: s * (1 - disc) * (i / 365) * gap)),
+    ("discount_cost", Node(("total_sales", "early_discount"), lambda s, disc: s * disc)),
+    ("commission", Node(("total_sales", "commission_rate"), lambda s, r: s * r)),
+    ("additional_costs", Node(("financing", "commission") + CUSTOMER_COSTS,
+                              lambda *costs: sum(costs))),
+    ("real_profit", Node(("paper_profit", "additional_costs", "discount_cost"),
+                         lambda p, a, disc: p - a - disc)),
+    ("profit_margin", Node(("real_profit", "total_sales"),
+                           lambda p, s: np.where(s > 0, p / np.where(s > 0, s, 1) * 100, 0.0))),
+])
+
+CASH_FLOW_MODEL = Model([
+    ("sales", Node(("monthly_sales", "growth_rate", "seasonal_factors"),
+                   lambda m, g, f: m * (1 + g) ** (MONTH_INDEX / 12) * f)),
+    # Nova prodaja se naplaćuje int(dso / 30) mjeseci kasnije; poslije decembra ispada iz
+    # projekcije. Tome se dodaje očekivana naplata već otvorenih faktura (receivables.py).
+    ("cash_in", Node(("sales", "dso", "open_collections"),
+                     lambda s, dso, o: np.where(MONTH_INDEX + np.floor(np.asarray(dso) / 30) <= 12, s, 0.0) + o)),
+    ("cash_out", Node(("sales", "cogs_percentage", "fixed_costs", "dpo"),
+                      lambda s, c, f, dpo: np.where(MONTH_INDEX + np.floor(np.asarray(dpo) / 30) <= 12,
+                                                   s * c + f, f))),
+    ("net_cash_flow", Node(("cash_in", "cash_out"), lambda i, o: i - o)),
+    ("cash", Node(("starting_cash", "net_cash_flow"), lambda s, n: s + np.cumsum(n, axis=-1))),
+    ("min_cash", Node(("cash",), lambda c: np.min(c, axis=-1))),
+    ("ccc", Node(("dio", "dso", "dpo"), lambda dio, dso, dpo: dio + dso - dpo)),
+    # Godišnji trošak finansiranja potraživanja i kapital vezan u zalihama
+    ("receivables_financing", Node(("monthly_sales", "interest_rate", "dso"),
+                                   lambda m, i, dso: m * 12 * (i / 365) * dso)),
+    ("inventory_capital", Node(("monthly_sales", "cogs_percentage", "dio"),
+                               lambda m, c, dio: m * c * (dio / 30))),
+])
+
+# Status kupca po stvarnoj marži (%): prva granica koju marža prelazi, inače gubitak
+PROFIT_STATUSES = ((15, "🟢 IZVRSNO"), (8, "🟡 DOBRO"), (0, "🟠 SLABO"))
+LOSS_STATUS = "🔴 GUBITAK"
+
+# DSO se ne spušta ispod 30 dana, pa je ušteda manja od 15 dana kad je DSO ispod 45
+CASH_FLOW_SCENARIOS = [
+    Scenario("DSO -15 dana", {"dso": lambda dso: max(dso - 15, 30)}),
+    Scenario("+20% prodaja", {"monthly_sales": lambda m: m * 1.2}),
+    Scenario("Zalihe -20%", {"dio": lambda dio: dio * 0.8}),
+]
+
+
+def customer_params(total_sales, total_cost, supplier_terms, customer_dso, commission_rate,
+                    interest_rate, logistics, storage, administration, risk, other):
+    """Baseline parameters for CUSTOMER_MODEL (no early-payment discount)"""
+    return {
+        "total_sales": total_sales, "total_cost": total_cost, "supplier_terms": supplier_terms,
+        "customer_dso": customer_dso, "dso_factor": 1.0, "early_discount": 0.0,
+        "commission_rate": commission_rate, "interest_rate": interest_rate,
+        "logistics": logistics, "storage": storage, "administration": administration,
+        "risk": risk, "other": other,
+    }
+
+
+def cash_flow_params(monthly_sales, growth_rate, seasonal_factors, dso, dpo, dio, cogs_percentage,
+                     fixed_costs, starting_cash, interest_rate, open_collections=None):
+    """Baseline parameters for CASH_FLOW_MODEL (seasonal factors in MONTHS order)
+
+    open_collections: expected monthly collections of the open receivables
+    book (12 values), or None to project new sales only.
+    """
+    return {
+        "open_collections": np.zeros(12) if open_collections is None else np.asarray(open_collections, dtype=float),
+        "monthly_sales": monthly_sales, "growth_rate": growth_rate,
+        "seasonal_factors": np.asarray(seasonal_factors, dtype=float), "dso": dso, "dpo": dpo,
+        "dio": dio, "cogs_percentage": cogs_percentage, "fixed_costs": fixed_costs,
+        "starting_cash": starting_cash, "interest_rate": interest_rate,
+    }
+
+
+def profit_status(margin):
+    """Status label for a real profit margin in %"""
+    for limit, label in PROFIT_STATUSES:
+        if margin > limit:
+            return label
+    return LOSS_STATUS
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+# query.py - SQL NAD ZALIHAMA I PREPORUKAMA
+#
+# Koristi DuckDB (kolonski, višenitni) ako je instaliran, inače ugrađeni SQLite.
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from pricing_rules import get_rules
+
+try:
+    import duckdb
+except ImportError:  # opcionalna zavisnost
+    duckdb = None
+
+
+def _aging_buckets(thresholds):
+    """Bucket labels for the given status thresholds, e.g. 0-30/31-90/91-180/180+"""
+    lows = [0] + [t + 1 for t in thresholds]
+    return [f"{low}-{high}" for low, high in zip(lows, thresholds)] + [f"{thresholds[-1]}+"]
+
+
+# Granice su pragovi statusa zaliha iz pricing_rules.json - razredi prate cijene
+AGING_EDGES = list(get_rules().rules_for()["thresholds"])
+AGING_BUCKETS = _aging_buckets(AGING_EDGES)
+
+MARGIN_EDGES = [0, 10, 25, 50]
+MARGIN_BANDS = ["<0%", "0-10%", "10-25%", "25-50%", "50%+"]
+
+EXAMPLE_QUERIES = {
+    "Vrijednost po kategoriji i starosti": (
+        "SELECT category, aging_bucket, COUNT(*) AS products, "
+        "SUM(total_value) AS value, SUM(total_profit) AS profit\n"
+        "FROM pricing GROUP BY category, aging_bucket ORDER BY category, aging_bucket"
+    ),
+    "Proizvodi po marži": (
+        "SELECT margin_band, COUNT(*) AS products, AVG(margin_pct) AS avg_margin\n"
+        "FROM pricing GROUP BY margin_band ORDER BY avg_margin"
+    ),
+    "Mrtva roba": (
+        "SELECT name, days, recommended_price, total_value\n"
+        f"FROM pricing WHERE aging_bucket = '{AGING_BUCKETS[-1]}' ORDER BY total_value DESC"
+    ),
+}
+
+
+def aging_bucket(days):
+    """Vectorized aging bucket labels (same edges as the stock statuses)"""
+    codes = np.searchsorted(AGING_EDGES, np.asarray(days), side="left")
+    return pd.Categorical.from_codes(codes, AGING_BUCKETS)
+
+
+def margin_band(margin_pct):
+    """Vectorized margin band labels"""
+    codes = np.searchsorted(MARGIN_EDGES, np.asarray(margin_pct), side="right")
+    return pd.Categorical.from_codes(codes, MARGIN_BANDS)
+
+
+def pricing_table(products, recommended_price, status=None):
+    """Build the `pricing` table from a product table and recommended prices"""
+    recommended = np.asarray(recommended_price, dtype=float)
+    cost = products["cost"].to_numpy(dtype=float)
+    quantity = products["quantity"].to_numpy()
+    unit_profit = recommended - cost
+    margin_pct = np.divide(unit_profit, cost, out=np.zeros_like(cost), where=cost != 0) * 100
+
+    table = pd.DataFrame({
+        "id": products["id"].to_numpy(),
+        "name": products["name"].to_numpy(),
+        "category": products["category"].astype(str).to_numpy(),
+        "cost": cost,
+        "current_price": products["price"].to_numpy(dtype=float),
+        "recommended_price": recommended,
+        "days": products["days"].to_numpy(),
+        "quantity": quantity,
+        "unit_profit": unit_profit,
+        "margin_pct": margin_pct,
+        "total_value": quantity * recommended,
+        "total_profit": quantity * unit_profit,
+        "aging_bucket": aging_bucket(products["days"]),
+        "margin_band": margin_band(margin_pct),
+    })
+    if status is not None:
+        table.insert(8, "status", np.asarray(status))
+    if "currency" in products:
+        # Iznosi su u valuti artikla - grupiši po valuti prije sabiranja
+        table["currency"] = products["currency"].astype(str).to_numpy()
+    return table
+
+
+class QueryEngine:
+    """Embedded SQL engine over in-memory tables"""
+
+    def __init__(self, tables=None, backend=None):
+        self.backend = backend or ("duckdb" if duckdb is not None else "sqlite")
+        if self.backend == "duckdb":
+            if duckdb is None:
+                raise ImportError("duckdb nije instaliran (pip install duckdb)")
+            self._con = duckdb.connect(database=":memory:")
+        else:
+            self._con = sqlite3.connect(":memory:", check_same_thread=False)
+        for name, df in (tables or {}).items():
+            self.register(name, df)
+
+    def register(self, name, df):
+        """Expose a DataFrame as a SQL table"""
+        if self.backend == "duckdb":
+            self._con.register(name, df)  # bez kopiranja
+        else:
+            # SQLite ne zna za kategorije - šalji ih kao tekst
+            plain = df.apply(lambda c: c.astype(str) if isinstance(c.dtype, pd.CategoricalDtype) else c)
+            plain.to_sql(name, self._con, index=False, if_exists="replace")
+
+    def query(self, sql):
+        """Run a query and return the result as a DataFrame"""
+        if self.backend == "duckdb":
+            return self._con.execute(sql).df()
+        return pd.read_sql_query(sql, self._con)
+
+    def close(self):
+        self._con.close()
+
+
+def run_query(sql, tables, backend=None):
+    """One-off query over a dict of {table name: DataFrame}"""
+    engine = QueryEngine(tables, backend=backend)
+    try:
+        return engine.query(sql)
+    finally:
+        engine.close()
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+# ranking.py - TOP-K RANG LISTE (HITNOST, MARŽA, DOBIT)
+#
+# Najboljih K se bira sa np.partition (O(n)) umjesto sortiranja cijele
+# tabele; sortira se samo izabranih K. Kod jednakog skora prednost ima raniji
+# red, pa je rezultat isti kao stabilno sortiranje. Po kategoriji: redovi se
+# grupišu stabilnim radix sortom kodova kategorija, pa se bira unutar grupe.
+import numpy as np
+import pandas as pd
+
+# Skor -> kolone od kojih se računa (days, value, margin, profit)
+SCORES = {
+    "urgency": ("days", "value"),  # dani u lageru × vrijednost koja čeka
+    "margin": ("margin",),
+    "profit": ("profit",),
+}
+
+
+def score(name, columns):
+    """Score array for a SCORES name from a dict of column arrays"""
+    if name not in SCORES:
+        raise ValueError(f"Nepoznat skor '{name}' (dostupni: {', '.join(SCORES)})")
+    values = [np.asarray(columns[c], dtype=float) for c in SCORES[name]]
+    return np.prod(values, axis=0) if len(values) > 1 else values[0]
+
+
+def top_k(scores, k, mask=None):
+    """Row indices of the k highest scores (best first, ties by row order)
+
+    mask limits the candidates (e.g. only dead stock); NaN never ranks.
+    """
+    scores = np.asarray(scores, dtype=float)
+    rows = np.arange(len(scores)) if mask is None else np.flatnonzero(mask)
+    rows = rows[~np.isnan(scores[rows])]
+    if k <= 0 or len(rows) == 0:
+        return np.empty(0, dtype=np.int64)
+    values = scores[rows]
+    if len(rows) > k:
+        kth = np.partition(values, len(values) - k)[len(values) - k]
+        above = np.flatnonzero(values > kth)
+        ties = np.flatnonzero(values == kth)[:k - len(above)]
+        chosen = np.concatenate([above, ties])
+    else:
+        chosen = np.arange(len(rows))
+    order = np.lexsort((chosen, -values[chosen]))
+    return rows[chosen[order]]
+
+
+def top_k_per_group(scores, groups, k, mask=None):
+    """{group: row indices of its top k}, groups in sorted order"""
+    codes, labels = pd.factorize(np.asarray(groups), sort=True)
+    # Stabilan sort malih cijelih brojeva je radix sort (O(n)) i čuva redoslijed redova
+    codes = codes.astype(np.int16 if len(labels) < np.iinfo(np.int16).max else np.int64)
+    order = np.argsort(codes, kind="stable")
+    bounds = np.searchsorted(codes[order], np.arange(len(labels) + 1))
+    scores = np.asarray(scores, dtype=float)
+    mask = None if mask is None else np.asarray(mask)
+    result = {}
+    for g, label in enumerate(labels):
+        rows = order[bounds[g]:bounds[g + 1]]
+        result[label] = rows[top_k(scores[rows], k, None if mask is None else mask[rows])]
+    return result
+
+
+def leaderboard(df, scores, k, groups=None, mask=None):
+    """Top-k rows of df with Rank (and Group, per group) columns"""
+    if groups is None:
+        picked = {None: top_k(scores, k, mask)}
+    else:
+        picked = top_k_per_group(scores, groups, k, mask)
+    frames = []
+    for label, rows in picked.items():
+        frame = df.iloc[rows].copy()
+        frame.insert(0, "Rank", np.arange(1, len(rows) + 1))
+        if groups is not None:
+            frame.insert(0, "Group", label)
+        frame["Score"] = np.asarray(scores, dtype=float)[rows]
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True) if frames else df.iloc[:0]
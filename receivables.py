@@ -0,0 +1,318 @@
+# -*- coding: utf-8 -*-
+# receivables.py - KNJIGA OTVORENIH POTRAŽIVANJA SA DNEVNIM POMAKOM
+#
+# Otvorene fakture su u kolonama (NumPy nizovi) sortiranim po datumu fakture.
+# Zbirovi po starosnim grupama se vode tekuće: pomak za jedan dan premješta
+# samo fakture koje tog dana prelaze granicu grupe (nađene sa searchsorted),
+# a uplata zatvara fakture kupca od najstarije (FIFO) preko lanca indeksa.
+# Višak uplate ostaje kao avans kupca i zatvara njegove sljedeće fakture, kao
+# u match_payments - pomjerena knjiga je ista kao izgrađena ispočetka.
+import argparse
+import sys
+
+import numpy as np
+import pandas as pd
+
+from ledger import AGING_BUCKETS, AGING_EDGES, DEFAULT_TERMS, _days, load_ledger, match_payments
+
+INITIAL_CAPACITY = 1024
+
+
+def _bucket(age):
+    return np.searchsorted(AGING_EDGES, age, side="left")
+
+
+class ReceivablesBook:
+    """Open invoices with running aging totals"""
+
+    def __init__(self, as_of):
+        self.as_of = int(_days([as_of])[0])
+        self.size = 0
+        self.customer = np.zeros(INITIAL_CAPACITY, dtype=np.int64)
+        self.day = np.zeros(INITIAL_CAPACITY, dtype=np.int64)
+        self.due = np.zeros(INITIAL_CAPACITY, dtype=np.int64)
+        self.open = np.zeros(INITIAL_CAPACITY)
+        self.next = np.full(INITIAL_CAPACITY, -1, dtype=np.int64)  # sljedeća faktura istog kupca
+        self.customers = []
+        self._codes = {}
+        self.head = np.zeros(0, dtype=np.int64)  # najstarija otvorena faktura kupca
+        self.tail = np.zeros(0, dtype=np.int64)
+        self.bucket_totals = np.zeros(len(AGING_BUCKETS))
+        self.closed = 0
+        self.credit = {}  # kupac -> uplaćeno a nepotrošeno (avans)
+
+    # ---------- IZGRADNJA ----------
+    @classmethod
+    def from_ledger(cls, invoices, payments, as_of=None, terms=DEFAULT_TERMS):
+        """Open book as of a date, built from a full invoice/payment ledger"""
+        as_of = as_of or pd.Timestamp.today()
+        cutoff = _days([as_of])[0]
+        invoices = invoices[_days(invoices["date"]) <= cutoff]
+        payments = payments[_days(payments["date"]) <= cutoff]
+        matched = match_payments(invoices, payments, terms)
+        matched = matched[matched["open_amount"] > 0]
+        book = cls(as_of)
+        book._append(matched["customer"].to_numpy(), matched["day"].to_numpy(),
+                     matched["due_day"].to_numpy(), matched["open_amount"].to_numpy(dtype=float))
+        credit = payments.groupby("customer")["amount"].sum().sub(
+            invoices.groupby("customer")["amount"].sum(), fill_value=0).round(2)
+        book.credit = credit[credit > 0].to_dict()
+        return book
+
+    def _encode(self, names):
+        """Customer codes, registering new customers"""
+        codes = pd.Index(self.customers, dtype=object).get_indexer(pd.Index(names, dtype=object))
+        new = codes < 0
+        if new.any():
+            fresh, labels = pd.factorize(pd.Index(names, dtype=object)[new])
+            codes[new] = fresh + len(self.customers)
+            for name in labels:
+                self._codes[name] = len(self.customers)
+                self.customers.append(name)
+            self.head = np.concatenate([self.head, np.full(len(labels), -1, dtype=np.int64)])
+            self.tail = np.concatenate([self.tail, np.full(len(labels), -1, dtype=np.int64)])
+        return codes.astype(np.int64)
+
+    def _reserve(self, extra):
+        needed = self.size + extra
+        if needed <= len(self.day):
+            return
+        capacity = max(needed, 2 * len(self.day))
+        for name in ("customer", "day", "due", "open", "next"):
+            old = getattr(self, name)
+            new = np.full(capacity, -1 if name == "next" else 0, dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+    def _append(self, customers, days, dues, amounts):
+        """Add invoices; keeps the arrays sorted by invoice day"""
+        if len(days) == 0:
+            return
+        order = np.argsort(days, kind="stable")
+        customers, days, dues, amounts = customers[order], days[order], dues[order], amounts[order]
+        if self.size and days[0] < self.day[self.size - 1]:
+            # Faktura sa ranijim datumom: rijedak slučaj, knjiga se slaže ispočetka
+            frame, credit = self.open_invoices(raw=True), self.credit
+            self.__init__(pd.Timestamp(np.datetime64(self.as_of, "D")))
+            self.credit = credit
+            self._append(np.concatenate([frame["customer"].to_numpy(), customers]),
+                         np.concatenate([frame["day"].to_numpy(), days]),
+                         np.concatenate([frame["due_day"].to_numpy(), dues]),
+                         np.concatenate([frame["open_amount"].to_numpy(), amounts]))
+            return
+
+        self._reserve(len(days))
+        rows = np.arange(self.size, self.size + len(days))
+        codes = self._encode(customers)
+        self.customer[rows], self.day[rows], self.due[rows], self.open[rows] = codes, days, dues, amounts
+
+        # Povezivanje u lanac po kupcu: novi redovi grupisani po kupcu, u redoslijedu dana
+        order = np.argsort(codes, kind="stable")
+        grouped, linked = codes[order], rows[order]
+        same = grouped[1:] == grouped[:-1]
+        self.next[linked[:-1][same]] = linked[1:][same]
+        first = np.r_[True, ~same]
+        last = np.r_[~same, True]
+        first_code, first_row = grouped[first], linked[first]
+        has_tail = self.tail[first_code] >= 0
+        self.next[self.tail[first_code[has_tail]]] = first_row[has_tail]
+        self.head[first_code[~has_tail]] = first_row[~has_tail]
+        self.tail[grouped[last]] = linked[last]
+        self.size += len(days)
+        self.bucket_totals += np.bincount(_bucket(self.as_of - days), amounts, len(AGING_BUCKETS))
+
+    # ---------- DNEVNE PROMJENE ----------
+    def add_invoices(self, invoices, terms=DEFAULT_TERMS):
+        """Book new invoices (customer, date, amount[, due_date])"""
+        days = _days(invoices["date"])
+        if "due_date" in invoices:
+            due = invoices["due_date"].fillna(pd.to_datetime(invoices["date"]) + pd.Timedelta(days=terms))
+            dues = _days(due)
+        else:
+            dues = days + terms
+        customers, amounts = invoices["customer"].to_numpy(), invoices["amount"].to_numpy(dtype=float)
+        if self.credit:
+            amounts = self._use_credit(customers, days, amounts)
+        keep = amounts > 1e-9  # potpuno pokrivene avansom se ne knjiže
+        self._append(customers[keep], days[keep], dues[keep], amounts[keep])
+
+    def _use_credit(self, customers, days, amounts):
+        """Settle new invoices from their customer's credit, oldest invoice first"""
+        amounts = amounts.copy()
+        with_credit = np.flatnonzero(pd.Index(customers, dtype=object).isin(list(self.credit)))
+        for i in with_credit[np.argsort(days[with_credit], kind="stable")]:
+            credit = self.credit.get(customers[i], 0.0)
+            taken = min(credit, amounts[i])
+            amounts[i] -= taken
+            if credit - taken > 1e-9:
+                self.credit[customers[i]] = credit - taken
+            else:
+                self.credit.pop(customers[i], None)
+        return amounts
+
+    def apply_payments(self, payments):
+        """Close invoices oldest-first per customer; returns unapplied amount per customer
+
+        The unapplied amount stays with the customer as credit for their next invoices.
+        """
+        unapplied = {}
+        for customer, amount in zip(payments["customer"], payments["amount"].to_numpy(dtype=float)):
+            code = self._codes.get(customer)
+            row = self.head[code] if code is not None else -1
+            while amount > 1e-9 and row >= 0:
+                taken = min(amount, self.open[row])
+                self.open[row] -= taken
+                amount -= taken
+                self.bucket_totals[_bucket(self.as_of - self.day[row])] -= taken
+                if self.open[row] <= 1e-9:
+                    self.open[row] = 0.0
+                    self.closed += 1
+                    row = self.next[row]
+            if code is not None:
+                self.head[code] = row
+                if row < 0:
+                    self.tail[code] = -1
+            if amount > 1e-9:
+                unapplied[customer] = unapplied.get(customer, 0.0) + amount
+                self.credit[customer] = self.credit.get(customer, 0.0) + amount
+        if self.closed > self.size // 2 and self.size > INITIAL_CAPACITY:
+            self.compact()
+        return unapplied
+
+    def roll_forward(self, days=1):
+        """Advance the book by whole days, moving only invoices that cross a bucket edge"""
+        day = self.day[:self.size]
+        for _ in range(days):
+            self.as_of += 1
+            for i, edge in enumerate(AGING_EDGES):
+                # Starost edge -> edge + 1: faktura izdata na dan as_of - edge - 1
+                crossing = self.as_of - edge - 1
+                start, stop = np.searchsorted(day, [crossing, crossing + 1])
+                moved = self.open[start:stop].sum()
+                self.bucket_totals[i] -= moved
+                self.bucket_totals[i + 1] += moved
+
+    def advance(self, date, invoices=None, payments=None):
+        """Roll forward to `date`, then book that day's invoices and payments"""
+        target = int(_days([date])[0])
+        if target > self.as_of:
+            self.roll_forward(target - self.as_of)
+        if invoices is not None and len(invoices):
+            self.add_invoices(invoices)
+        if payments is not None and len(payments):
+            return self.apply_payments(payments)
+        return {}
+
+    # ---------- PREGLED ----------
+    def aging(self):
+        """Open amount per aging bucket"""
+        return pd.Series(self.bucket_totals.clip(min=0), index=AGING_BUCKETS, name="open")
+
+    def open_invoices(self, raw=False):
+        live = np.flatnonzero(self.open[:self.size] > 0)
+        frame = pd.DataFrame({
+            "customer": np.array(self.customers, dtype=object)[self.customer[live]] if len(live) else [],
+            "day": self.day[live],
+            "due_day": self.due[live],
+            "open_amount": self.open[live],
+        })
+        if not raw:
+            frame["date"] = frame["day"].to_numpy().astype("datetime64[D]")
+            frame["age"] = self.as_of - frame["day"]
+        return frame
+
+    def compact(self):
+        """Drop closed invoices (rebuilds arrays and customer chains)"""
+        frame, credit = self.open_invoices(raw=True), self.credit
+        as_of = pd.Timestamp(np.datetime64(self.as_of, "D"))
+        self.__init__(as_of)
+        self.credit = credit
+        self._append(frame["customer"].to_numpy(), frame["day"].to_numpy(),
+                     frame["due_day"].to_numpy(), frame["open_amount"].to_numpy())
+
+    def expected_collections(self, dso=None, months=12):
+        """Open book spread over the coming months by expected payment date
+
+        Each invoice is expected at invoice date + the customer's DSO
+        (dict/Series by customer) or at its due date; overdue amounts land
+        in the first month.
+        """
+        live = np.flatnonzero(self.open[:self.size] > 0)
+        code = self.customer[live]
+        expected = self.due[live].astype(float)
+        if dso is not None:
+            customer_dso = pd.Series(dso).reindex(self.customers).to_numpy(dtype=float)
+            by_dso = self.day[live] + customer_dso[code]
+            expected = np.where(np.isnan(by_dso), expected, by_dso)
+        ahead = np.maximum(expected - self.as_of, 0)
+        month = np.minimum(ahead // 30, months).astype(np.int64)  # zadnja grupa: poslije horizonta
+        return np.bincount(month, self.open[live], months + 1)[:months]
+
+    # ---------- ČUVANJE ----------
+    def save(self, path):
+        self.compact()
+        np.savez(path, as_of=self.as_of, customers=np.array(self.customers, dtype=object),
+                 customer=self.customer[:self.size], day=self.day[:self.size],
+                 due=self.due[:self.size], open=self.open[:self.size],
+                 credit_customers=np.array(list(self.credit), dtype=object),
+                 credit=np.array(list(self.credit.values()), dtype=float))
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path, allow_pickle=True)
+        book = cls(pd.Timestamp(np.datetime64(int(data["as_of"]), "D")))
+        book._append(data["customers"][data["customer"]], data["day"], data["due"], data["open"])
+        if "credit" in data:  # starije knjige nisu čuvale avanse
+            book.credit = dict(zip(data["credit_customers"].tolist(), data["credit"].tolist()))
+        return book
+
+
+def _rows_on(frame):
+    """day -> rows of `frame` dated that day (sorted once, sliced with searchsorted)"""
+    # Redovi sa vremenom (2026-09-01 14:30) pripadaju svom danu, kao u _days
+    frame = frame.assign(date=pd.to_datetime(frame["date"]).dt.normalize()).sort_values("date", kind="stable")
+    dates = frame["date"]
+
+    def rows(day):
+        return frame.iloc[dates.searchsorted(day, "left"):dates.searchsorted(day, "right")]
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build / roll forward the receivables book")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build_cmd = sub.add_parser("build", help="full ledger -> open book")
+    build_cmd.add_argument("invoices")
+    build_cmd.add_argument("payments")
+    build_cmd.add_argument("-o", "--output", default="receivables.npz")
+    build_cmd.add_argument("--date", help="as-of date (default: today)")
+    roll_cmd = sub.add_parser("roll", help="apply new invoices/payments day by day up to --date")
+    roll_cmd.add_argument("book")
+    roll_cmd.add_argument("invoices")
+    roll_cmd.add_argument("payments")
+    roll_cmd.add_argument("--date", help="roll up to this date (default: today)")
+    args = parser.parse_args(argv)
+
+    date = pd.Timestamp(args.date) if args.date else pd.Timestamp.today().normalize()
+    invoices, payments = load_ledger(args.invoices, args.payments)
+    if args.command == "build":
+        book = ReceivablesBook.from_ledger(invoices, payments, as_of=date)
+        output = args.output
+    else:
+        book = ReceivablesBook.load(args.book)
+        start = pd.Timestamp(np.datetime64(book.as_of, "D"))
+        # Samo promjene poslije zadnjeg pomaka, dan po dan; svaki dan dobija samo svoje redove
+        invoices_on, payments_on = _rows_on(invoices), _rows_on(payments)
+        for day in pd.date_range(start + pd.Timedelta(days=1), date):
+            unapplied = book.advance(day, invoices_on(day), payments_on(day))
+            for customer, amount in unapplied.items():
+                print(f"⚠️  {day:%Y-%m-%d} {customer}: {amount:,.2f} KM uplate bez otvorene fakture (avans)")
+        output = args.book
+    book.save(output)
+    aging = ", ".join(f"{k}: {v:,.2f}" for k, v in book.aging().items())
+    print(f"💾 {output} ({date:%Y-%m-%d}): {int((book.open[:book.size] > 0).sum())} open invoices | {aging}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
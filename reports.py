@@ -0,0 +1,368 @@
+# -*- coding: utf-8 -*-
+# reports.py - MASOVNI IZVJEŠTAJI (PAKETI PO KUPCU I POSLOVNOJ JEDINICI)
+#
+# Za svaki entitet - kupca iz sačuvanih analiza ili poslovnu jedinicu
+# (kategoriju kataloga) - pravi se jedan komprimovani paket: tabele kao
+# Parquet (CSV ako pyarrow nije instaliran), statični HTML grafikoni i
+# index.html sa sažetkom. Sve se računa jednom, vektorski, za sve entitete
+# (profitabilnost i gotovinski tok kupaca, cijene kataloga), a procesi samo
+# crtaju i pakuju svoj dio.
+#
+#   python reports.py izvjestaji/2026-09 --ledger fakture.csv uplate.csv --workers 8
+import argparse
+import html
+import io
+import json
+import multiprocessing
+import os
+import re
+import sys
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.offline
+
+import fx
+from analysis_store import OUTPUTS, PARAMS, STORE_PATH, AnalysisStore
+from ledger import customer_metrics, load_ledger
+from main import (load_catalogue_frame, products_from_frame, ranking_columns, recommendation_messages,
+                  recommendations_frame, reporting_totals)
+from profitability import CASH_FLOW_MODEL, CUSTOMER_COSTS, CUSTOMER_MODEL, MONTHS, cash_flow_params, profit_status
+from query import AGING_BUCKETS, MARGIN_BANDS, aging_bucket, margin_band
+from ranking import leaderboard, score
+
+try:
+    import pyarrow  # Parquet
+except ImportError:  # opcionalna zavisnost
+    pyarrow = None
+
+ENTITIES = ("customers", "units")
+PLOTLY_JS = ("cdn", "embed")  # embed: plotly.min.js u svakom paketu (radi bez interneta, ~1 MB više)
+PERIOD_MONTHS = {"Mjesečno": 1, "Kvartalno": 3, "Godišnje": 12}
+DEFAULT_DIO = 120  # dani zaliha za projekciju gotovinskog toka kupca (kao u app.py)
+TOP = 20  # artikala u rang listi poslovne jedinice
+
+
+# ---------- PAKET ----------
+class Bundle:
+    """Tables, charts and a summary of one entity, written as one zip file"""
+
+    def __init__(self, kind, name, plotlyjs="cdn"):
+        if plotlyjs not in PLOTLY_JS:
+            raise ValueError(f"plotlyjs mora biti jedno od: {', '.join(PLOTLY_JS)}")
+        self.kind = kind
+        self.name = name
+        self.plotlyjs = plotlyjs
+        self.summary = {}
+        self.tables = {}
+        self.charts = {}
+
+    def table(self, name, df):
+        self.tables[name] = df
+        return df
+
+    def chart(self, name, fig):
+        self.charts[name] = fig
+        return fig
+
+    def _table_bytes(self, df):
+        buffer = io.BytesIO()
+        if pyarrow is not None:
+            df.to_parquet(buffer, index=False, compression="zstd")
+            return "parquet", buffer.getvalue()
+        return "csv", df.to_csv(index=False).encode("utf-8")
+
+    def _index_html(self, files):
+        title = html.escape(f"{self.name}")
+        summary = pd.Series(self.summary, dtype=object).to_frame("").to_html(header=False)
+        charts = "".join(f'<li><a href="charts/{html.escape(n)}.html">{html.escape(n)}</a></li>' for n in self.charts)
+        data = "".join(f'<li><a href="{html.escape(f)}">{html.escape(f)}</a></li>' for f in files)
+        previews = "".join(f"<h3>{html.escape(n)}</h3>{df.head(20).to_html(index=False, float_format=lambda v: f'{v:,.2f}')}"
+                           for n, df in self.tables.items())
+        return (f"<!DOCTYPE html><html><head><meta charset='utf-8'><title>{title}</title></head><body>"
+                f"<h1>{title}</h1><p>{html.escape(self.kind)} · {datetime.now():%Y-%m-%d %H:%M}</p>"
+                f"<h2>Sažetak</h2>{summary}<h2>Grafikoni</h2><ul>{charts}</ul>"
+                f"<h2>Podaci</h2><ul>{data}</ul>{previews}</body></html>")
+
+    def write(self, target):
+        """Write the bundle zip to a path or binary file object"""
+        files = {}
+        with zipfile.ZipFile(target, "w", zipfile.ZIP_DEFLATED) as zf:
+            for name, df in self.tables.items():
+                extension, data = self._table_bytes(df)
+                path = f"data/{name}.{extension}"
+                # Parquet je već komprimovan - ne pakuje se ponovo
+                zf.writestr(path, data, zipfile.ZIP_STORED if extension == "parquet" else zipfile.ZIP_DEFLATED)
+                files[path] = len(df)
+            include = "cdn" if self.plotlyjs == "cdn" else "directory"
+            for name, fig in self.charts.items():
+                zf.writestr(f"charts/{name}.html", fig.to_html(include_plotlyjs=include, full_html=True))
+            if self.plotlyjs == "embed" and self.charts:
+                zf.writestr("charts/plotly.min.js", plotly.offline.get_plotlyjs())
+            manifest = {"kind": self.kind, "name": self.name, "generated_at": datetime.now().isoformat(timespec="seconds"),
+                        "summary": self.summary, "tables": files, "charts": [f"charts/{n}.html" for n in self.charts]}
+            zf.writestr("manifest.json", json.dumps(manifest, ensure_ascii=False, indent=2, default=float))
+            zf.writestr("index.html", self._index_html(files))
+        return target
+
+    def to_bytes(self):
+        buffer = io.BytesIO()
+        self.write(buffer)
+        return buffer.getvalue()
+
+
+# ---------- KUPCI ----------
+def customer_results(analyses, interest_rate=None):
+    """Profitability and 12-month cash flow of every analysis in one vectorized pass
+
+    analyses: frame with customer, period and the CUSTOMER_MODEL parameters.
+    Returns (results frame, {cash flow output: (n, 12) array}).
+    """
+    params = {c: analyses[c].to_numpy(dtype=float) for c in PARAMS}
+    if interest_rate is not None:
+        params["interest_rate"] = np.full(len(analyses), float(interest_rate))
+    values = CUSTOMER_MODEL.evaluate(params)
+    results = analyses[["customer", "period"]].reset_index(drop=True)
+    for name in PARAMS + ["cash_gap"] + OUTPUTS:
+        results[name] = np.broadcast_to(np.asarray(values[name], dtype=float), len(analyses))
+    results["status"] = [profit_status(m) for m in results["profit_margin"].tolist()]
+
+    # Gotovinski tok kupca: mjesečna prodaja iz perioda analize, naplata po DSO kupca,
+    # nabavka po roku dobavljača, dodatni troškovi kao fiksni mjesečni trošak
+    months = analyses["period"].map(PERIOD_MONTHS).fillna(1).to_numpy(dtype=float)[:, None]
+    sales = params["total_sales"][:, None]
+    fixed = sum(params[c] for c in CUSTOMER_COSTS)[:, None] + values["commission"][:, None]
+    cash_flow = CASH_FLOW_MODEL.evaluate(cash_flow_params(
+        sales / months, 0.0, np.ones(12), params["customer_dso"][:, None], params["supplier_terms"][:, None],
+        DEFAULT_DIO, np.divide(params["total_cost"], sales[:, 0], out=np.zeros(len(analyses)),
+                               where=sales[:, 0] > 0)[:, None],
+        fixed / months, 0.0, params["interest_rate"][:, None]))
+    return results, {name: np.broadcast_to(cash_flow[name], (len(analyses), 12))
+                     for name in ("sales", "cash_in", "cash_out", "net_cash_flow", "cash")}
+
+
+def ledger_months(invoices, payments):
+    """Invoiced and paid amount per (customer, month)"""
+    frames = []
+    for frame, column in ((invoices, "invoiced"), (payments, "paid")):
+        month = frame["date"].dt.to_period("M").astype(str)
+        frames.append(frame.groupby(["customer", month])["amount"].sum().rename(column))
+    return pd.concat(frames, axis=1).fillna(0.0).rename_axis(["customer", "month"]).reset_index()
+
+
+def customer_bundle(row, cash_flow, months=None, metrics=None, plotlyjs="cdn"):
+    """Bundle for one analysis: profitability, costs, cash flow and ledger history"""
+    bundle = Bundle("customer", f"{row['customer']} ({row['period']})", plotlyjs)
+    bundle.summary = {
+        "Kupac": row["customer"], "Period": row["period"], "Status": row["status"],
+        "Prodaja (KM)": round(row["total_sales"], 2), "Stvarna dobit (KM)": round(row["real_profit"], 2),
+        "Marža (%)": round(row["profit_margin"], 1), "DSO (dani)": row["customer_dso"],
+    }
+    bundle.table("profitability", row.to_frame().T.infer_objects())
+    costs = pd.DataFrame({"cost": ["financing", "commission"] + list(CUSTOMER_COSTS)})
+    costs["amount"] = [row[c] for c in costs["cost"]]
+    costs["share_of_sales_%"] = costs["amount"] / row["total_sales"] * 100 if row["total_sales"] else 0.0
+    bundle.table("costs", costs)
+    bundle.chart("costs", px.pie(costs, values="amount", names="cost", title="Struktura dodatnih troškova"))
+
+    flow = pd.DataFrame({"month": MONTHS, **cash_flow})
+    bundle.table("cash_flow", flow)
+    bundle.chart("cash_flow", px.line(flow, x="month", y=["cash_in", "cash_out", "cash"], markers=True,
+                                      title="Gotovinski tok kupca (12 mjeseci)"))
+
+    if months is not None and len(months):
+        bundle.table("ledger_months", months)
+        bundle.chart("ledger_months", px.bar(months, x="month", y=["invoiced", "paid"], barmode="group",
+                                             title="Fakturisano i plaćeno po mjesecima"))
+    if metrics is not None:
+        bundle.table("ledger_metrics", metrics.to_frame().T.reset_index(names="customer"))
+        bundle.summary["Otvoreno (KM)"] = round(float(metrics["open_balance"]), 2)
+    return bundle
+
+
+# ---------- POSLOVNE JEDINICE ----------
+def unit_results(frame, dso=83, unit_column="category"):
+    """Recommendations (with messages) for the whole catalogue and the unit of each row"""
+    df = recommendations_frame(products_from_frame(frame), dso)
+    df.insert(df.columns.get_loc("Action") + 1, "Message", recommendation_messages(df))
+    return df.drop(columns="Discount_%"), frame[unit_column].astype(str).to_numpy()
+
+
+def unit_bundle(name, df, currency=fx.BASE, rates=None, top=TOP, plotlyjs="cdn"):
+    """Bundle for one business unit: pricing, aging / margin analytics and top products"""
+    bundle = Bundle("unit", name, plotlyjs)
+    total_value, total_profit = reporting_totals(df, currency, rates)
+    dead = (df["Status"].cat.codes == 3).to_numpy()
+    bundle.summary = {
+        "Jedinica": name, "Artikala": len(df), f"Vrijednost ({currency})": round(total_value, 2),
+        f"Dobit ({currency})": round(total_profit, 2), "Prosječna marža (%)": round(float(df["Margin_%"].mean()), 1),
+        "Mrtva roba (artikala)": int(dead.sum()),
+    }
+    bundle.table("pricing", df)
+
+    columns = ranking_columns(df, currency, rates)
+    analytics = pd.DataFrame({
+        "aging_bucket": aging_bucket(df["Days_Old"]), "margin_band": margin_band(df["Margin_%"]),
+        "status": df["Status"], "value": columns["value"], "profit": columns["profit"],
+    })
+    aging = analytics.groupby(["aging_bucket", "status"], observed=True)[["value", "profit"]].sum().reset_index()
+    bundle.table("aging", aging)
+    bundle.chart("aging", px.bar(aging, x="aging_bucket", y="value", color="status",
+                                 category_orders={"aging_bucket": AGING_BUCKETS},
+                                 title=f"Vrijednost zaliha po starosti ({currency})"))
+    margins = analytics.groupby("margin_band", observed=False).agg(
+        products=("value", "size"), value=("value", "sum")).reset_index()
+    bundle.table("margins", margins)
+    bundle.chart("margins", px.bar(margins, x="margin_band", y="products", category_orders={"margin_band": MARGIN_BANDS},
+                                   title="Artikli po marži"))
+
+    board = leaderboard(df[["Product", "Status", "Days_Old", "Currency", "Recommended_Price", "Total_Value"]],
+                        score("urgency", columns), top, mask=dead)
+    bundle.table("top_urgent", board)
+    return bundle
+
+
+# ---------- PARALELNO PAKOVANJE ----------
+def _render(builder, args, kwargs, path):
+    """Worker task: build one bundle and write it; returns (path, summary)"""
+    bundle = builder(*args, **kwargs)
+    bundle.write(path)
+    return path, bundle.summary
+
+
+def slug(text, taken):
+    """File-safe unique name"""
+    base = re.sub(r"[^\w.-]+", "_", str(text)).strip("._") or "entity"
+    name, n = base, 1
+    while name in taken:
+        n += 1
+        name = f"{base}_{n}"
+    taken.add(name)
+    return name
+
+
+def customer_tasks(store, out_dir, ledger=None, interest_rate=None, plotlyjs="cdn"):
+    """(builder, args, kwargs, path) for every saved analysis"""
+    analyses = store.analyses()
+    if len(analyses) == 0:
+        return []
+    results, cash_flow = customer_results(analyses, interest_rate)
+    months, metrics = {}, None
+    if ledger is not None:
+        invoices, payments = ledger
+        months = dict(tuple(ledger_months(invoices, payments).groupby("customer")))
+        metrics = customer_metrics(invoices, payments)
+    folder = os.path.join(out_dir, "customers")
+    os.makedirs(folder, exist_ok=True)
+    taken = set()
+    tasks = []
+    for i, row in results.iterrows():
+        customer = row["customer"]
+        tasks.append((customer_bundle, (row, {k: v[i] for k, v in cash_flow.items()}),
+                      {"months": months.get(customer),
+                       "metrics": metrics.loc[customer] if metrics is not None and customer in metrics.index else None,
+                       "plotlyjs": plotlyjs},
+                      os.path.join(folder, slug(f"{customer}_{row['period']}", taken) + ".zip")))
+    return tasks
+
+
+def unit_tasks(frame, out_dir, dso=83, unit_column="category", currency=fx.BASE, rates=None, top=TOP,
+               plotlyjs="cdn"):
+    """(builder, args, kwargs, path) for every business unit of the catalogue"""
+    if unit_column not in frame:
+        raise ValueError(f"Katalog nema kolonu '{unit_column}'")
+    df, units = unit_results(frame, dso, unit_column)
+    codes, labels = pd.factorize(units, sort=True)
+    # Redovi se grupišu jednim stabilnim sortom, svaka jedinica je jedan isječak
+    order = np.argsort(codes, kind="stable")
+    bounds = np.searchsorted(codes[order], np.arange(len(labels) + 1))
+    folder = os.path.join(out_dir, "units")
+    os.makedirs(folder, exist_ok=True)
+    taken = set()
+    return [(unit_bundle, (label, df.iloc[order[bounds[g]:bounds[g + 1]]].reset_index(drop=True)),
+             {"currency": currency, "rates": rates, "top": top, "plotlyjs": plotlyjs},
+             os.path.join(folder, slug(label, taken) + ".zip"))
+            for g, label in enumerate(labels)]
+
+
+def build_reports(tasks, workers=None, progress=None):
+    """Write every bundle (in worker processes if workers > 1); returns [(path, summary)]"""
+    workers = multiprocessing.cpu_count() if workers is None else workers
+    results = []
+    if workers <= 1 or len(tasks) <= 1:
+        for task in tasks:
+            results.append(_render(*task))
+            if progress:
+                progress(len(results), len(tasks))
+        return results
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_render, *task) for task in tasks]
+        for future in as_completed(futures):
+            results.append(future.result())
+            if progress:
+                progress(len(results), len(tasks))
+    order = {task[3]: i for i, task in enumerate(tasks)}
+    return sorted(results, key=lambda r: order[r[0]])
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk report bundles (Parquet + HTML charts) per customer and unit")
+    parser.add_argument("output", help="Output directory (customers/, units/ and summary.csv)")
+    parser.add_argument("sources", nargs="*", help="Warehouse exports for unit reports (default: products.csv)")
+    parser.add_argument("--entities", nargs="+", choices=ENTITIES, default=list(ENTITIES))
+    parser.add_argument("--store", default=STORE_PATH, help="Saved customer analyses (default: %(default)s)")
+    parser.add_argument("--ledger", nargs=2, metavar=("INVOICES_CSV", "PAYMENTS_CSV"),
+                        help="Add payment metrics and monthly invoiced/paid history to customer reports")
+    parser.add_argument("--interest", type=float, metavar="PERCENT",
+                        help="Recalculate every customer at this interest rate (default: the saved one)")
+    parser.add_argument("--unit-column", default="category",
+                        help="Catalogue column that defines business units (default: %(default)s)")
+    parser.add_argument("--dso", type=float, default=83, help="DSO for unit pricing (default: %(default)s)")
+    parser.add_argument("--top", type=int, default=TOP, help="Urgent products per unit (default: %(default)s)")
+    parser.add_argument("--currency", type=fx.normalize, default=fx.BASE, help="Reporting currency for unit totals")
+    parser.add_argument("--fx-date", metavar="YYYY-MM-DD", help="FX rates valid on this date (default: today)")
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count(),
+                        help="Worker processes (default: %(default)s)")
+    parser.add_argument("--plotlyjs", choices=PLOTLY_JS, default="cdn",
+                        help="cdn: charts load plotly.js online; embed: ship it in every bundle")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.makedirs(args.output, exist_ok=True)
+    started = datetime.now()
+    tasks = []
+    if "customers" in args.entities:
+        ledger = load_ledger(*args.ledger) if args.ledger else None
+        store = AnalysisStore(args.store)
+        try:
+            interest = None if args.interest is None else args.interest / 100
+            tasks += customer_tasks(store, args.output, ledger, interest, args.plotlyjs)
+        finally:
+            store.close()
+        print(f"👥 {len(tasks)} customer analyses from {args.store}")
+    if "units" in args.entities:
+        rates = fx.rates_on(args.fx_date)
+        frame = load_catalogue_frame(args.sources, extra_columns=[args.unit_column])
+        units = unit_tasks(frame, args.output, args.dso, args.unit_column, args.currency, rates, args.top,
+                           args.plotlyjs)
+        print(f"🏬 {len(units)} business units ({args.unit_column}) from {len(frame)} products")
+        tasks += units
+
+    results = build_reports(tasks, args.workers, progress=lambda done, total: print(
+        f"\r   ⏳ {done}/{total} bundles", end="", file=sys.stderr, flush=True))
+    print(file=sys.stderr)
+    summary = pd.DataFrame([{"kind": task[0].__name__.split("_")[0], "file": os.path.relpath(path, args.output),
+                             **info} for task, (path, info) in zip(tasks, results)])
+    summary.to_csv(os.path.join(args.output, "summary.csv"), index=False, encoding="utf-8")
+    elapsed = (datetime.now() - started).total_seconds()
+    print(f"📦 {len(results)} bundles written to {args.output} in {elapsed:.1f}s (summary.csv)")
+
+
+if __name__ == "__main__":
+    main()
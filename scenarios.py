@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+# scenarios.py - ŠTA AKO SCENARIJI NAD ZAJEDNIČKOM OSNOVOM
+#
+# Model je niz imenovanih veličina, svaka je funkcija drugih veličina ili
+# ulaznih parametara. Osnova (baseline) se izračuna jednom; scenarij mijenja
+# samo neke parametre, pa se ponovo računaju samo veličine koje od njih zavise.
+# Svi scenariji jedne serije računaju se zajedno: promijenjeni parametar
+# postaje niz sa po jednim redom za svaki scenarij.
+import threading
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+import pandas as pd
+
+Node = namedtuple("Node", "inputs func")
+Scenario = namedtuple("Scenario", "name deltas")
+
+MEMO_SIZE = 512
+
+
+def _freeze(value):
+    """Hashable form of a parameter value (numbers or sequences)"""
+    array = np.asarray(value, dtype=float)
+    return float(array) if array.ndim == 0 else tuple(array.ravel().tolist())
+
+
+def _scalar(value):
+    value = np.squeeze(np.asarray(value, dtype=float))
+    return float(value) if value.ndim == 0 else value
+
+
+class Model:
+    """Named quantities in dependency order: name -> Node(inputs, func)"""
+
+    def __init__(self, nodes):
+        self.nodes = OrderedDict(nodes)
+        self.params = sorted({i for node in self.nodes.values() for i in node.inputs} - set(self.nodes))
+        defined = set()
+        for name, node in self.nodes.items():
+            late = [i for i in node.inputs if i in self.nodes and i not in defined]
+            if late:
+                raise ValueError(f"'{name}' zavisi od kasnije definisanih veličina: {', '.join(late)}")
+            defined.add(name)
+
+    def affected(self, changed):
+        """Quantities that depend (directly or not) on the changed parameters"""
+        dirty = set(changed)
+        for name, node in self.nodes.items():
+            if dirty.intersection(node.inputs):
+                dirty.add(name)
+        return [name for name in self.nodes if name in dirty]
+
+    def evaluate(self, params, only=None, values=None):
+        """Compute quantities (all, or just `only`) on top of known values"""
+        values = dict(values or {})
+        values.update(params)
+        for name in only if only is not None else self.nodes:
+            node = self.nodes[name]
+            values[name] = node.func(*(values[i] for i in node.inputs))
+        return values
+
+
+class ScenarioEngine:
+    """Evaluate scenarios as deltas against a cached baseline"""
+
+    def __init__(self, model, memo_size=MEMO_SIZE):
+        self.model = model
+        self.memo_size = memo_size
+        self._memo = OrderedDict()  # (verzija osnove, delte) -> vrijednosti
+        self._baselines = {}
+        self._lock = threading.RLock()  # engine se dijeli između sesija (st.cache_resource)
+
+    def baseline(self, params):
+        """(version, values) for a parameter set, computed once per version"""
+        missing = set(self.model.params) - set(params)
+        if missing:
+            raise ValueError(f"Nedostaju parametri: {', '.join(sorted(missing))}")
+        version = hash(tuple((k, _freeze(params[k])) for k in self.model.params))
+        with self._lock:
+            values = self._baselines.get(version)
+            if values is None:
+                values = self.model.evaluate(params)
+                self._baselines = {version: values}  # čuva se samo zadnja osnova
+        return version, values
+
+    def resolve(self, scenario, base):
+        """Scenario deltas as absolute parameter values (callables get the baseline value)"""
+        return {k: (v(base[k]) if callable(v) else v) for k, v in scenario.deltas.items()}
+
+    def run(self, params, scenarios):
+        """Evaluate all scenarios in one batch; returns (baseline, [values per scenario])"""
+        with self._lock:
+            return self._run(params, scenarios)
+
+    def _run(self, params, scenarios):
+        version, base = self.baseline(params)
+        results, pending = {}, []
+        for scenario in scenarios:
+            deltas = self.resolve(scenario, base)
+            unknown = set(deltas) - set(self.model.params)
+            if unknown:
+                raise ValueError(f"Scenarij '{scenario.name}' mijenja nepoznate parametre: {', '.join(sorted(unknown))}")
+            key = (version, tuple(sorted((k, _freeze(v)) for k, v in deltas.items())))
+            if key in self._memo:
+                self._memo.move_to_end(key)
+                results[scenario.name] = self._memo[key]
+            else:
+                pending.append((scenario.name, key, deltas))
+
+        if pending:
+            changed = sorted({k for _, _, deltas in pending for k in deltas})
+            # Promijenjeni parametri dobijaju vodeću osu (jedan red po scenariju)
+            batch = {
+                k: np.stack([np.atleast_1d(np.asarray(deltas.get(k, base[k]), dtype=float))
+                             for _, _, deltas in pending])
+                for k in changed
+            }
+            affected = self.model.affected(changed)
+            computed = self.model.evaluate(batch, only=affected, values=base)
+            for row, (name, key, deltas) in enumerate(pending):
+                values = dict(base)
+                values.update(deltas)
+                values.update({n: _scalar(computed[n][row]) for n in affected})
+                results[name] = values
+                self._memo[key] = values
+                if len(self._memo) > self.memo_size:
+                    self._memo.popitem(last=False)
+        return base, [results[s.name] for s in scenarios]
+
+    def compare(self, params, scenarios, outputs):
+        """Side-by-side table: baseline and each scenario, with deltas"""
+        base, results = self.run(params, scenarios)
+        rows = {"Osnova": {o: _scalar(base[o]) for o in outputs}}
+        for scenario, values in zip(scenarios, results):
+            rows[scenario.name] = {o: values[o] for o in outputs}
+        table = pd.DataFrame(rows).T
+        for o in outputs:
+            table[f"Δ {o}"] = table[o] - table.loc["Osnova", o]
+        return table
@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+# shard.py - RASPODJELA CIJENJENJA KATALOGA NA VIŠE MAŠINA
+#
+# Koordinator dijeli katalog po hash-u šifre artikla (crc32, isti na svakoj
+# mašini i u svakom pokretanju) i stavlja shardove u red poslova koji
+# izlaže preko multiprocessing managera (TCP + authkey). Workeri - lokalni
+# procesi ili `python shard.py worker HOST:PORT` na drugim mašinama - uzimaju
+# posao, izračunaju ga i vraćaju rezultat. Manager raspakuje (unpickle) poslove
+# i rezultate, pa je authkey jedina zaštita: adresa van loopback-a traži
+# SHARD_AUTHKEY, a lokalno pokretanje bez njega dobija nasumičan ključ. Shard koji padne ili ne stigne do
+# roka šalje se ponovo (najviše `retries` puta). Svaki red nosi svoju poziciju
+# u katalogu, pa spajanje daje isti redoslijed kao obrada na jednoj mašini.
+import argparse
+import multiprocessing
+import os
+import ipaddress
+import queue
+import socket
+import threading
+import time
+import traceback
+import zlib
+from multiprocessing.managers import BaseManager
+
+import numpy as np
+
+AUTHKEY_ENV = "SHARD_AUTHKEY"
+HOST = socket.gethostname()
+TIMEOUT = 600.0  # sekundi po shardu prije ponovnog slanja
+RETRIES = 2
+POLL = 0.5
+STARTED, DONE, FAILED = "started", "done", "failed"
+
+
+def shard_of(ids, shards):
+    """Shard number of every SKU id (crc32 of its text form)"""
+    return np.fromiter((zlib.crc32(str(i).encode()) % shards for i in ids), dtype=np.int64, count=len(ids))
+
+
+def split(frame, shards, id_column="id"):
+    """[(shard, catalogue positions, rows)] for the non-empty shards"""
+    codes = shard_of(frame[id_column], shards)
+    parts = []
+    for shard in range(shards):
+        positions = np.flatnonzero(codes == shard)
+        if len(positions):
+            parts.append((shard, positions, frame.iloc[positions].reset_index(drop=True)))
+    return parts
+
+
+class ShardManager(BaseManager):
+    pass
+
+
+def _address(text):
+    host, _, port = text.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def _is_loopback(host):
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def authkey_for(address):
+    """Authkey for a coordinator on `address`
+
+    SHARD_AUTHKEY when set; otherwise a random key, allowed only on a
+    loopback address because remote workers could not know it (and a
+    guessable key would let anyone on the network run code here).
+    """
+    key = os.environ.get(AUTHKEY_ENV)
+    if key:
+        return key.encode()
+    if not _is_loopback(address[0]):
+        raise ValueError(f"Adresa {address[0]} nije lokalna: postavi {AUTHKEY_ENV} "
+                         f"(isti tajni ključ na koordinatoru i svim workerima)")
+    return os.urandom(32)
+
+
+class Coordinator:
+    """Job/result queues served over TCP, with timeout-based retries"""
+
+    def __init__(self, address=("127.0.0.1", 0), authkey=None, timeout=TIMEOUT, retries=RETRIES):
+        self.timeout = timeout
+        self.retries = retries
+        self._jobs = queue.Queue()
+        self._results = queue.Queue()
+        self.stalled = set()  # (host, pid) workera čiji je posao istekao
+        self.authkey = authkey_for(address) if authkey is None else authkey
+        ShardManager.register("jobs", callable=lambda: self._jobs)
+        ShardManager.register("results", callable=lambda: self._results)
+        self._server = ShardManager(address=address, authkey=self.authkey).get_server()
+        self.address = self._server.address
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def run(self, func, tasks, progress=None, poll=None):
+        """Run func(*task) for every {key: task}; returns {key: result}
+
+        The timeout counts from the moment a worker starts the task, so
+        tasks waiting for a free worker never expire. Raises RuntimeError
+        when a task still fails after `retries` resends. poll() is called
+        between results (e.g. to restart dead workers).
+        """
+        attempts = {key: 0 for key in tasks}
+        deadlines = {}  # (ključ, pokušaj) -> rok, od trenutka kada ga worker uzme
+        running = {}  # (ključ, pokušaj) -> (host, pid) workera
+        errors = {}
+        done = {}
+
+        def send(key):
+            attempts[key] += 1
+            self._jobs.put((key, attempts[key], func, tasks[key]))
+
+        for key in tasks:
+            send(key)
+        while len(done) < len(tasks):
+            try:
+                key, attempt, status, value = self._results.get(timeout=POLL)
+            except queue.Empty:
+                key = None
+            if poll:
+                poll()
+            if key is not None and key not in done:
+                if status == STARTED:
+                    deadlines[(key, attempt)] = time.monotonic() + self.timeout
+                    running[(key, attempt)] = value
+                    continue
+                deadlines.pop((key, attempt), None)
+                running.pop((key, attempt), None)
+                if status == DONE:
+                    done[key] = value
+                    if progress:
+                        progress(len(done), len(tasks))
+                    continue
+                errors[key] = value
+                if attempt == attempts[key]:
+                    self._retry(key, attempts, errors, send)
+            now = time.monotonic()
+            for job in [j for j, deadline in deadlines.items() if deadline <= now]:
+                del deadlines[job]
+                self.stalled.add(running.pop(job))
+                if job[0] not in done and job[1] == attempts[job[0]]:
+                    self._retry(job[0], attempts, errors, send)
+        return done
+
+    def _retry(self, key, attempts, errors, send):
+        if attempts[key] > self.retries:
+            raise RuntimeError(f"Shard {key} nije uspio ni nakon {attempts[key]} pokušaja"
+                               + (f":\n{errors[key]}" if key in errors else " (istek vremena)"))
+        send(key)
+
+    def stop(self, workers):
+        """Tell `workers` workers to exit"""
+        for _ in range(workers):
+            self._jobs.put(None)
+
+
+def worker(address, authkey=None):
+    """Take jobs until the coordinator sends None or goes away"""
+    if authkey is None:
+        authkey = os.environ.get(AUTHKEY_ENV, "").encode()
+    ShardManager.register("jobs")
+    ShardManager.register("results")
+    manager = ShardManager(address=address, authkey=authkey)
+    manager.connect()
+    jobs, results = manager.jobs(), manager.results()
+    while True:
+        try:
+            job = jobs.get()
+        except (EOFError, ConnectionError):
+            return
+        if job is None:
+            return
+        key, attempt, func, task = job
+        try:
+            results.put((key, attempt, STARTED, (HOST, os.getpid())))
+            results.put((key, attempt, DONE, func(*task)))
+        except (EOFError, ConnectionError):
+            return
+        except Exception:
+            results.put((key, attempt, FAILED, traceback.format_exc()))
+
+
+def run_local(func, tasks, workers, timeout=TIMEOUT, retries=RETRIES, address=("127.0.0.1", 0), progress=None,
+              authkey=None):
+    """Coordinator plus `workers` worker processes on this machine
+
+    With a public `address`, workers on other machines can join too
+    (python shard.py worker HOST:PORT, with the same SHARD_AUTHKEY).
+    """
+    coordinator = Coordinator(address, authkey, timeout=timeout, retries=retries)
+
+    def spawn():
+        process = multiprocessing.Process(target=worker, args=(coordinator.address, coordinator.authkey),
+                                          daemon=True)
+        process.start()
+        return process
+
+    processes = [spawn() for _ in range(workers)]
+
+    def replace_dead():
+        # Posao umrlog ili zaglavljenog workera se ponovo šalje po isteku roka;
+        # ovdje se zaglavljeni gase i vraća se broj workera
+        for i, process in enumerate(processes):
+            if (HOST, process.pid) in coordinator.stalled:
+                process.kill()
+                process.join()
+            if not process.is_alive():
+                processes[i] = spawn()
+
+    try:
+        return coordinator.run(func, tasks, progress, replace_dead)
+    finally:
+        coordinator.stop(workers)
+        for p in processes:
+            p.join(timeout=5)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Worker for sharded pricing runs (main.py --shards)")
+    parser.add_argument("command", choices=["worker"])
+    parser.add_argument("address", help="Coordinator HOST:PORT (main.py --shard-listen)")
+    args = parser.parse_args()
+    if not os.environ.get(AUTHKEY_ENV):
+        parser.error(f"postavi {AUTHKEY_ENV} na ključ koordinatora")
+    worker(_address(args.address))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+# -*- coding: utf-8 -*-
+#!/usr/bin/env python3
+# snapshot.py - BINARNI SNAPSHOT ZALIHA (np.memmap)
+#
+# Raspored fajla:
+#   MAGIC (8 B) | verzija šeme (uint32) | dužina zaglavlja (uint32) | JSON zaglavlje
+#   | poravnanje na 64 B | kolone fiksne širine + string heap za nazive
+import argparse
+import hashlib
+import json
+import os
+import struct
+import sys
+
+import numpy as np
+import pandas as pd
+
+from fx import BASE as BASE_CURRENCY
+
+MAGIC = b"DCSNAP\x00\x00"
+SCHEMA_VERSION = 1
+SNAPSHOT_EXTENSION = ".dcsnap"
+ALIGNMENT = 64
+
+# Numeričke kolone i njihovi tipovi u snapshotu
+NUMERIC_DTYPES = {
+    "cost": "<f8",
+    "price": "<f8",
+    "days": "<i4",
+    "quantity": "<i8",
+}
+
+
+class SnapshotError(ValueError):
+    """Snapshot is corrupt or was written with an unsupported schema"""
+
+
+def snapshot_path_for(source):
+    """Default snapshot path next to a product export"""
+    return os.path.splitext(source)[0] + SNAPSHOT_EXTENSION
+
+
+def _align(n):
+    return (n + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _string_heap(values):
+    """Encode strings as NUL-separated UTF-8 bytes plus int64 offsets"""
+    strings = pd.Series(values).astype(str).str.replace("\x00", "", regex=False).tolist()
+    joined = "\x00".join(strings + [""])  # svaki string završava sa NUL
+    heap = np.frombuffer(joined.encode("utf-8"), dtype=np.uint8)
+    offsets = np.zeros(len(values) + 1, dtype="<i8")
+    offsets[1:] = np.flatnonzero(heap == 0) + 1
+    return offsets, heap
+
+
+def compile_snapshot(df, path, source=None):
+    """Write a product table as a versioned, checksummed binary snapshot"""
+    n = len(df)
+    arrays = {}
+    for col, dtype in NUMERIC_DTYPES.items():
+        arrays[col] = df[col].to_numpy().astype(dtype)
+    for col in df.columns:
+        if col.startswith("qty_"):
+            arrays[col] = df[col].to_numpy().astype("<i8")
+
+    string_ids = not pd.api.types.is_integer_dtype(df["id"])
+    if string_ids:
+        arrays["id.offsets"], arrays["id.heap"] = _string_heap(df["id"])
+    else:
+        arrays["id"] = df["id"].to_numpy().astype("<i8")
+    arrays["name.offsets"], arrays["name.heap"] = _string_heap(df["name"])
+    categories = pd.Categorical(df["category"].astype(str))
+    arrays["category"] = categories.codes.astype("<i4")
+    currencies = pd.Categorical(df["currency"].astype(str) if "currency" in df else [BASE_CURRENCY] * n)
+    arrays["currency"] = currencies.codes.astype("<i2")
+
+    columns, offset = {}, 0
+    for name, arr in arrays.items():
+        columns[name] = {"dtype": arr.dtype.str, "offset": offset, "length": len(arr)}
+        offset = _align(offset + arr.nbytes)
+    data_size = offset
+
+    def chunks():
+        # Kolone redom, svaka dopunjena nulama do poravnanja
+        for name, arr in arrays.items():
+            data = arr.tobytes()
+            yield data
+            yield b"\x00" * (_align(len(data)) - len(data))
+
+    checksum = hashlib.sha256()
+    for chunk in chunks():
+        checksum.update(chunk)
+
+    header = {
+        "schema_version": SCHEMA_VERSION,
+        "rows": n,
+        "string_ids": string_ids,
+        "categories": list(categories.categories),
+        "currencies": list(currencies.categories),
+        "columns": columns,
+        "data_size": data_size,
+        "checksum": checksum.hexdigest(),
+    }
+    if source is not None:
+        st = os.stat(source)
+        header["source"] = {"path": os.path.abspath(source), "mtime_ns": st.st_mtime_ns, "size": st.st_size}
+
+    header_bytes = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    prefix = MAGIC + struct.pack("<II", SCHEMA_VERSION, len(header_bytes)) + header_bytes
+    data_start = _align(len(prefix))
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(prefix)
+        f.write(b"\x00" * (data_start - len(prefix)))
+        for chunk in chunks():
+            f.write(chunk)
+    os.replace(tmp_path, path)  # čitaoci nikad ne vide pola fajla
+    return path
+
+
+def read_header(path):
+    """Read and validate the snapshot header; returns (header, data offset)"""
+    with open(path, "rb") as f:
+        prefix = f.read(len(MAGIC) + 8)
+        if len(prefix) < len(MAGIC) + 8 or prefix[:len(MAGIC)] != MAGIC:
+            raise SnapshotError(f"{path} nije snapshot zaliha")
+        version, header_len = struct.unpack("<II", prefix[len(MAGIC):])
+        if version != SCHEMA_VERSION:
+            raise SnapshotError(f"Nepodržana verzija šeme {version} (očekivano {SCHEMA_VERSION})")
+        header = json.loads(f.read(header_len).decode("utf-8"))
+
+    data_start = _align(len(MAGIC) + 8 + header_len)
+    if os.path.getsize(path) < data_start + header["data_size"]:
+        raise SnapshotError(f"{path} je skraćen")
+    return header, data_start
+
+
+class Snapshot:
+    """Memory-mapped product snapshot; columns are read-only NumPy arrays"""
+
+    def __init__(self, path, verify=False):
+        self.path = path
+        self.header, self._data_start = read_header(path)
+        self.rows = self.header["rows"]
+        self.categories = self.header["categories"]
+        # Snapshoti bez valute (stariji) su u KM
+        self.currencies = self.header.get("currencies", [BASE_CURRENCY])
+        self._columns = {}
+        for name, spec in self.header["columns"].items():
+            if spec["length"] == 0:
+                self._columns[name] = np.empty(0, dtype=spec["dtype"])
+            else:
+                self._columns[name] = np.memmap(
+                    path, mode="r", dtype=spec["dtype"], shape=(spec["length"],),
+                    offset=self._data_start + spec["offset"],
+                )
+        if verify:
+            self.verify()
+
+    def __len__(self):
+        return self.rows
+
+    def __getitem__(self, column):
+        return self._columns[column]
+
+    @property
+    def warehouse_columns(self):
+        return [name for name in self._columns if name.startswith("qty_")]
+
+    def verify(self):
+        """Recompute the payload checksum (reads the whole file)"""
+        checksum = hashlib.sha256()
+        with open(self.path, "rb") as f:
+            f.seek(self._data_start)
+            remaining = self.header["data_size"]
+            while remaining:
+                chunk = f.read(min(remaining, 1 << 24))
+                if not chunk:
+                    break
+                checksum.update(chunk)
+                remaining -= len(chunk)
+        if checksum.hexdigest() != self.header["checksum"]:
+            raise SnapshotError(f"Checksum za {self.path} se ne slaže")
+        return True
+
+    def _strings(self, column):
+        heap = self._columns[f"{column}.heap"]
+        if not len(heap):
+            return []
+        return bytes(heap[:-1]).decode("utf-8").split("\x00")
+
+    def string(self, column, i):
+        """Decode a single name/id without touching the rest of the heap"""
+        offsets = self._columns[f"{column}.offsets"]
+        return bytes(self._columns[f"{column}.heap"][offsets[i]:offsets[i + 1] - 1]).decode("utf-8")
+
+    def ids(self):
+        if self.header["string_ids"]:
+            return np.array(self._strings("id"), dtype=object)
+        return self._columns["id"]
+
+    def names(self):
+        return np.array(self._strings("name"), dtype=object)
+
+    def category_codes(self):
+        return self._columns["category"]
+
+    def to_frame(self):
+        """Materialize the standard product table"""
+        data = {
+            "id": self.ids(),
+            "name": self.names(),
+            "category": pd.Categorical.from_codes(
+                np.asarray(self._columns["category"]), self.categories
+            ).astype(str),
+        }
+        for col in NUMERIC_DTYPES:
+            data[col] = self._columns[col]
+        if "currency" in self._columns:
+            data["currency"] = pd.Categorical.from_codes(
+                np.asarray(self._columns["currency"]), self.currencies
+            ).astype(str)
+        else:
+            data["currency"] = BASE_CURRENCY
+        for col in self.warehouse_columns:
+            data[col] = self._columns[col]
+        return pd.DataFrame(data, copy=False)
+
+
+def open_snapshot(path, verify=False):
+    """Open a snapshot file with np.memmap"""
+    return Snapshot(path, verify=verify)
+
+
+def is_fresh(snapshot_path, source):
+    """True if the snapshot was compiled from the current version of source"""
+    try:
+        header, _ = read_header(snapshot_path)
+        st = os.stat(source)
+    except (OSError, SnapshotError, ValueError):
+        return False
+    meta = header.get("source") or {}
+    return meta.get("mtime_ns") == st.st_mtime_ns and meta.get("size") == st.st_size
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile/inspect product snapshots")
+    sub = parser.add_subparsers(dest="command", required=True)
+    compile_cmd = sub.add_parser("compile", help="CSV/Parquet -> snapshot")
+    compile_cmd.add_argument("source")
+    compile_cmd.add_argument("-o", "--output")
+    verify_cmd = sub.add_parser("verify", help="check schema version and checksum")
+    verify_cmd.add_argument("snapshot")
+    args = parser.parse_args(argv)
+
+    if args.command == "compile":
+        from ingest import read_source  # ingest čita snapshote, pa ga ne uvozimo na vrhu
+
+        output = args.output or snapshot_path_for(args.source)
+        df = read_source(args.source)
+        compile_snapshot(df, output, source=args.source)
+        print(f"💾 {len(df)} products -> {output} ({os.path.getsize(output):,} B)")
+    else:
+        try:
+            snap = open_snapshot(args.snapshot, verify=True)
+        except SnapshotError as e:
+            print(f"⚠️  {e}")
+            return 1
+        print(f"✅ {args.snapshot}: {len(snap)} products, schema v{snap.header['schema_version']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+# watcher.py - PRAĆENJE PROMJENA U IZVORIMA ZALIHA
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from ingest import expand_sources, merge_warehouses, read_source
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """Hash file contents (used only when mtime/size changed)"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class SourceWatcher:
+    """Watches warehouse exports and reloads only the files that changed"""
+
+    def __init__(self, sources, interval=2.0, max_workers=None):
+        self.sources = sources
+        self.interval = interval
+        self.max_workers = max_workers
+        self.version = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._listeners = []
+        self._stats = {}     # path -> (mtime_ns, size)
+        self._digests = {}   # path -> hash sadržaja
+        self._frames = {}    # path -> (skladište, DataFrame)
+        self._merged = merge_warehouses({})
+        self.refresh()
+
+    @property
+    def token(self):
+        """Identifies the current data; changes whenever a source changes"""
+        with self._lock:
+            return tuple(sorted(self._digests.items()))
+
+    def snapshot(self):
+        """Return (token, merged product table) as one consistent pair"""
+        with self._lock:
+            return tuple(sorted(self._digests.items())), self._merged
+
+    def add_listener(self, callback):
+        """Call callback(changed_paths, affected_ids) after each reload"""
+        self._listeners.append(callback)
+
+    def _detect_changes(self):
+        """Compare stat (and hash, when stat differs) with the last refresh"""
+        current = dict((path, wh) for wh, path in expand_sources(self.sources))
+        changed, removed = {}, [p for p in self._stats if p not in current]
+        stats, digests = {}, {}
+
+        for path, warehouse in current.items():
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                # Obrisan izvor: njegova roba više ne postoji
+                if path in self._stats:
+                    removed.append(path)
+                continue
+            except OSError:
+                continue  # prolazna greška - zadrži stare podatke do sljedećeg kruga
+            stat = (st.st_mtime_ns, st.st_size)
+            stats[path] = stat
+            if self._stats.get(path) == stat:
+                continue
+            digest = file_digest(path)
+            digests[path] = digest
+            if self._digests.get(path) != digest:
+                changed[path] = warehouse
+        return changed, removed, stats, digests
+
+    def refresh(self):
+        """Reload changed sources; returns the set of affected product ids"""
+        changed, removed, stats, digests = self._detect_changes()
+        if not changed and not removed:
+            with self._lock:
+                self._stats.update(stats)
+                self._digests.update(digests)
+            return set()
+
+        paths = list(changed)
+        loaded = {}
+        if paths:
+            workers = self.max_workers or min(32, len(paths))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                loaded = dict(zip(paths, pool.map(read_source, paths)))
+
+        with self._lock:
+            affected = set()
+            for path in removed + paths:
+                if path in self._frames:
+                    affected.update(self._frames[path][1]["id"])
+            for path in removed:
+                self._frames.pop(path, None)
+                self._stats.pop(path, None)
+                self._digests.pop(path, None)
+            for path, df in loaded.items():
+                self._frames[path] = (changed[path], df)
+                affected.update(df["id"])
+
+            self._stats.update(stats)
+            self._digests.update(digests)
+
+            by_warehouse = {}
+            for warehouse, df in self._frames.values():
+                by_warehouse.setdefault(warehouse, []).append(df)
+            self._merged = merge_warehouses(
+                {wh: pd.concat(dfs) if len(dfs) > 1 else dfs[0] for wh, dfs in by_warehouse.items()}
+            )
+            self.version += 1
+
+        for callback in self._listeners:
+            callback(removed + paths, affected)
+        return affected
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                # Fajl se možda upravo piše - pokušaj ponovo u sljedećem krugu
+                print(f"⚠️  Greška pri osvježavanju izvora: {e}")
+
+    def start(self):
+        """Start polling in a background daemon thread"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="source-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the background thread"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()